@@ -0,0 +1,201 @@
+# Flightline Project
+
+# Description:
+# Copies tracmap downloads into the project. Files are copied on a thread pool
+# into a .partial folder, verified against a checksum of the source and the
+# folder is renamed into place once every file has been copied. An interrupted
+# copy is resumed from the files recorded in the copy journal.
+
+import os
+import time
+import shutil
+import hashlib
+import threading
+from collections import namedtuple
+from concurrent import futures
+
+__partial_suffix__ = '.partial'
+__journal_suffix__ = '.partial.journal'
+__copy_block_size__ = 1024 * 1024
+
+CopyResult = namedtuple('CopyResult', ['files_copied', 'files_resumed', 'bytes_copied', 'seconds', 'bytes_per_second'])
+
+
+def file_checksum(file_location):
+    """
+    Returns the sha1 hex digest of a file
+
+    Parameters
+    ----------
+    file_location : str
+
+    Returns
+    -------
+    checksum : str
+    """
+
+    checksum = hashlib.sha1()
+    with open(file_location, 'rb') as f:
+        for block in iter(lambda: f.read(__copy_block_size__), b''):
+            checksum.update(block)
+    return checksum.hexdigest()
+
+
+def copy_file_verified(source_file, destination_file):
+    """
+    Copies a file, hashing the source as it is read, then checks the
+    checksum of the copy matches the source
+
+    Parameters
+    ----------
+    source_file : str - Location of the file to copy
+    destination_file : str - Location of the copy
+
+    Returns
+    -------
+    checksum : str - sha1 hex digest of the file
+    """
+
+    destination_folder = os.path.dirname(destination_file)
+    if not os.path.exists(destination_folder):
+        os.makedirs(destination_folder, exist_ok=True)
+
+    checksum = hashlib.sha1()
+    with open(source_file, 'rb') as source, open(destination_file, 'wb') as destination:
+        for block in iter(lambda: source.read(__copy_block_size__), b''):
+            checksum.update(block)
+            destination.write(block)
+    shutil.copystat(source_file, destination_file)
+
+    if file_checksum(destination_file) != checksum.hexdigest():
+        os.remove(destination_file)
+        raise IOError("Checksum of {0} does not match {1}".format(destination_file, source_file))
+    return checksum.hexdigest()
+
+
+def source_file_list(source_folder):
+    """
+    Returns the files in the source folder and its sub folders
+
+    Returns
+    -------
+    file_list : list<[relative_path, size, mtime_ns]>
+    """
+
+    file_list = []
+    for root, dirs, files in os.walk(source_folder):
+        for name in files:
+            stat = os.stat(os.path.join(root, name))
+            file_list.append([os.path.relpath(os.path.join(root, name), source_folder), stat.st_size, stat.st_mtime_ns])
+    return file_list
+
+
+def load_copy_journal(journal_file):
+    """
+    Loads the files already copied and verified by an interrupted copy
+
+    Returns
+    -------
+    journal : dict - {relative_path: [size, mtime_ns, checksum]}
+    """
+
+    journal = {}
+    if not os.path.exists(journal_file):
+        return journal
+    with open(journal_file, 'r') as f:
+        for line in f:
+            values = line.rstrip('\n').split('\t')
+            # A line cut short by an interruption is ignored
+            if len(values) == 4 and len(values[3]) == 40:
+                journal[values[0]] = [int(values[1]), int(values[2]), values[3]]
+    return journal
+
+
+def remove_stale_files(partial_folder, relative_paths):
+    """
+    Removes the files of an interrupted copy that are no longer in the source, and
+    the folders left empty, so they are not renamed into the download
+
+    Parameters
+    ----------
+    partial_folder : str - Folder of the interrupted copy
+    relative_paths : set<str> - Files in the source, relative to the source folder
+    """
+
+    for root, dirs, files in os.walk(partial_folder, topdown=False):
+        for name in files:
+            if os.path.relpath(os.path.join(root, name), partial_folder) not in relative_paths:
+                os.remove(os.path.join(root, name))
+        if root != partial_folder and not os.listdir(root):
+            os.rmdir(root)
+
+
+def copy_tree_verified(source_folder, destination_folder, max_workers=None):
+    """
+    Copies the source folder to the destination folder. The destination folder
+    only exists once every file has been copied and verified.
+
+    Parameters
+    ----------
+    source_folder : str - Folder to copy
+    destination_folder : str - Location of the copy, must not exist
+    max_workers : int - Number of files copied at once, defaults to the ThreadPoolExecutor default
+
+    Returns
+    -------
+    result : CopyResult
+    """
+
+    if os.path.exists(destination_folder):
+        raise IOError("{0} already exists".format(destination_folder))
+
+    start_time = time.time()
+    partial_folder = destination_folder + __partial_suffix__
+    journal_file = destination_folder + __journal_suffix__
+    journal = load_copy_journal(journal_file)
+    os.makedirs(partial_folder, exist_ok=True)
+
+    # Files copied by an interrupted copy are skipped if the source is unchanged and
+    # the partial file still has the checksum recorded when it was copied
+    source_files = source_file_list(source_folder)
+    resume_files = []
+    copy_files = []
+    for relative_path, size, mtime_ns in source_files:
+        partial_file = os.path.join(partial_folder, relative_path)
+        copied = journal.get(relative_path)
+        if copied and copied[:2] == [size, mtime_ns] and os.path.exists(partial_file) and os.path.getsize(partial_file) == size:
+            resume_files.append([relative_path, size, mtime_ns])
+        else:
+            copy_files.append([relative_path, size, mtime_ns])
+    remove_stale_files(partial_folder, set([values[0] for values in source_files]))
+
+    journal_lock = threading.Lock()
+
+    def copy_file(copy_file_values):
+        relative_path, size, mtime_ns = copy_file_values
+        checksum = copy_file_verified(os.path.join(source_folder, relative_path), os.path.join(partial_folder, relative_path))
+        with journal_lock:
+            with open(journal_file, 'a') as f:
+                f.write("{0}\t{1}\t{2}\t{3}\n".format(relative_path, size, mtime_ns, checksum))
+        return size
+
+    def partial_file_verified(copy_file_values):
+        relative_path = copy_file_values[0]
+        return file_checksum(os.path.join(partial_folder, relative_path)) == journal[relative_path][2]
+
+    with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        resumed_files = []
+        for copy_file_values, verified in zip(resume_files, executor.map(partial_file_verified, resume_files)):
+            if verified:
+                resumed_files.append(copy_file_values[0])
+            else:
+                copy_files.append(copy_file_values)
+        bytes_copied = sum(executor.map(copy_file, copy_files))
+
+    os.replace(partial_folder, destination_folder)
+    if os.path.exists(journal_file):
+        os.remove(journal_file)
+
+    seconds = time.time() - start_time
+    bytes_per_second = bytes_copied / seconds if seconds else 0.0
+    return CopyResult(len(copy_files), len(resumed_files), bytes_copied, seconds, bytes_per_second)
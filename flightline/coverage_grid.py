@@ -0,0 +1,401 @@
+# Flightline Project
+
+# Description:
+# Grid counting how many sowing passes cover each cell, accumulated as each
+# download is ingested. A pass is a run of consecutive swath polygons, the swaths
+# of a pass overlap each other so each cell is only counted once per pass. The
+# covered cells, cells sown more than once and product applied of each block and
+# of the whole operation are kept as running counts, so the dissolved area and
+# applied rates are known without dissolving total_polygons. Cells are uint16
+# counts stored in square tiles in a memory mapped file, tiles are only created
+# where there are swaths. The product applied to each cell of the operation grid
+# is kept as float32 kg in a second file with the same tile layout.
+
+import os
+import json
+import math
+import mmap
+import shutil
+
+from flightline import time_handler
+
+__header_file_name__ = 'coverage.json'
+__data_file_name__ = 'coverage.bin'
+__applied_file_name__ = 'applied.bin'
+__tile_size__ = 128
+__initial_tile_capacity__ = 16
+__max_count__ = 65535
+__cell_bytes__ = 2
+__applied_bytes__ = 4
+# Swaths further apart in time than this are in different passes
+__pass_gap_seconds__ = 5
+
+
+def polygon_cells(rings, resolution):
+    """
+    Returns the cells whose centre is inside a polygon. Uses the nonzero winding
+    rule so overlapping outer rings are both filled and holes are not.
+
+    Parameters
+    ----------
+    rings : list<list<(x, y)>> - closed rings of the polygon
+    resolution : float - cell size, cell (column, row) covers column * resolution to (column + 1) * resolution
+
+    Returns
+    -------
+    cells : set<(column, row)>
+    """
+
+    edges = []
+    for ring in rings:
+        edges.extend([edge for edge in zip(ring[:-1], ring[1:]) if edge[0][1] != edge[1][1]])
+    if not edges:
+        return set()
+    ys = [point[1] for edge in edges for point in edge]
+    first_row = int(math.ceil(min(ys) / resolution - 0.5))
+    last_row = int(math.floor(max(ys) / resolution - 0.5))
+
+    cells = set()
+    for row in range(first_row, last_row + 1):
+        y = (row + 0.5) * resolution
+        crossings = []
+        for (x0, y0), (x1, y1) in edges:
+            if (y0 <= y) != (y1 <= y):
+                crossings.append((x0 + (y - y0) * (x1 - x0) / (y1 - y0), 1 if y1 > y0 else -1))
+        crossings.sort()
+        winding = 0
+        for i, (x, direction) in enumerate(crossings[:-1]):
+            winding += direction
+            if winding:
+                first_column = int(math.ceil(x / resolution - 0.5))
+                last_column = int(math.ceil(crossings[i + 1][0] / resolution - 0.5)) - 1
+                cells.update([(column, row) for column in range(first_column, last_column + 1)])
+    return cells
+
+
+def swath_passes(rows, time_index, block_index, gap_seconds=__pass_gap_seconds__):
+    """
+    Splits swath rows sorted by Time into passes. A new pass starts when the block
+    changes or there is a gap of more than gap_seconds between swaths.
+
+    Parameters
+    ----------
+    rows : list<list> - swath rows sorted by Time
+    time_index : int - index of the Time value in each row
+    block_index : int - index of the BlockName in each row
+
+    Returns
+    -------
+    passes : list<list<int>> - indexes of the rows in each pass
+    """
+
+    time_values = [row[time_index] for row in rows]
+    seconds = iter(time_handler.time_column_seconds([time_value for time_value in time_values if time_value]))
+    times = [next(seconds) if time_value else None for time_value in time_values]
+    passes = []
+    for i, row in enumerate(rows):
+        # Swaths without a time are a pass of their own
+        if not passes or row[block_index] != rows[i - 1][block_index] or times[i] is None or times[i - 1] is None \
+                or times[i] - times[i - 1] > gap_seconds:
+            passes.append([])
+        passes[-1].append(i)
+    return passes
+
+
+class CoverageGrid(object):
+    """
+    Coverage grid of a flight data gdb. There is a grid for the whole operation and
+    one for each block, each block's covered cells give the dissolved area of the block.
+    The grid is marked incomplete while it is being changed and complete when it is saved,
+    an incomplete grid should be rebuilt.
+    """
+
+    def __init__(self, grid_folder, resolution=5.0):
+        """
+        Parameters
+        ----------
+        grid_folder : str - Folder the grid is stored in
+        resolution : float - Cell size in the units of the swath coordinates, only used
+                     for a new grid, an existing grid keeps the resolution it was created with
+        """
+
+        self.grid_folder = grid_folder
+        self.header_file = os.path.join(grid_folder, __header_file_name__)
+        self.data_file = os.path.join(grid_folder, __data_file_name__)
+        self.applied_file = os.path.join(grid_folder, __applied_file_name__)
+        self.resolution = float(resolution)
+        self.tile_size = __tile_size__
+        self.tile_count = 0
+        self.polygon_count = 0
+        self.complete = True
+        self.total = self.__new_grid__()
+        self.blocks = {}
+        if os.path.exists(self.header_file):
+            self.__load_header__()
+        elif not os.path.exists(grid_folder):
+            os.makedirs(grid_folder)
+
+        capacity = max(self.tile_count, __initial_tile_capacity__)
+        # Cells of a data file without a header are discarded
+        self.__file__ = open(self.data_file, 'r+b' if self.tile_count else 'w+b')
+        self.__applied_file__ = open(self.applied_file, 'r+b' if self.tile_count and os.path.exists(self.applied_file) else 'w+b')
+        self.__mmap__ = None
+        self.__cells__ = None
+        self.__applied_mmap__ = None
+        self.__applied__ = None
+        self.__map_tiles__(capacity)
+
+    @staticmethod
+    def exists(grid_folder):
+        return os.path.exists(os.path.join(grid_folder, __header_file_name__))
+
+    @staticmethod
+    def remove(grid_folder):
+        """Removes a grid so it can be rebuilt"""
+        shutil.rmtree(grid_folder, ignore_errors=True)
+
+    def __load_header__(self):
+        with open(self.header_file, 'r') as f:
+            header = json.load(f)
+        self.resolution = header['resolution']
+        self.tile_size = header['tile_size']
+        self.tile_count = header['tile_count']
+        self.polygon_count = header['polygon_count']
+        self.complete = header['complete']
+        self.total = self.__grid_from_json__(header['total'])
+        self.blocks = dict([[name, self.__grid_from_json__(grid)] for name, grid in header['blocks'].items()])
+        if self.tile_count and not os.path.exists(self.applied_file):
+            # Grids saved before the product applied to each cell was kept are rebuilt
+            self.complete = False
+
+    @staticmethod
+    def __new_grid__():
+        """
+        covered_cells : cells covered at least once
+        overlap_cells : cells covered more than once
+        count_sum : sum of the counts of all cells
+        applied_kg : product applied, from the area and sow rate of each pass
+        tiles : {(tile_column, tile_row): tile number}
+        """
+        return {'covered_cells': 0, 'overlap_cells': 0, 'count_sum': 0, 'applied_kg': 0.0, 'tiles': {}}
+
+    @staticmethod
+    def __grid_from_json__(grid):
+        grid = dict(grid)
+        grid['tiles'] = dict([[tuple(int(i) for i in key.split(',')), tile] for key, tile in grid['tiles'].items()])
+        return grid
+
+    @staticmethod
+    def __grid_to_json__(grid):
+        grid = dict(grid)
+        grid['tiles'] = dict([["{0},{1}".format(*key), tile] for key, tile in grid['tiles'].items()])
+        return grid
+
+    def __map_tiles__(self, capacity):
+        """Memory maps the data file, extending it to hold capacity tiles"""
+        if self.__cells__ is not None:
+            self.__cells__.release()
+            self.__mmap__.close()
+            self.__applied__.release()
+            self.__applied_mmap__.close()
+        cell_count = capacity * self.tile_size * self.tile_size
+        if os.path.getsize(self.data_file) < cell_count * __cell_bytes__:
+            self.__file__.truncate(cell_count * __cell_bytes__)
+        if os.path.getsize(self.applied_file) < cell_count * __applied_bytes__:
+            self.__applied_file__.truncate(cell_count * __applied_bytes__)
+        self.capacity = capacity
+        self.__mmap__ = mmap.mmap(self.__file__.fileno(), cell_count * __cell_bytes__)
+        self.__cells__ = memoryview(self.__mmap__).cast('H')
+        self.__applied_mmap__ = mmap.mmap(self.__applied_file__.fileno(), cell_count * __applied_bytes__)
+        self.__applied__ = memoryview(self.__applied_mmap__).cast('f')
+
+    def __tile_offset__(self, grid, tile_key):
+        """Returns the offset of the first cell of a tile, creating the tile if needed"""
+        tile = grid['tiles'].get(tile_key)
+        if tile is None:
+            if self.tile_count == self.capacity:
+                self.__map_tiles__(self.capacity * 2)
+            tile = self.tile_count
+            grid['tiles'][tile_key] = tile
+            self.tile_count += 1
+        return tile * self.tile_size * self.tile_size
+
+    def __increment__(self, grid, cells, cell_kg=0.0):
+        """Counts a pass over the cells, cell_kg is added to the product applied to each cell"""
+        tile_size = self.tile_size
+        data = self.__cells__
+        applied = self.__applied__
+        tile_offsets = {}
+        for column, row in cells:
+            tile_key = (column // tile_size, row // tile_size)
+            offset = tile_offsets.get(tile_key)
+            if offset is None:
+                offset = tile_offsets[tile_key] = self.__tile_offset__(grid, tile_key)
+                data = self.__cells__
+                applied = self.__applied__
+            index = offset + (row % tile_size) * tile_size + column % tile_size
+            count = data[index]
+            if count == 0:
+                grid['covered_cells'] += 1
+            elif count == 1:
+                grid['overlap_cells'] += 1
+            if count < __max_count__:
+                data[index] = count + 1
+                grid['count_sum'] += 1
+            if cell_kg:
+                applied[index] += cell_kg
+
+    def __cell_index__(self, grid, column, row):
+        """Returns the index of a cell in the data file or None if its tile has not been created"""
+        tile = grid['tiles'].get((column // self.tile_size, row // self.tile_size))
+        if tile is None:
+            return None
+        return tile * self.tile_size * self.tile_size + (row % self.tile_size) * self.tile_size + column % self.tile_size
+
+    def add_pass(self, polygon_cell_sets, block_name='', sow_rate=None):
+        """
+        Adds a pass to the operation and block grids, each cell is counted once
+
+        Parameters
+        ----------
+        polygon_cell_sets : list<set> - polygon_cells of each swath polygon in the pass
+        block_name : str - BlockName of the pass
+        sow_rate : float - Sow rate of the machine in kg/ha, if given the product applied is added up
+        """
+
+        if self.complete:
+            self.complete = False
+            self.__write_header__()
+        cells = set().union(*polygon_cell_sets)
+        if not cells:
+            # Polygons without a shape or smaller than a cell are only counted
+            self.polygon_count += len(polygon_cell_sets)
+            return
+        block_grid = self.blocks.setdefault(block_name or '', self.__new_grid__())
+        cell_kg = self.cell_hectares * sow_rate if sow_rate else 0.0
+        self.__increment__(self.total, cells, cell_kg)
+        self.__increment__(block_grid, cells)
+        if sow_rate:
+            applied_kg = len(cells) * cell_kg
+            self.total['applied_kg'] += applied_kg
+            block_grid['applied_kg'] += applied_kg
+        self.polygon_count += len(polygon_cell_sets)
+
+    def add_polygon(self, rings, block_name='', sow_rate=None):
+        """Adds a swath polygon as a pass of its own, see add_pass"""
+        self.add_pass([polygon_cells(rings, self.resolution)], block_name, sow_rate)
+
+    @property
+    def cell_hectares(self):
+        """Area of a cell in hectares, the coordinates being in metres"""
+        return self.resolution * self.resolution / 10000
+
+    def count(self, x, y, block_name=None):
+        """Returns the number of passes covering the cell containing a point"""
+        grid = self.total if block_name is None else self.blocks.get(block_name)
+        if not grid:
+            return 0
+        index = self.__cell_index__(grid, int(math.floor(x / self.resolution)), int(math.floor(y / self.resolution)))
+        if index is None:
+            return 0
+        return self.__cells__[index]
+
+    def mean_count(self, cells):
+        """Returns the mean number of passes covering the cells of a polygon, see polygon_cells"""
+        if not cells:
+            return 0.0
+        counts = [self.__cells__[i] for i in [self.__cell_index__(self.total, column, row) for column, row in cells] if i is not None]
+        return sum(counts) / len(cells)
+
+    def applied_rate(self, cells):
+        """
+        Returns the mean rate applied over the cells of a polygon by every pass covering
+        them, from the product applied to each cell, see polygon_cells
+
+        Returns
+        -------
+        applied_rate : float - kg/ha, None if the polygon has no cells
+        """
+
+        if not cells:
+            return None
+        applied_kg = sum([self.__applied__[i] for i in [self.__cell_index__(self.total, column, row) for column, row in cells] if i is not None])
+        return applied_kg / (len(cells) * self.cell_hectares)
+
+    def hectares(self, block_name=None):
+        """
+        Returns the covered area in hectares
+
+        Parameters
+        ----------
+        block_name : str - Block to return the area of, if None the area of the whole operation
+        """
+
+        grid = self.total if block_name is None else self.blocks.get(block_name)
+        if not grid:
+            return 0.0
+        return round(grid['covered_cells'] * self.cell_hectares, 4)
+
+    def block_hectares(self):
+        """Returns the covered area of each block, {block_name: hectares}"""
+        return dict([[block_name, self.hectares(block_name)] for block_name in self.blocks])
+
+    def statistics(self, block_name=None):
+        """
+        Returns the sowing statistics of a block or of the whole operation
+
+        Parameters
+        ----------
+        block_name : str - if None the statistics of the whole operation
+
+        Returns
+        -------
+        statistics : dict - hectares : covered area
+                            overlap_hectares : area covered by more than one pass
+                            mean_passes : mean number of passes over the covered area
+                            applied_rate : mean kg/ha applied over the covered area, None if no sow rates were given
+        """
+
+        grid = self.total if block_name is None else self.blocks.get(block_name, self.__new_grid__())
+        covered_cells = grid['covered_cells']
+        statistics = {'hectares': self.hectares(block_name),
+                      'overlap_hectares': round(grid['overlap_cells'] * self.cell_hectares, 4),
+                      'mean_passes': round(grid['count_sum'] / covered_cells, 2) if covered_cells else 0.0,
+                      'applied_rate': None}
+        if covered_cells and grid['applied_kg']:
+            statistics['applied_rate'] = round(grid['applied_kg'] / (covered_cells * self.cell_hectares), 2)
+        return statistics
+
+    def block_statistics(self):
+        """Returns the statistics of each block, {block_name: statistics}"""
+        return dict([[block_name, self.statistics(block_name)] for block_name in self.blocks])
+
+    def save(self):
+        """Flushes the cells to disk then writes the header, marking the grid complete"""
+        self.__mmap__.flush()
+        self.__applied_mmap__.flush()
+        self.complete = True
+        self.__write_header__()
+
+    def __write_header__(self):
+        header = {'resolution': self.resolution, 'tile_size': self.tile_size, 'tile_count': self.tile_count,
+                  'polygon_count': self.polygon_count, 'complete': self.complete, 'total': self.__grid_to_json__(self.total),
+                  'blocks': dict([[name, self.__grid_to_json__(grid)] for name, grid in self.blocks.items()])}
+        temp_file = "{0}.tmp".format(self.header_file)
+        with open(temp_file, 'w') as f:
+            json.dump(header, f)
+        os.replace(temp_file, self.header_file)
+
+    def close(self):
+        self.__cells__.release()
+        self.__mmap__.close()
+        self.__file__.close()
+        self.__applied__.release()
+        self.__applied_mmap__.close()
+        self.__applied_file__.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,102 @@
+# Flightline Project
+
+# Description:
+# Persistent Time/Speed key index used to stop tracmap records being merged
+# into the flight data featureclasses more than once.
+
+import os
+
+
+def time_speed_key(time_value, speed_value):
+    """
+    Returns the key that identifies a tracmap record, built from its
+    Time and Speed values
+
+    Parameters
+    ----------
+    time_value : str - eg. '2017-08-29T09:37:50+1300'
+    speed_value : float
+
+    Returns
+    -------
+    key : str
+    """
+
+    return "{0}_{1}".format(time_value, str(speed_value))
+
+
+class DedupIndex(object):
+    """
+    Hashed set of the Time/Speed keys already stored in a featureclass.
+    The keys are saved to a sorted key file so that later merges only need
+    to read the file rather than scan the featureclass.
+    """
+
+    def __init__(self, index_file):
+        """
+        Parameters
+        ----------
+        index_file : str - Location of the key file
+        """
+
+        self.index_file = index_file
+        self.keys = set()
+        self.record_count = None
+
+    def __contains__(self, key):
+        return key in self.keys
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def exists(self):
+        return os.path.exists(self.index_file)
+
+    def add(self, key):
+        """Adds a key to the index"""
+        self.keys.add(key)
+
+    def rebuild(self, keys, record_count):
+        """
+        Replaces the keys in the index
+
+        Parameters
+        ----------
+        keys : iterable<str> - Keys of every record in the featureclass
+        record_count : int - Number of records in the featureclass
+        """
+
+        self.keys = set(keys)
+        self.record_count = record_count
+
+    def load(self):
+        """
+        Loads the keys from the key file. The first line of the file holds the
+        record count of the featureclass when the index was last saved.
+
+        Returns
+        -------
+        loaded : boolean - False if there is no key file
+        """
+
+        if not self.exists:
+            return False
+        with open(self.index_file, 'r') as key_file:
+            header = key_file.readline()
+            self.record_count = int(header.strip())
+            self.keys = set(line.rstrip('\n') for line in key_file)
+        return True
+
+    def save(self):
+        """Writes the keys to the key file, replacing the existing file"""
+
+        index_folder = os.path.dirname(self.index_file)
+        if index_folder and not os.path.exists(index_folder):
+            os.makedirs(index_folder)
+        temp_file = "{0}.tmp".format(self.index_file)
+        with open(temp_file, 'w') as key_file:
+            key_file.write("{0}\n".format(self.record_count))
+            for key in sorted(self.keys):
+                key_file.write("{0}\n".format(key))
+        os.replace(temp_file, self.index_file)
@@ -0,0 +1,104 @@
+# Flightline Project
+
+# Description:
+# State of the dissolved_by_block and total_dissolved featureclasses. Records the
+# total_polygons rows already unioned into them and the dissolved area of each
+# block, so summarising only has to union the polygons added since the last run.
+# Contains no arcpy.
+
+import os
+import json
+
+
+class DissolveCache(object):
+    """
+    Dissolve state of a flight data gdb. total_polygons rows are only appended, so
+    the rows with an object id above last_oid are the ones not yet dissolved. If
+    the featureclass has a different number of rows than the cache accounts for,
+    rows have been deleted or the featureclass replaced and the dissolve is rebuilt.
+    """
+
+    def __init__(self, state_file):
+        """
+        Parameters
+        ----------
+        state_file : str - Location of the state json file, if None the state is only kept in memory
+        """
+
+        self.state_file = state_file
+        self.last_oid = None
+        self.polygon_count = 0
+        self.block_areas = {}
+        self.total_area = 0.0
+        if state_file and os.path.exists(state_file):
+            self.load()
+
+    def is_current(self, polygon_count, new_polygon_count):
+        """
+        Returns True if the dissolve can be brought up to date by unioning the new polygons
+
+        Parameters
+        ----------
+        polygon_count : int - Rows in total_polygons
+        new_polygon_count : int - Rows in total_polygons with an object id above last_oid
+        """
+
+        return self.last_oid is not None and self.polygon_count + new_polygon_count == polygon_count
+
+    def new_polygons_where_clause(self, oid_field_name):
+        """Returns the expression selecting the polygons added since the last dissolve"""
+
+        return "{0} > {1}".format(oid_field_name, self.last_oid if self.last_oid is not None else -1)
+
+    def update(self, last_oid, polygon_count, block_areas, total_area):
+        """
+        Records a dissolve
+
+        Parameters
+        ----------
+        last_oid : int - Highest object id of the dissolved polygons, unchanged if None
+        polygon_count : int - Rows in total_polygons
+        block_areas : dict - {block_name: hectares} of the blocks that were dissolved, other blocks are kept
+        total_area : float - Hectares of all the polygons dissolved
+        """
+
+        if last_oid is not None:
+            self.last_oid = last_oid
+        self.polygon_count = polygon_count
+        self.block_areas.update(block_areas)
+        self.total_area = total_area
+
+    def clear(self):
+        """Forgets every dissolve, used before a rebuild"""
+
+        self.last_oid = None
+        self.polygon_count = 0
+        self.block_areas = {}
+        self.total_area = 0.0
+
+    def has_unnamed_block(self):
+        """Returns True if some polygons have no block name"""
+
+        return '' in self.block_areas or None in self.block_areas
+
+    def load(self):
+        with open(self.state_file, 'r') as f:
+            state = json.load(f)
+        self.last_oid = state['last_oid']
+        self.polygon_count = state['polygon_count']
+        # Block areas are stored as pairs rather than an object so a block name of None is kept
+        self.block_areas = dict([[block_name, area] for block_name, area in state['block_areas']])
+        self.total_area = state['total_area']
+
+    def save(self):
+        if not self.state_file:
+            return
+        state_folder = os.path.dirname(self.state_file)
+        if state_folder and not os.path.exists(state_folder):
+            os.makedirs(state_folder)
+        temp_file = "{0}.tmp".format(self.state_file)
+        with open(temp_file, 'w') as f:
+            json.dump({'last_oid': self.last_oid, 'polygon_count': self.polygon_count,
+                       'block_areas': sorted([[block_name, area] for block_name, area in self.block_areas.items()], key=lambda item: item[0] or ''),
+                       'total_area': self.total_area}, f, indent=1)
+        os.replace(temp_file, self.state_file)
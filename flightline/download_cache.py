@@ -0,0 +1,241 @@
+# Flightline Project
+
+# Description:
+# Columnar cache of the tracmap records a download added to the flight data
+# featureclasses. Each cache is a .bin file of typed columns with a .json header
+# describing them, stored in the download folder. The .bin file is memory mapped
+# when read so later stages can use the records without querying the gdb.
+
+import os
+import json
+import math
+import mmap
+from array import array
+
+from flightline import time_handler
+
+__cache_folder_name__ = '.flightline_cache'
+
+# Tracmap field name: cache column name
+__value_fields__ = {'Speed': 'speed', 'Width': 'width', 'GPS_Alt': 'gps_alt'}
+
+
+def cache_folder_location(download_directory):
+    """Returns the location of the cache folder of a download"""
+    return os.path.join(download_directory, __cache_folder_name__)
+
+
+class ColumnCacheBuilder(object):
+    """
+    Collects the records inserted into a featureclass and writes them as a column cache.
+    The geometry of each record is given as coordinates, (x, y) for points or
+    a list of parts of (x, y) for lines.
+    """
+
+    def __init__(self, shape_type=None, spatial_reference_wkt=None):
+        """
+        Parameters
+        ----------
+        shape_type : str - 'Point' or 'Polyline'
+        spatial_reference_wkt : str - Spatial reference of the coordinates
+        """
+
+        self.shape_type = shape_type
+        self.spatial_reference_wkt = spatial_reference_wkt
+        self.block_names = []
+        self.block_index = {}
+        self.columns = {'oid': array('q'), 'time': array('q'), 'time_text': array('B'), 'time_text_offsets': array('q', [0]), 'block': array('H'),
+                        'x': array('d'), 'y': array('d'), 'part_offsets': array('q', [0]), 'row_parts': array('q', [0])}
+        self.columns.update(dict([[name, array('d')] for name in __value_fields__.values()]))
+
+    def __len__(self):
+        return len(self.columns['oid'])
+
+    def add(self, oid, field_list, row):
+        """
+        Adds a record
+
+        Parameters
+        ----------
+        oid : int - Object id of the record in the featureclass
+        field_list : list<str> - field names of the row, the coordinates are the first value
+        row : list
+        """
+
+        values = dict(zip(field_list[1:], row[1:]))
+        columns = self.columns
+        columns['oid'].append(oid)
+        time_text = values.get('Time') or ''
+        columns['time'].append(time_handler.time_seconds(time_text) if time_text else 0)
+        # Time values are stored whole, one after the other, so they are written back unchanged
+        columns['time_text'].frombytes(time_text.encode('utf-8'))
+        columns['time_text_offsets'].append(len(columns['time_text']))
+        for field_name, column_name in __value_fields__.items():
+            value = values.get(field_name)
+            columns[column_name].append(float('nan') if value is None else value)
+
+        block_name = values.get('BlockName') or ''
+        if block_name not in self.block_index:
+            self.block_index[block_name] = len(self.block_names)
+            self.block_names.append(block_name)
+        columns['block'].append(self.block_index[block_name])
+
+        coordinates = row[0]
+        parts = [[coordinates]] if self.shape_type == 'Point' else coordinates
+        for part in parts:
+            for x, y in part:
+                columns['x'].append(x)
+                columns['y'].append(y)
+            columns['part_offsets'].append(len(columns['x']))
+        columns['row_parts'].append(len(columns['part_offsets']) - 1)
+
+    def add_cache(self, cache):
+        """Adds the records of an existing ColumnCache, used before adding the records of a new merge"""
+
+        self.shape_type = self.shape_type or cache.shape_type
+        self.spatial_reference_wkt = self.spatial_reference_wkt or cache.spatial_reference_wkt
+        field_list = ['SHAPE@', 'Time', 'BlockName'] + list(__value_fields__.keys())
+        for i in range(len(cache)):
+            row = [cache.coordinates(i), cache.time_text(i), cache.block_name(i)]
+            row.extend([cache.columns[column_name][i] for column_name in __value_fields__.values()])
+            self.add(cache.columns['oid'][i], field_list, row)
+
+    def write(self, cache_folder, name):
+        """
+        Writes the cache, replacing an existing cache of the same name
+
+        Parameters
+        ----------
+        cache_folder : str - Folder the cache is written to
+        name : str - eg. 'lines', 'points'
+        """
+
+        if not os.path.exists(cache_folder):
+            os.makedirs(cache_folder)
+        header = {'record_count': len(self), 'shape_type': self.shape_type,
+                  'spatial_reference_wkt': self.spatial_reference_wkt,
+                  'block_names': self.block_names, 'columns': []}
+        data_file = os.path.join(cache_folder, "{0}.bin".format(name))
+        header_file = os.path.join(cache_folder, "{0}.json".format(name))
+
+        # The header is written last so a cache without a header is never read
+        if os.path.exists(header_file):
+            os.remove(header_file)
+        offset = 0
+        with open(data_file, 'wb') as f:
+            for column_name in sorted(self.columns):
+                column = self.columns[column_name]
+                # Columns are aligned to 8 bytes so they can be cast from the memory map
+                padding = -offset % 8
+                f.write(b'\0' * padding)
+                offset += padding
+                f.write(column.tobytes())
+                header['columns'].append({'name': column_name, 'typecode': column.typecode,
+                                          'offset': offset, 'length': len(column)})
+                offset += len(column) * column.itemsize
+        temp_file = "{0}.tmp".format(header_file)
+        with open(temp_file, 'w') as f:
+            json.dump(header, f)
+        os.replace(temp_file, header_file)
+
+
+class ColumnCache(object):
+    """
+    Memory mapped column cache written by ColumnCacheBuilder. Each column is a
+    memoryview of the cache file, eg. cache.columns['speed'][i]
+    """
+
+    def __init__(self, cache_folder, name):
+        """
+        Parameters
+        ----------
+        cache_folder : str - Folder containing the cache
+        name : str - eg. 'lines', 'points'
+        """
+
+        self.header_file = os.path.join(cache_folder, "{0}.json".format(name))
+        self.data_file = os.path.join(cache_folder, "{0}.bin".format(name))
+        with open(self.header_file, 'r') as f:
+            header = json.load(f)
+        self.record_count = header['record_count']
+        self.shape_type = header['shape_type']
+        self.spatial_reference_wkt = header['spatial_reference_wkt']
+        self.block_names = header['block_names']
+        # Caches written before the Time values were stored whole padded them to a fixed width
+        self.time_text_width = header.get('time_text_width')
+
+        self.columns = {}
+        self.__file__ = open(self.data_file, 'rb')
+        self.__mmap__ = None
+        if os.path.getsize(self.data_file):
+            self.__mmap__ = mmap.mmap(self.__file__.fileno(), 0, access=mmap.ACCESS_READ)
+        data = memoryview(self.__mmap__) if self.__mmap__ else memoryview(b'')
+        for column in header['columns']:
+            itemsize = array(column['typecode']).itemsize
+            view = data[column['offset']:column['offset'] + column['length'] * itemsize]
+            self.columns[column['name']] = view.cast(column['typecode'])
+
+    @staticmethod
+    def exists(cache_folder, name):
+        return os.path.exists(os.path.join(cache_folder, "{0}.json".format(name)))
+
+    def __len__(self):
+        return self.record_count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Releases the memory map, columns can not be used afterwards"""
+        for column in self.columns.values():
+            column.release()
+        self.columns = {}
+        if self.__mmap__:
+            self.__mmap__.close()
+        self.__file__.close()
+
+    def time_text(self, i):
+        """Returns the Time value of record i eg. '2017-08-29T09:37:50+1300'"""
+        if self.time_text_width:
+            width = self.time_text_width
+            return self.columns['time_text'][i * width:(i + 1) * width].tobytes().decode('ascii').rstrip()
+        offsets = self.columns['time_text_offsets']
+        return self.columns['time_text'][offsets[i]:offsets[i + 1]].tobytes().decode('utf-8')
+
+    def block_name(self, i):
+        return self.block_names[self.columns['block'][i]]
+
+    def coordinates(self, i):
+        """Returns the coordinates of record i, (x, y) for points or a list of parts of (x, y)"""
+        x = self.columns['x']
+        y = self.columns['y']
+        part_offsets = self.columns['part_offsets']
+        row_parts = self.columns['row_parts']
+        parts = []
+        for p in range(row_parts[i], row_parts[i + 1]):
+            parts.append([(x[v], y[v]) for v in range(part_offsets[p], part_offsets[p + 1])])
+        if self.shape_type == 'Point':
+            return parts[0][0]
+        return parts
+
+    def mean(self, column_name):
+        """Returns the mean of a value column, ignoring missing values"""
+        values = [v for v in self.columns[column_name] if not math.isnan(v)]
+        if not values:
+            return None
+        return sum(values) / len(values)
+
+    def last_time_text_by_block(self):
+        """
+        Returns the latest Time value of each block, compared as time_handler.last_time_by_group
+        compares them so the result matches reading total_points
+
+        Returns
+        -------
+        last_times : dict - {block_name: time_text}
+        """
+
+        return time_handler.last_time_by_group(([self.block_name(i), self.time_text(i)] for i in range(len(self))), 0, 1)
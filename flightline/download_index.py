@@ -0,0 +1,107 @@
+# Flightline Project
+
+# Description:
+# Index of the files in a tracmap download, built with a single pass over the
+# download folder. Classifies the log and secondary shapefiles, the summary .txt
+# files and the block folders so they can be looked up without walking or
+# globbing the folder again.
+
+import os
+
+from flightline import download_cache
+
+__shapefile_names__ = ['log.shp', 'secondary.shp']
+__shapefile_sidecars__ = ['.shx', '.dbf']
+__summary_extension__ = '.txt'
+
+
+class DownloadIndex(object):
+    """
+    Files of a tracmap download eg. ./raw_data/HelicopterRego/DownloadTime
+    The download cache folder is not indexed.
+    """
+
+    def __init__(self, download_directory):
+        """
+        Parameters
+        ----------
+        download_directory : str - Folder containing the tracmap download
+        """
+
+        self.download_directory = download_directory
+        self.files = []
+        self.block_folders = {}
+        self.summary_files = {}
+        self.shapefiles = dict([[name, []] for name in __shapefile_names__])
+        self.__lower_files__ = set()
+        self.__scan__()
+
+    def __scan__(self):
+        folders = [self.download_directory]
+        while folders:
+            folder = folders.pop()
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        if entry.name == download_cache.__cache_folder_name__:
+                            continue
+                        if folder == self.download_directory:
+                            self.block_folders[entry.name.lower()] = entry.path
+                        folders.append(entry.path)
+                        continue
+                    self.files.append(entry.path)
+                    name = entry.name.lower()
+                    self.__lower_files__.add(os.path.join(folder, name))
+                    if name.endswith(__summary_extension__):
+                        self.summary_files.setdefault(folder, []).append(entry.path)
+                    for shapefile_name in __shapefile_names__:
+                        if name.endswith(shapefile_name):
+                            self.shapefiles[shapefile_name].append(entry.path)
+
+        self.files.sort()
+        for file_list in list(self.summary_files.values()) + list(self.shapefiles.values()):
+            file_list.sort()
+
+    def shapefile_list(self, shape_name):
+        """
+        Returns the shapefiles whose name ends with shape_name, ignoring case
+
+        Parameters
+        ----------
+        shape_name : str - eg. 'log.shp', 'secondary.shp'
+
+        Returns
+        -------
+        shapefile_list : list<str>
+        """
+
+        shape_name = shape_name.lower()
+        if shape_name in self.shapefiles:
+            return list(self.shapefiles[shape_name])
+        return [f for f in self.files if os.path.basename(f).lower().endswith(shape_name)]
+
+    def has_sidecars(self, shapefile):
+        """Returns True if the .shx and .dbf files of the shapefile are in the download"""
+
+        base_name = os.path.join(os.path.dirname(shapefile), os.path.basename(shapefile).lower())[:-4]
+        return all([base_name + sidecar in self.__lower_files__ for sidecar in __shapefile_sidecars__])
+
+    def summary_file(self, block_name=None):
+        """
+        Returns the summary .txt file of a block. This is in the block folder, or in
+        the root of the download if there is no folder for the block.
+
+        Parameters
+        ----------
+        block_name : str
+
+        Returns
+        -------
+        summary_file : str - None if there is no summary file
+        """
+
+        folder = self.block_folders.get((block_name or '').lower(), self.download_directory)
+        summary_files = self.summary_files.get(folder)
+        if not summary_files:
+            return None
+        return summary_files[0]
@@ -11,8 +11,22 @@ import arcpy
 import datetime
 import time
 import csv
-import glob
-import linecache
+import re
+import math
+from flightline import dedup_index
+from flightline import tracmap_data
+from flightline import time_handler
+from flightline import download_index
+from flightline import swath
+from flightline import coverage_grid
+from flightline import flight_path as flight_path_segments
+from flightline import spatial_index
+from flightline import simplify
+from flightline import summary_parser
+from flightline import sum_totals
+from flightline import dissolve_cache
+from flightline import tiled_dissolve
+from flightline import process_pool
 
 def epsg_to_projection_name(epsg):
     """Returns the name of the epsg number"""
@@ -36,12 +50,7 @@ def directory_shapefile_list(shape_name, tracmap_data_directory):
     tracmap_data_directory : str
     """
 
-    shapefile_list = []
-    for dirpath, dirnames, filenames in os.walk(tracmap_data_directory):
-        for filename in [f.lower() for f in filenames if f.endswith(shape_name.lower())]:
-            shapefile_list.append(os.path.join(dirpath, filename))
-
-    return shapefile_list
+    return download_index.DownloadIndex(tracmap_data_directory).shapefile_list(shape_name)
 
 def repair_geometry(featuerclass):
     """Repairs the geometry using arcpy.RepairGeometry.."""
@@ -102,7 +111,160 @@ def get_list_of_time_records(featureclass):
             time_list.append(row[0])
     return time_list
 
-def merge_tracmap_data_featureclass(tracmap_data_directory, shapefile, merge_featureclass):
+def load_dedup_index(featureclass, index_file):
+    """
+    Loads the Time/Speed key index for a featureclass. The key file is only
+    trusted if the featureclass record count matches the count saved with it,
+    otherwise the index is rebuilt from the featureclass and saved.
+
+    Parameters
+    ----------
+    featureclass : str - location of featureclass
+    index_file : str - location of the key file
+
+    Returns
+    -------
+    index : dedup_index.DedupIndex
+    """
+
+    index = dedup_index.DedupIndex(index_file)
+    record_count = featureclass_record_count(featureclass)
+    if index.load() and index.record_count == record_count:
+        return index
+
+    with arcpy.da.SearchCursor(featureclass, ['Time','Speed']) as time_speed_cursor:
+        index.rebuild([dedup_index.time_speed_key(row[0], row[1]) for row in time_speed_cursor], record_count)
+    index.save()
+    return index
+
+def coordinates_to_geometry(coordinates, shape_type, spatial_ref):
+    """
+    Converts coordinates from shapefile_reader.ShapefileReader into an arcpy geometry
+
+    Parameters
+    ----------
+    coordinates : (x, y) for points or list<list<(x, y)>> of parts
+    shape_type : str ['Point','Multipoint','Polyline','Polygon']
+    spatial_ref : arcpy.SpatialReference
+
+    Returns
+    -------
+    geometry : arcpy.Geometry
+    """
+
+    if shape_type == 'Point':
+        return arcpy.PointGeometry(arcpy.Point(coordinates[0], coordinates[1]), spatial_ref)
+    if shape_type == 'Multipoint':
+        return arcpy.Multipoint(arcpy.Array([arcpy.Point(x, y) for x, y in coordinates[0]]), spatial_ref)
+    parts = arcpy.Array([arcpy.Array([arcpy.Point(x, y) for x, y in part]) for part in coordinates])
+    if shape_type == 'Polygon':
+        return arcpy.Polygon(parts, spatial_ref)
+    return arcpy.Polyline(parts, spatial_ref)
+
+def geometry_to_coordinates(geometry):
+    """
+    Converts an arcpy polyline or polygon into a list of parts of (x, y), the inverse
+    of coordinates_to_geometry. The rings of a polygon part are returned as separate parts.
+    """
+
+    parts = []
+    for part in geometry:
+        points = []
+        for point in part:
+            # Rings of a polygon part are separated by None
+            if point is None:
+                parts.append(points)
+                points = []
+            else:
+                points.append((point.X, point.Y))
+        parts.append(points)
+    return [part for part in parts if part]
+
+def spatial_reference_from_wkt(wkt, coordinate_system=None):
+    """
+    Returns an arcpy.SpatialReference loaded from well known text,
+    or the coordinate_system if there is no well known text
+    """
+
+    if not wkt:
+        return coordinate_system
+    spatial_ref = arcpy.SpatialReference()
+    spatial_ref.loadFromString(wkt)
+    return spatial_ref
+
+def cached_coordinates(cache, spatial_ref):
+    """
+    Returns a function giving the coordinates of record i of a download cache in spatial_ref.
+    The cache holds the coordinates read from the shapefile, they are only projected through
+    an arcpy geometry if the shapefile was in another spatial reference.
+
+    Parameters
+    ----------
+    cache : download_cache.ColumnCache
+    spatial_ref : arcpy.SpatialReference - Spatial reference of the featureclass the records were inserted into
+
+    Returns
+    -------
+    coordinates : function(i) - (x, y) for points or a list of parts of (x, y)
+    """
+
+    cache_ref = spatial_reference_from_wkt(cache.spatial_reference_wkt)
+    if cache_ref is None or spatial_ref is None or \
+            tracmap_data.coordinate_system_wkt(cache_ref) == tracmap_data.coordinate_system_wkt(spatial_ref):
+        return cache.coordinates
+
+    def projected_coordinates(i):
+        geometry = coordinates_to_geometry(cache.coordinates(i), cache.shape_type, cache_ref).projectAs(spatial_ref)
+        if cache.shape_type == 'Point':
+            return (geometry.firstPoint.X, geometry.firstPoint.Y)
+        return geometry_to_coordinates(geometry)
+    return projected_coordinates
+
+def cached_value(cache, column_name, i):
+    """Returns a value column of a download cache record, None if the value was missing"""
+
+    value = cache.columns[column_name][i]
+    return None if math.isnan(value) else value
+
+def insert_tracmap_rows(merge_featureclass, field_list, keyed_rows, key_index, to_geometry=None, cache_builder=None):
+    """
+    Inserts the rows whose Time/Speed key is not already in the key_index
+
+    Parameters
+    ----------
+    merge_featureclass : str - location of merge featureclass
+    field_list : list<str> - field names of the rows
+    keyed_rows : iterable<(str, list)> - (Time/Speed key, row)
+    key_index : dedup_index.DedupIndex - extended with the keys of the inserted rows
+    to_geometry : function - Converts the first value of a row into an arcpy geometry,
+                  if None the rows already contain a geometry
+    cache_builder : download_cache.ColumnCacheBuilder - If given the inserted rows are added to it,
+                    the first value of the rows must be coordinates
+
+    Returns
+    -------
+    rows_added : int
+    """
+
+    rows_added = 0
+    with arcpy.da.InsertCursor(merge_featureclass, field_list) as destination_cursor:
+        for key, row in keyed_rows:
+            # If the row already exists, don't add it
+            if key not in key_index:
+                if to_geometry:
+                    oid = destination_cursor.insertRow([to_geometry(row[0])] + row[1:])
+                else:
+                    oid = destination_cursor.insertRow(row)
+                if cache_builder is not None:
+                    cache_builder.add(oid, field_list, row)
+                key_index.add(key)
+                rows_added += 1
+
+    if key_index.record_count is not None:
+        key_index.record_count += rows_added
+    return rows_added
+
+def merge_tracmap_data_featureclass(tracmap_data_directory, shapefile, merge_featureclass, key_index=None, utc_offset=time_handler.__default_utc_offset__):
     """
     Copies data from a tracmap shapefile and merges it
     into the merge_featureclass
@@ -110,8 +272,16 @@ def merge_tracmap_data_featureclass(tracmap_data_directory, shapefile, merge_fea
     Parameters
     ----------
     tracmap_data_directory : str - Directory containing the tracmap data
-    shapefile_name : str - location of the shapefile to merge
+    shapefile : str - location of the shapefile to merge
     merge_featureclass : str - location of merge featureclass
+    key_index : dedup_index.DedupIndex - Time/Speed keys already in the merge_featureclass,
+                the index is extended with the inserted rows. If None the keys are read from
+                the merge_featureclass.
+    utc_offset : str - UTC offset of tracmap version 1 times eg. '+1300'
+
+    Returns
+    -------
+    rows_added : int
     """
 
     # Copy the shapefile into memory to add a '_' instead of the space in the 'GPS Alt' field name
@@ -120,73 +290,62 @@ def merge_tracmap_data_featureclass(tracmap_data_directory, shapefile, merge_fea
     desc_fc = arcpy.Describe(temp_fc)
     field_list = [f.name for f in arcpy.ListFields(temp_fc) if f.name != desc_fc.OIDFieldName]
     field_list.append('SHAPE@') # Add geometry field into list
-    blockname = os.path.basename(os.path.dirname(shapefile))
-    tempfc_desc = arcpy.Describe(temp_fc)
-    tempfc_spatialreference = tempfc_desc.spatialReference
-
-    # Get a list of all the existing Time records concatenated with Speed records
-    total_fc_list = []
-    with arcpy.da.SearchCursor(merge_featureclass, ['Time','Speed']) as time_speed_cursor:
-        for row in time_speed_cursor:
-            total_fc_list.append("{0}_{1}".format(row[0],str(row[1])))
-
-    # If the data is from Tracmap version 1 (Date and Time fields are sperated)
-    if field_list[1] == 'Date':
-        new_row_list = []
-        with arcpy.da.SearchCursor(temp_fc, field_list, spatial_reference = tempfc_spatialreference) as source_cursor:
-            field_list.append('BlockName')
-            field_list.pop(1)
-            with arcpy.da.InsertCursor(merge_featureclass, field_list) as destination_cursor:
-                for row in source_cursor:
-                    # If the row already exists, don't add it
-                    date_time = "{0}T{1}+1300".format(row[1],row[2][:-5])
-                    line = "{0}_{1}".format(date_time,str(row[3]))
-                    if line not in total_fc_list:
-                        row = list(row)
-                        row[1] = date_time
-                        row.remove(row[2])
-                        if blockname == os.path.basename(tracmap_data_directory):
-                            if shapefile.endswith('log.shp'):
-                                row.append(os.path.basename(shapefile)[:-7])
-                            else:
-                                row.append(os.path.basename(shapefile)[:-13])
-                        else:
-                            row.append(blockname)
-                        destination_cursor.insertRow(row)
-                        new_row_list.append(row[1])
-
-        #TODO Addmessage
-        #Add message displaying the number of rows added to the feature class
-        #arcpy.AddMessage(str(len(newRowsList)) + ' rows added to ' + featureClass + ' fc from ' + shapefile)
-
-    # If the data is from Tracmap version 2 or later (Date and Time are concatenated into one field)
-    elif field_list[1] == 'Time':
-        new_row_list = []
-        with arcpy.da.SearchCursor(temp_fc, field_list, spatial_reference = tempfc_spatialreference) as source_cursor:
-            field_list.append('BlockName')
-            with arcpy.da.InsertCursor(merge_featureclass, field_list) as destination_cursor:
-                for row in source_cursor:
-                    # If the row already exists, don't add it.
-                    line = "{0}_{1}".format(row[1], str(row[2]))
-                    if line not in total_fc_list:
-                        row = list(row)
-                        if blockname == os.path.basename(tracmap_data_directory):
-                            row.append('')
-                        else:
-                            row.append(blockname)
-                        destination_cursor.insertRow(row)
-                        new_row_list.append(row[1])
-
-        # TODO Add message
-        # Add message displaying the number of rows added to the feature class
-        #arcpy.AddMessage(str(len(newRowsList)) + ' rows added to ' + featureClass + ' fc from ' + shapefile)
+    source_cursor = arcpy.da.SearchCursor(temp_fc, field_list, spatial_reference = desc_fc.spatialReference)
+
+    # Get the existing Time records concatenated with Speed records
+    if key_index is None:
+        key_index = dedup_index.DedupIndex(None)
+        with arcpy.da.SearchCursor(merge_featureclass, ['Time','Speed']) as time_speed_cursor:
+            key_index.rebuild([dedup_index.time_speed_key(row[0], row[1]) for row in time_speed_cursor],
+                              featureclass_record_count(merge_featureclass))
+
+    # Tracmap version 1 (Date and Time fields are sperated) and version 2 or later
+    # (Date and Time are concatenated into one field) are normalised into the same layout
+    rows_added = 0
+    with source_cursor as source_rows:
+        destination_field_list, keyed_rows = tracmap_data.normalise_tracmap_rows(tracmap_data_directory, shapefile, field_list, source_rows, utc_offset)
+        if destination_field_list:
+            rows_added = insert_tracmap_rows(merge_featureclass, destination_field_list, keyed_rows, key_index)
+        else:
+            arcpy.AddWarning("{0} fields are not a known tracmap version, skipped".format(shapefile))
+
+    # TODO Add message
+    # Add message displaying the number of rows added to the feature class
+    #arcpy.AddMessage(str(len(newRowsList)) + ' rows added to ' + featureClass + ' fc from ' + shapefile)
 
-    else:
-        # TODO add error message
-        #arcpy.AddError(shpName + ' does not contain the required fields. Check your data!')
-        pass
     # Delete tempory featureclass
     arcpy.Delete_management(temp_fc)
+    return rows_added
+
+def merge_parsed_tracmap_shapefile(parsed_shapefile, merge_featureclass, key_index, coordinate_system=None, cache_builder=None):
+    """
+    Merges a shapefile parsed by tracmap_data.parse_tracmap_shapefile into the merge_featureclass
+
+    Parameters
+    ----------
+    parsed_shapefile : tracmap_data.ParsedShapefile
+    merge_featureclass : str - location of merge featureclass
+    key_index : dedup_index.DedupIndex - Time/Speed keys already in the merge_featureclass
+    coordinate_system : arcpy.SpatialReference - Used if the shapefile has no .prj file
+    cache_builder : download_cache.ColumnCacheBuilder - If given the inserted rows are added to it
+
+    Returns
+    -------
+    rows_added : int
+    """
+
+    spatial_ref = spatial_reference_from_wkt(parsed_shapefile.spatial_reference_wkt, coordinate_system)
+    shape_type = parsed_shapefile.shape_type
+    if cache_builder is not None:
+        cache_builder.shape_type = shape_type
+        if spatial_ref and not cache_builder.spatial_reference_wkt:
+            cache_builder.spatial_reference_wkt = spatial_ref.exportToString()
+
+    def to_geometry(coordinates):
+        return coordinates_to_geometry(coordinates, shape_type, spatial_ref)
+
+    return insert_tracmap_rows(merge_featureclass, parsed_shapefile.field_list, parsed_shapefile.rows, key_index,
+                               to_geometry, cache_builder)
 
 
 def rename_flight_data_datasets(flight_data_gdb, dataset_list):
@@ -211,81 +370,194 @@ def rename_flight_data_datasets(flight_data_gdb, dataset_list):
             ds_copies = [i for i in workspace_dataset_list if ds in i]
             arcpy.Rename_management(in_data=ds, out_data="{0}_{1}".format(ds,len(ds_copies)))
 
-def update_totallines_featureclass(total_lines_fc, total_polygons_fc, helicopter_rego, download_time, deflector):
+def update_totallines_featureclass(total_lines_fc, total_polygons_fc, helicopter_rego, download_time, deflector, new_lines=None, coverage=None, sow_rate=None):
     """
     Updates the totallines featureclass when new tracmap data has been loaded in
 
     Parameters
     ----------
     total_lines_fc : str - TotalLines featureclass location
+    new_lines : download_cache.ColumnCache - Cache of the lines added by the download, the lines
+                are buffered from the cached coordinates and values rather than read from the featureclass
+    coverage : coverage_grid.CoverageGrid - If given the new swath polygons are added to it
+    sow_rate : float - Sow rate of the helicopter in kg/ha. If given with the coverage, the Applied_rate of
+               each new polygon is the product applied over it by every pass, including earlier downloads,
+               and the Applied_rate of earlier polygons the new passes overlap is recalculated
     """
 
-    arcpy.env.overwriteOutput = True
-
     # Update totallines with the Machine and Download Times etc.. make sure 'Buffer' is not empty
-    null_buffer = arcpy.MakeFeatureLayer_management(total_lines_fc, 'null_buffer', 'Buffer IS NULL')
-    null_buffer_count = int(arcpy.GetCount_management(null_buffer).getOutput(0))
-
-    if null_buffer_count == 0:
-        return 0
-
+    null_buffer_count = 0
     with arcpy.da.UpdateCursor(total_lines_fc, ['Width','Machine','DL_Time','Bucket','Buffer'],'Buffer IS NULL') as update_tl_cursor:
         for row in update_tl_cursor:
+            null_buffer_count += 1
             row[1] = helicopter_rego
             row[2] = download_time
-            if row[0] >= 120:
-                row[3] = 'Broadcast'
-                buffer_type = 'Round'
-            elif row[0] >= 40 and row[0] < 120:
-                row[3] = 'Narrow'
-                buffer_type = 'Round'
-            elif row[0] < 40 and row [0] >= 4:
-                row[3] = 'Trickle'
-                buffer_type = 'Square'
-            elif row[0] < 4 and row[0] > 0:
-                row[3] = 'Sprayboom'
-                buffer_type = 'Square'
-            if row[3] == 'Trickle':
-                row[4] = 15
+            bucket = swath.bucket_class(row[0])
+            if bucket is None:
+                # Lines without a width are not sown, a zero buffer stops them being selected again
+                row[4] = 0
             else:
-                row[4] = row[0] / 2
+                row[3] = bucket[0]
+                row[4] = bucket[2]
 
             update_tl_cursor.updateRow(row)
 
-        # Expression to select newly added rows
-        new_row_where_clause = "Machine = '{0}' AND DL_TIME = '{1}'".format(helicopter_rego, download_time)
+    if null_buffer_count == 0:
+        return 0
 
-        # Buffer the records just added to the total_lines featureclass and add them to the total_polygons featureclass
-        new_row_selection = arcpy.MakeFeatureLayer_management(
-            in_features=total_lines_fc,
-            out_layer='new_row_selection',
-            where_clause=new_row_where_clause)
-        if deflector:
-            temp_buffer = arcpy.Buffer_analysis(new_row_selection, 'in_memory\\temp_buffer','Buffer','RIGHT','FLAT')
-        else:
-            if buffer_type == 'Round':
-                temp_buffer = arcpy.Buffer_analysis(new_row_selection, 'in_memory\\temp_buffer', 'Buffer')
-            elif buffer_type == 'Square':
-                temp_buffer = arcpy.Buffer_analysis(new_row_selection, 'in_memory\\temp_buffer', 'Buffer', 'FULL', 'FLAT')
+    # Expression to select newly added rows
+    new_row_where_clause = "Machine = '{0}' AND DL_TIME = '{1}'".format(helicopter_rego, download_time)
 
-        temp_buffer_sort = arcpy.Sort_management(temp_buffer, 'in_memory\\temp_buffer_sort','Time')
-        arcpy.Append_management(temp_buffer_sort, total_polygons_fc, 'NO_TEST')
+    # Buffer the records just added to the total_lines featureclass and add them to the total_polygons featureclass,
+    # lines are grouped by the buffer style of their bucket and each group buffered in one batch
+    field_names = ['SHAPE@', 'Time', 'Speed', 'Width', 'GPS_Alt', 'Machine', 'DL_Time', 'BlockName', 'Bucket', 'Buffer']
+    spatial_ref = arcpy.Describe(total_lines_fc).spatialReference
+    line_count = 0
+    grouped_rows = {}
+    if new_lines is not None:
+        # The cache holds every line of the download with the values the update cursor gave the new rows
+        line_coordinates = cached_coordinates(new_lines, spatial_ref)
+        line_rows = ([line_coordinates(i), new_lines.time_text(i), cached_value(new_lines, 'speed', i),
+                      cached_value(new_lines, 'width', i), cached_value(new_lines, 'gps_alt', i),
+                      helicopter_rego, download_time, new_lines.block_name(i)] for i in range(len(new_lines)))
+    else:
+        line_rows = ([geometry_to_coordinates(row[0])] + list(row[1:8])
+                     for row in arcpy.da.SearchCursor(total_lines_fc, field_names, new_row_where_clause))
+    for row in line_rows:
+        line_count += 1
+        bucket = swath.bucket_class(row[3])
+        if bucket is None:
+            continue
+        buffer_style = swath.buffer_style(bucket[1], deflector)
+        grouped_rows.setdefault(buffer_style, []).append(row + [bucket[0], bucket[2]])
+    swath_rows = swath.swath_polygon_groups(grouped_rows, field_names.index('Time'), field_names.index('Buffer'))
+
+    # Add the swaths to the coverage grid a pass at a time, the applied rate includes the passes just added
+    applied_rates = [None] * len(swath_rows)
+    if coverage is not None:
+        block_index = field_names.index('BlockName')
+        cell_sets = [coverage_grid.polygon_cells(row[0], coverage.resolution) for row in swath_rows]
+        for swath_pass in coverage_grid.swath_passes(swath_rows, field_names.index('Time'), block_index):
+            coverage.add_pass([cell_sets[i] for i in swath_pass], swath_rows[swath_pass[0]][block_index], sow_rate)
+        if sow_rate:
+            # A swath narrower than a cell may not contain a cell centre, it is given the sow rate of one pass
+            applied_rates = [round(coverage.applied_rate(cells), 2) if cells else sow_rate for cells in cell_sets]
+
+    # Hectares are calculated for the new polygons only and inserted with them
+    with arcpy.da.InsertCursor(total_polygons_fc, field_names + ['Hectares', 'Applied_rate']) as cursor:
+        for row, applied_rate in zip(swath_rows, applied_rates):
+            hectares = swath.swath_hectares(row[0])
+            cursor.insertRow([coordinates_to_geometry(row[0], 'Polygon', spatial_ref)] + row[1:] + [hectares, applied_rate])
+
+    # The new passes add product over earlier polygons, their Applied_rate is recalculated from the grid
+    if coverage is not None and sow_rate and swath_rows:
+        touched_cells = set().union(*cell_sets)
+        update_overlapped_applied_rates(total_polygons_fc, coverage, touched_cells,
+                                        swath_extent_polygon(swath_rows, spatial_ref), new_row_where_clause)
+
+    # TODO add the count of new rows added to the tools output
+    return line_count
+
+def swath_extent_polygon(swath_rows, spatial_ref):
+    """Returns a rectangle polygon around the coordinates of swath rows"""
+
+    xs = []
+    ys = []
+    for row in swath_rows:
+        for part in row[0]:
+            xs.extend(point[0] for point in part)
+            ys.extend(point[1] for point in part)
+    corners = [(min(xs), min(ys)), (min(xs), max(ys)), (max(xs), max(ys)), (max(xs), min(ys)), (min(xs), min(ys))]
+    return coordinates_to_geometry([corners], 'Polygon', spatial_ref)
+
+def update_overlapped_applied_rates(total_polygons_fc, coverage, touched_cells, extent_polygon, new_row_where_clause):
+    """
+    Recalculates the Applied_rate of earlier polygons covering cells that new passes sowed
 
-        # Calculate Hectares
-        arcpy.CalculateField_management(total_polygons_fc, 'Hectares', 'round(!shape.area!/10000,4)', "PYTHON_9.3", '')
+    Parameters
+    ----------
+    total_polygons_fc : str - TotalPolygons featureclass location
+    coverage : coverage_grid.CoverageGrid - Grid the new passes have been added to
+    touched_cells : set<(column, row)> - Cells of the new swath polygons
+    extent_polygon : arcpy.Polygon - Extent of the new swath polygons, only polygons intersecting it are read
+    new_row_where_clause : str - Expression selecting the polygons just inserted, they are not updated
 
-        # Tidy up temporary files
-        arcpy.Delete_management('in_memory\\temp_buffer')
-        arcpy.Delete_management('in_memory\\temp_buffer_sort')
-        arcpy.Delete_management(null_buffer)
+    Returns
+    -------
+    rows_updated : int
+    """
+
+    # Earlier polygons without an Applied_rate were added without a sow rate and are left alone
+    polygons_lyr = arcpy.MakeFeatureLayer_management(total_polygons_fc, 'overlapped_polygons',
+                                                     "NOT ({0}) AND Applied_rate IS NOT NULL".format(new_row_where_clause))
+    arcpy.SelectLayerByLocation_management(polygons_lyr, 'INTERSECT', extent_polygon)
+
+    rows_updated = 0
+    with arcpy.da.UpdateCursor(polygons_lyr, ['SHAPE@', 'Applied_rate']) as cursor:
+        for row in cursor:
+            if not row[0]:
+                continue
+            cells = coverage_grid.polygon_cells(geometry_to_coordinates(row[0]), coverage.resolution)
+            if not cells or cells.isdisjoint(touched_cells):
+                continue
+            row[1] = round(coverage.applied_rate(cells), 2)
+            cursor.updateRow(row)
+            rows_updated += 1
+
+    arcpy.Delete_management(polygons_lyr)
+    return rows_updated
+
+def add_polygons_to_coverage(polygon_fc, coverage, sow_rates):
+    """
+    Adds every polygon in a featureclass to a coverage grid, used to build the grid
+    of a flight data gdb that already has swath polygons. Polygons are added a pass
+    at a time in the order they were sown by each machine.
+
+    Parameters
+    ----------
+    polygon_fc : str - location of the total_polygons featureclass
+    coverage : coverage_grid.CoverageGrid
+    sow_rates : dict - {helicopter_rego: sow rate in kg/ha}
+    """
+
+    field_names = ['SHAPE@', 'Time', 'BlockName', 'Machine']
+    machine_rows = {}
+    with arcpy.da.SearchCursor(polygon_fc, field_names) as cursor:
+        for row in cursor:
+            # Polygons without a shape cover no cells but are still added, so the polygon_count
+            # of the grid matches the record count of the featureclass
+            cells = coverage_grid.polygon_cells(geometry_to_coordinates(row[0]), coverage.resolution) if row[0] else set()
+            machine_rows.setdefault(row[3], []).append([cells] + list(row[1:]))
+    for machine, rows in sorted(machine_rows.items(), key=lambda item: item[0] or ''):
+        rows.sort(key=lambda row: row[1] or '')
+        for swath_pass in coverage_grid.swath_passes(rows, 1, 2):
+            coverage.add_pass([rows[i][0] for i in swath_pass], rows[swath_pass[0]][2], sow_rates.get(machine))
+
+def delete_download_rows(featureclass, helicopter_rego, download_time):
+    """
+    Deletes the rows a download added to a featureclass, used to clear the rows of
+    a processing stage that failed part way before it is run again
+
+    Parameters
+    ----------
+    featureclass : str - location of a featureclass or table with Machine and DL_Time fields
+    helicopter_rego : str - eg. 'JKC'
+    download_time : str - eg 0910
+
+    Returns
+    -------
+    rows_deleted : int
+    """
 
-        new_rows_added = int(arcpy.GetCount_management(new_row_selection).getOutput(0))
-        arcpy.Delete_management(new_row_selection)
-        arcpy.env.overwriteOutput = False
-        # TODO add the count of new rows added to the tools output
-        return new_rows_added
+    rows_deleted = 0
+    new_row_where_clause = "Machine = '{0}' AND DL_Time = '{1}'".format(helicopter_rego, download_time)
+    with arcpy.da.UpdateCursor(featureclass, ['Machine'], new_row_where_clause) as cursor:
+        for row in cursor:
+            cursor.deleteRow()
+            rows_deleted += 1
+    return rows_deleted
 
-def update_totalpoints_featureclass(total_points_fc, helicopter_rego, download_time):
+def update_totalpoints_featureclass(total_points_fc, helicopter_rego, download_time, new_points=None):
     """
     Updates the totalpoints featureclass when new tracmap data has been loaded in
 
@@ -294,6 +566,8 @@ def update_totalpoints_featureclass(total_points_fc, helicopter_rego, download_t
     total_points_fc : str - TotalLines featureclass location
     helicopter_rego : str - eg. 'JKC'
     download_time : str - eg 0910
+    new_points : download_cache.ColumnCache - Cache of the points added by the download, used
+                 to count the new points rather than querying the featureclass
     """
 
     with arcpy.da.UpdateCursor(total_points_fc, ['Machine', 'DL_Time'], 'DL_Time IS NULL') as cursor:
@@ -302,6 +576,9 @@ def update_totalpoints_featureclass(total_points_fc, helicopter_rego, download_t
             row[1] = download_time
             cursor.updateRow(row)
 
+    if new_points is not None:
+        return new_points.record_count
+
     # Expression to select newly added rows
     new_row_where_clause = "Machine = '{0}' AND DL_TIME = '{1}'".format(helicopter_rego, download_time)
 
@@ -314,113 +591,123 @@ def update_totalpoints_featureclass(total_points_fc, helicopter_rego, download_t
     arcpy.Delete_management(total_points)
     return selected_points_count
 
-def convert_secondary_points_to_lines(total_points, total_lines, flight_path, operation_start_time_table, helicopter_rego, download_time):
+def convert_secondary_points_to_lines(total_points, total_lines, flight_path, operation_start_time_table, helicopter_rego, download_time, new_points=None, new_lines=None):
     """
     Converts secondary points to lines
     This is a mega method and should be broken down into manageable chunks.
+
+    Parameters
+    ----------
+    new_points : download_cache.ColumnCache - Cache of the points added by the download, the
+                 points are read from it rather than the featureclass
+    new_lines : download_cache.ColumnCache - Cache of the lines added by the download, the
+                line starts are read from it rather than the featureclass
     """
 
     # Setup variables
     # Expression to select newly added rows
     new_row_where_clause = "Machine = '{0}' AND DL_TIME = '{1}'".format(helicopter_rego, download_time)
-    make_line = True
-    sow_line_list = []
-    # Make feature layers of featureclasses
-    new_lines_lyr = arcpy.MakeFeatureLayer_management(total_lines, 'new_lines_selection', new_row_where_clause)
-    new_points_lyr = arcpy.MakeFeatureLayer_management(total_points, 'new_points_selection', new_row_where_clause)
-    total_points_desc = arcpy.Describe(total_points)
-
-    new_records_added_count = int(arcpy.GetCount_management(new_points_lyr).getOutput(0))
+
+    if new_points is not None:
+        point_coordinates = cached_coordinates(new_points, arcpy.Describe(total_points).spatialReference)
+        flight_points = [point_coordinates(i) + (new_points.block_name(i),) for i in range(len(new_points))]
+    else:
+        with arcpy.da.SearchCursor(total_points, ['SHAPE@X','SHAPE@Y','Time','BlockName'], new_row_where_clause) as flight_points_cursor:
+            flight_points = [pnt for pnt in flight_points_cursor]
     # If there are no new records then return
-    if not new_records_added_count:
-        return new_records_added_count
+    if not flight_points:
+        return 0
 
-    speed_list = [speed[0] for speed in arcpy.da.SearchCursor(new_points_lyr,['Speed'])]
-    mean_speed = sum(speed_list) / len(speed_list)
+    if new_points is not None:
+        mean_speed = new_points.mean('speed')
+    else:
+        speed_list = [speed[0] for speed in arcpy.da.SearchCursor(total_points, ['Speed'], new_row_where_clause)]
+        mean_speed = sum(speed_list) / len(speed_list)
     if mean_speed < 40:
         nearest_point_distance = 5
     else:
         nearest_point_distance = 10
 
-    # Create a temporary fc of the start points of the newly added lines
-    new_line_start_points = arcpy.FeatureVerticesToPoints_management(new_lines_lyr, 'in_memory\\new_line_start_points','START')
-    # Identify any start points that are within 10 meters of a secondary point
-    arcpy.Near_analysis(new_points_lyr, new_line_start_points, nearest_point_distance)
-
-    total_points_desc = arcpy.Describe(total_points)
-    total_lines_desc = arcpy.Describe(total_lines)
-
-    with arcpy.da.SearchCursor(new_points_lyr, ['SHAPE@X','SHAPE@Y','Time','BlockName','NEAR_DIST','NEAR_FID', total_points_desc.oidFieldName]) as flight_points_cursor:
-        with arcpy.da.InsertCursor(flight_path, ['SHAPE@','StartTime','EndTime','Machine','DL_Time','BlockName']) as flight_path_cursor:
-            point = arcpy.Point()
-            array = arcpy.Array()
-            start_text = [s_time for s_time in arcpy.da.SearchCursor(new_points_lyr, ['Time']).next()][0]
-            start_time = datetime.datetime.strptime(start_text[0:19], '%Y-%m-%dT%H:%M:%S')
-            try: # TODO Create method to get operation_start_time
-                operation_start_time = [op_start_time for op_start_time in arcpy.da.SearchCursor(operation_start_time_table,['Operation_Start_Time'])][0][0]
-            except Exception:
-                operation_start_time = datetime.datetime.strptime('2014-11-30T07:45:10','%Y-%m-%dT%H:%M:%S')
-
-            for pnt in flight_points_cursor:
-                block = pnt[3].encode('ascii','ignore')
-                pnt_time = datetime.datetime.strptime(pnt[2][0:19],'%Y-%m-%dT%H:%M:%S')
-                if pnt_time > operation_start_time:
-                    sow_time_pnt_id_list = [[line_time, obj_id] for line_time, obj_id in arcpy.da.SearchCursor(new_line_start_points,['Time',total_lines_desc.oidFieldName]) if pnt[5] == obj_id]
-                    if len(sow_time_pnt_id_list) == 1:
-                        sow_time = datetime.datetime.strptime(sow_time_pnt_id_list[0][0][0:19], '%Y-%m-%dT%H:%M:%S')
-                        time_diff = (sow_time - pnt_time).total_seconds()
-                        pnt_id = sow_time_pnt_id_list[0][1]
-                    else:
-                        pnt_id = ''
-                    if make_line == False:
-                        start_time = pnt_time
-                    # If the NEAR_DIST field has been populated and the number of points in the array is more than 0, create a new polyline based on the array
-                    if pnt[4] > 0 and make_line == True and pnt_id not in sow_line_list and pnt_time <= sow_time and time_diff < 5:
-                        if array.count != 0:
-                            point.X = pnt[0]
-                            point.Y = pnt[1]
-                            array.add(point)
-                            end_time = pnt_time
-                            # Create a polyline object based on the array of points
-                            polyline = arcpy.Polyline(array)
-                            # Insert the feature
-                            flight_path_cursor.insertRow([polyline, start_time, end_time, helicopter_rego, download_time, block])
-                            # Clear the array
-                            array.removeAll()
-                            make_line = False
-                            if pnt_id != '':
-                                sow_line_list.append(pnt_id)
-                            start_time = pnt_time
-                        else:
-                            point.X = pnt[0]
-                            point.Y = pnt[1]
-                            array.add(point)
-                            end_time = pnt_time
-                    else:
-                        point.X = pnt[0]
-                        point.Y = pnt[1]
-                        array.add(point)
-                        make_line = True
-                        end_time = pnt_time
-            # Catch the final polyline
-            if array.count >= 1:
-                polyline = arcpy.Polyline(array)
-                array.removeAll()
-                flight_path_cursor.insertRow([polyline, start_time, end_time, helicopter_rego, download_time, block])
-
-            del flight_points_cursor, flight_path_cursor
-            arcpy.Delete_management(new_line_start_points)
-
-        # TODO Add message advising number of non sowing flight lines created
-        new_flight_path_rows = arcpy.MakeFeatureLayer_management(flight_path, 'new_flight_path_rows', new_row_where_clause)
-        flight_path_row_count = int(arcpy.GetCount_management(new_flight_path_rows).getOutput(0))
-
-        # Cleanup
-        arcpy.Delete_management(new_lines_lyr)
-        arcpy.Delete_management(new_points_lyr)
-        arcpy.Delete_management(new_flight_path_rows)
-        # TODO Add message about new rows added.
-        return flight_path_row_count
+    # Index the start point of each newly added line, the line start ids are the total_lines object ids
+    if new_lines is not None:
+        line_coordinates = cached_coordinates(new_lines, arcpy.Describe(total_lines).spatialReference)
+        line_start_rows = []
+        for i in range(len(new_lines)):
+            parts = line_coordinates(i)
+            if parts and parts[0]:
+                line_start_rows.append([new_lines.columns['oid'][i], parts[0][0][0], parts[0][0][1], new_lines.time_text(i)])
+    else:
+        with arcpy.da.SearchCursor(total_lines, ['OID@', 'SHAPE@', 'Time'], new_row_where_clause) as line_start_cursor:
+            line_start_rows = [[oid, shape.firstPoint.X, shape.firstPoint.Y, line_time] for oid, shape, line_time in line_start_cursor if shape]
+    line_start_index = spatial_index.GridIndex(nearest_point_distance)
+    for oid, x, y, line_time in line_start_rows:
+        line_start_index.add(oid, x, y)
+    line_start_seconds = time_handler.time_column_seconds([row[3] for row in line_start_rows])
+    line_start_times = dict(zip([row[0] for row in line_start_rows], line_start_seconds))
+
+    # Parse the Time column once, times are compared as seconds
+    if new_points is not None:
+        flight_point_seconds = new_points.columns['time']
+    else:
+        flight_point_seconds = time_handler.time_column_seconds([pnt[2] for pnt in flight_points])
+        flight_points = [(pnt[0], pnt[1], pnt[3]) for pnt in flight_points]
+
+    try: # TODO Create method to get operation_start_time
+        operation_start_time = [op_start_time for op_start_time in arcpy.da.SearchCursor(operation_start_time_table,['Operation_Start_Time'])][0][0]
+    except Exception:
+        operation_start_time = datetime.datetime.strptime('2014-11-30T07:45:10','%Y-%m-%dT%H:%M:%S')
+    operation_start_time = time_handler.datetime_seconds(operation_start_time)
+
+    # Find the nearest line start to each secondary point as the points are segmented
+    points = ((pnt[0], pnt[1], pnt_time, pnt[2]) + tuple(line_start_index.nearest(pnt[0], pnt[1], nearest_point_distance))
+              for pnt, pnt_time in zip(flight_points, flight_point_seconds))
+
+    # TODO Add message advising number of non sowing flight lines created
+    flight_path_row_count = 0
+    with arcpy.da.InsertCursor(flight_path, ['SHAPE@','StartTime','EndTime','Machine','DL_Time','BlockName']) as flight_path_cursor:
+        for coordinates, start_time, end_time, block in flight_path_segments.iter_flight_path(points, line_start_times, operation_start_time):
+            polyline = coordinates_to_geometry([coordinates], 'Polyline', None)
+            flight_path_cursor.insertRow([polyline, time_handler.seconds_datetime(start_time), time_handler.seconds_datetime(end_time), helicopter_rego, download_time, block])
+            flight_path_row_count += 1
+
+    # TODO Add message about new rows added.
+    return flight_path_row_count
+
+def simplify_featureclass_rows(featureclass, where_clause, tolerance, archive_file):
+    """
+    Simplifies the line geometry of the selected rows and keeps their raw vertices in an archive
+
+    Parameters
+    ----------
+    featureclass : str - location of a polyline featureclass eg. flight_path or total_lines
+    where_clause : str - Expression selecting the rows to simplify
+    tolerance : float - Simplification tolerance in the units of the featureclass
+    archive_file : str - location of the archive the raw vertices are written to, see simplify.write_vertex_archive
+
+    Returns
+    -------
+    vertex_counts : [raw_vertex_count, simplified_vertex_count]
+    """
+
+    spatial_ref = arcpy.Describe(featureclass).spatialReference
+    vertex_counts = [0, 0]
+    raw_rows = []
+    with arcpy.da.UpdateCursor(featureclass, ['OID@', 'SHAPE@'], where_clause) as cursor:
+        for oid, shape in cursor:
+            if not shape:
+                continue
+            parts = geometry_to_coordinates(shape)
+            simplified_parts = simplify.simplify_parts(parts, tolerance)
+            raw_count = simplify.vertex_count(parts)
+            simplified_count = simplify.vertex_count(simplified_parts)
+            vertex_counts[0] += raw_count
+            vertex_counts[1] += simplified_count
+            if simplified_count < raw_count:
+                raw_rows.append([oid, parts])
+                cursor.updateRow([oid, coordinates_to_geometry(simplified_parts, 'Polyline', spatial_ref)])
+    # The archive is written even if nothing was simplified, it records the download has been simplified
+    simplify.write_vertex_archive(archive_file, tolerance, raw_rows)
+    return vertex_counts
 
 def calculate_operational_area_completion_dict(treatment_area):
     """
@@ -464,7 +751,7 @@ def feature_class_as_dict(featureclass, key_field, value_fields):
     return results_dict
 
 
-def new_flight_data_summary(total_lines, total_points, total_polygons, tracmap_data_folder, helicopter_rego, download_time, sum_totals_table, sum_totals_field_names, block_area_dict, df, total_polygons_lyr_file):
+def new_flight_data_summary(total_lines, total_points, total_polygons, tracmap_data_folder, helicopter_rego, download_time, sum_totals_table, sum_totals_field_names, block_area_dict, df, total_polygons_lyr_file, new_points=None, tracmap_download_index=None):
     """
     For newly added tracmap data, this summarizes it by reading the summary.txt file in the tracmap data folder
     and adding a record to the sum_totals table
@@ -482,12 +769,25 @@ def new_flight_data_summary(total_lines, total_points, total_polygons, tracmap_d
     block_area_dict : dict - Dict of treament area block name and hectares
     df : arcpy DataFrame - DataFrame of the project map
     total_polygons_lyr_file : str - Location of total_polygons layer file
+    new_points : download_cache.ColumnCache - Cache of the points added by the download, the
+                 last point time of each block is read from it rather than total_points
+                 which is otherwise scanned once for the last point time of every block
+    tracmap_download_index : download_index.DownloadIndex - Index of the download folder, used to find
+                             the summary .txt files. If None the download folder is indexed.
 
     Returns
     -------
     Result : str - Empty string if no records returned, otherwise the summary.txt file location
     """
     new_rows_where_clause = "Machine = '{0}' AND DL_Time = '{1}'".format(helicopter_rego, download_time)
+    if new_points is not None:
+        last_point_times = new_points.last_time_text_by_block()
+    else:
+        # The latest point time of each block of the download in one pass over total_points
+        with arcpy.da.SearchCursor(total_points, ['BlockName', 'Time'], new_rows_where_clause) as points_cursor:
+            last_point_times = time_handler.last_time_by_group(points_cursor, 0, 1)
+    if tracmap_download_index is None:
+        tracmap_download_index = download_index.DownloadIndex(os.path.join(tracmap_data_folder, helicopter_rego, download_time))
     new_total_lines_lyr = arcpy.MakeFeatureLayer_management(total_lines, 'new_total_lines_lyr', new_rows_where_clause)
 
     new_row_count = int(arcpy.GetCount_management(new_total_lines_lyr).getOutput(0))
@@ -496,51 +796,35 @@ def new_flight_data_summary(total_lines, total_points, total_polygons, tracmap_d
         #TODO add message arcpy.AddMessage('No new rows to add to summary table')
         return ''
 
+    # Parse the summary files of the download once, each summary row then looks up its block's summary
+    summaries = summary_parser.load_download_summaries(tracmap_download_index)
+
     with arcpy.da.SearchCursor(total_polygons, ['Machine','DL_Time','BlockName','Bucket','Hectares'],
                                where_clause = new_rows_where_clause,
                                sql_clause=(None, 'ORDER BY Machine, BlockName, Bucket')) as get_new_polygons_cursor:
         with arcpy.da.InsertCursor(sum_totals_table,sum_totals_field_names) as sum_totals_cursor:
-            row_list = []
-            for row in get_new_polygons_cursor:
-                new_row = list(row[0:5])
-                row_selection = "Machine = '{0}' AND DL_Time = '{1}' AND BlockName = '{2}'".format(new_row[0], new_row[1], new_row[2])
-                last_points_time = [row_time[0].encode('ascii','ignore') for row_time in arcpy.da.SearchCursor(total_points, ['Time'], row_selection)][-1]
+            # The polygons of each block are consolidated into one row as they are read, hectares are summed
+            rows_added = 0
+            for row in sum_totals.consolidate_rows(get_new_polygons_cursor):
+                new_row = row[0:5]
+                last_points_time = last_point_times.get(new_row[2], '')
                 new_row.append(last_points_time[11:19])
-                source_txt_file_dir = os.path.join(tracmap_data_folder, new_row[0], new_row[1], new_row[2])
-                if not os.path.exists(source_txt_file_dir):
-                    source_txt_file_dir = os.path.join(tracmap_data_folder, new_row[0], new_row[1])
-                source_txt_file = [name for name in glob.glob(source_txt_file_dir + r'\*.txt')][0]
-                if linecache.getline(source_txt_file, 1)[:8] == 'Distance':
-                    nominal_area = float(linecache.getline(source_txt_file,3)[19:-3].strip())
-                    real_area = float(linecache.getline(source_txt_file,4)[19:-3].strip())
-                    distance_flown = float(linecache.getline(source_txt_file,1)[20:-3].strip())
-                    distance_spread = float(linecache.getline(source_txt_file,2)[19:-3].strip())
-                    new_row.extend([nominal_area, real_area, distance_flown, distance_spread])
-                elif linecache.getline(source_txt_file,1)[:4] == 'Area':
-                    nominal_area = float(linecache.getline(source_txt_file,1)[17:-3].strip())
-                    real_area = float(linecache.getline(source_txt_file,2)[17:-3].strip())
-                    distance_flown = float(linecache.getline(source_txt_file,3)[19:-3].strip())
-                    distance_spread = float(linecache.getline(source_txt_file,4)[19:-3].strip())
-                    new_row.extend([nominal_area, real_area, distance_flown, distance_spread])
+                # The summary file is in the block folder, or in the root of the download
+                source_txt_file = tracmap_download_index.summary_file(new_row[2])
+                if not source_txt_file:
+                    raise IOError("No summary .txt file found for block {0} in {1}".format(new_row[2], tracmap_download_index.download_directory))
+                summary = summaries.get(source_txt_file) or summary_parser.parse_summary_file(source_txt_file)
+                new_row.extend([summary.nominal_area, summary.real_area, summary.distance_flown, summary.distance_spread])
                 if row[2].title() in block_area_dict:
                     new_row.append(block_area_dict[row[2].title()])
                 else:
                     new_row.append(0)
                     #arcpy.AddWarning('treatmentArea feature class does not contain a block called  ' + row[2].title() + '. Check your data!')
-                row_list.append(new_row)
-            first_row = row_list[0]
-            for row in row_list[1:]:
-                if row[0:3] == first_row[0:3]:
-                    row[4] = row[4] + first_row[4]
-                    row_list.pop(row_list.index(row) - 1)
-                    first_row = row
-                else:
-                    first_row = row
-            for row in row_list:
-                sum_totals_cursor.insertRow(row)
+                sum_totals_cursor.insertRow(new_row)
+                rows_added += 1
 
     # Message advising how many rows added to the summary table
-    arcpy.AddMessage("{0} rows added to {1}".format(str(len(row_list)), sum_totals_table))
+    arcpy.AddMessage("{0} rows added to {1}".format(str(rows_added), sum_totals_table))
     try:
 
         # Update the symbology for the total_polygons layer with the newly added rows
@@ -556,44 +840,237 @@ def new_flight_data_summary(total_lines, total_points, total_polygons, tracmap_d
     arcpy.Delete_management(new_total_lines_lyr)
     return source_txt_file
 
-def summarize_flight_data(flight_data_gdb, total_polygons, sum_total_rows, df, sum_table_field_names):
+def union_geometry_json(geometry_json_list):
+    """Returns the union of esri json geometries as esri json, run in worker processes by the tiled dissolve"""
+
+    shapes = [arcpy.AsShape(geometry_json, True) for geometry_json in geometry_json_list]
+    return tiled_dissolve.pairwise_reduce(shapes, lambda shape, other_shape: shape.union(other_shape)).JSON
+
+def tiled_dissolve_total_polygons(total_polygons, dissolve_block_fc, dissolved_total_polygon_fc, tile_size, max_workers=None):
     """
-    Summarizes the current flight data. Creates a dissolved by block and total dissolved fc and a
-    csv file summarizing the polygon data.
+    Dissolves all the polygons by block and in total on several cores. The polygons are partitioned
+    into square tiles by their centroid and the polygons of each block in each tile are unioned in a
+    worker process. The tiles of each block are then unioned to stitch them together, and the blocks
+    unioned for the total. The outputs have the same fields as dissolve_total_polygons.
 
     Parameters
     ----------
+    total_polygons : str - location of the total_polygons featureclass
+    dissolve_block_fc : str - location of the polygons dissolved by BlockName, replaced
+    dissolved_total_polygon_fc : str - location of the polygons dissolved in total, replaced
+    tile_size : float - Size of the tiles in the units of total_polygons
+    max_workers : int - Number of worker processes, defaults to the number of cores
+    """
+
+    with arcpy.da.SearchCursor(total_polygons, ['BlockName', 'SHAPE@XY', 'SHAPE@JSON']) as cursor:
+        tiles = tiled_dissolve.partition(((block_name, xy[0], xy[1], shape_json) for block_name, xy, shape_json in cursor if xy), tile_size)
+    tasks = tiled_dissolve.tile_tasks(tiles)
+    with process_pool.process_pool_executor(max_workers) as executor:
+        block_names, block_pieces = tiled_dissolve.group_by_block(tasks, executor.map(union_geometry_json, [task[1] for task in tasks]))
+        block_json = list(executor.map(union_geometry_json, block_pieces))
+    total_json = union_geometry_json(block_json) if block_json else None
+
+    spatial_ref = arcpy.Describe(total_polygons).spatialReference
+    block_field = arcpy.ListFields(total_polygons, 'BlockName')[0]
+    for featureclass in [dissolve_block_fc, dissolved_total_polygon_fc]:
+        arcpy.CreateFeatureclass_management(os.path.dirname(featureclass), os.path.basename(featureclass), 'POLYGON', spatial_reference=spatial_ref)
+    add_field_to_featureclass(dissolve_block_fc, 'BlockName', 'TEXT', block_field.length)
+    add_field_to_featureclass(dissolve_block_fc, 'Hectares', 'DOUBLE')
+    add_field_to_featureclass(dissolved_total_polygon_fc, 'Hectares', 'DOUBLE')
+    with arcpy.da.InsertCursor(dissolve_block_fc, ['BlockName', 'SHAPE@', 'Hectares']) as cursor:
+        for block_name, shape_json in zip(block_names, block_json):
+            shape = arcpy.AsShape(shape_json, True)
+            cursor.insertRow([block_name, shape, round(shape.area / 10000, 4)])
+    if total_json:
+        with arcpy.da.InsertCursor(dissolved_total_polygon_fc, ['SHAPE@', 'Hectares']) as cursor:
+            shape = arcpy.AsShape(total_json, True)
+            cursor.insertRow([shape, round(shape.area / 10000, 4)])
+
+def dissolve_total_polygons(total_polygons, dissolve_block_fc, dissolved_total_polygon_fc, tile_size=None, max_workers=None):
+    """
+    Dissolves all the polygons by block and in total, replacing the dissolved featureclasses
+
+    Parameters
+    ----------
+    tile_size : float - If given the polygons are dissolved in tiles on several cores, see tiled_dissolve_total_polygons
+    max_workers : int - Number of worker processes of the tiled dissolve
+    """
+
+    for featureclass in [dissolve_block_fc, dissolved_total_polygon_fc]:
+        if featureclass_exists(featureclass):
+            arcpy.Delete_management(featureclass)
+    if tile_size:
+        tiled_dissolve_total_polygons(total_polygons, dissolve_block_fc, dissolved_total_polygon_fc, tile_size, max_workers)
+        return
+    arcpy.Dissolve_management(total_polygons, dissolve_block_fc, 'BlockName')
+    add_hectares_to_fc(dissolve_block_fc)
+    arcpy.Dissolve_management(total_polygons, dissolved_total_polygon_fc)
+    add_hectares_to_fc(dissolved_total_polygon_fc)
+
+def union_new_polygons(total_polygons, dissolve_block_fc, dissolved_total_polygon_fc, where_clause):
+    """
+    Unions the selected polygons into the dissolved by block and total dissolved featureclasses.
+    Only the blocks the polygons are in are changed.
+
+    Parameters
+    ----------
+    total_polygons : str - location of the total_polygons featureclass
+    dissolve_block_fc : str - location of the polygons dissolved by BlockName
+    dissolved_total_polygon_fc : str - location of the polygons dissolved in total
+    where_clause : str - Expression selecting the polygons not yet dissolved
 
     Returns
     -------
+    block_areas, total_area : dict, float - {block_name: hectares} of the changed blocks and the total hectares
+    """
 
+    new_polygons_lyr = arcpy.MakeFeatureLayer_management(total_polygons, 'new_dissolve_polygons', where_clause)
+    new_dissolve_block_fc = 'in_memory\\new_dissolved_by_block'
+    arcpy.Dissolve_management(new_polygons_lyr, new_dissolve_block_fc, 'BlockName')
+    with arcpy.da.SearchCursor(new_dissolve_block_fc, ['BlockName', 'SHAPE@']) as cursor:
+        new_block_shapes = dict([[block_name, shape] for block_name, shape in cursor])
+    new_total_shape = None
+    for shape in new_block_shapes.values():
+        new_total_shape = shape if new_total_shape is None else new_total_shape.union(shape)
+
+    block_areas = {}
+    with arcpy.da.UpdateCursor(dissolve_block_fc, ['BlockName', 'SHAPE@', 'Hectares']) as cursor:
+        for block_name, shape, hectares in cursor:
+            if block_name in new_block_shapes:
+                shape = shape.union(new_block_shapes.pop(block_name))
+                block_areas[block_name] = round(shape.area / 10000, 4)
+                cursor.updateRow([block_name, shape, block_areas[block_name]])
+    with arcpy.da.InsertCursor(dissolve_block_fc, ['BlockName', 'SHAPE@', 'Hectares']) as cursor:
+        for block_name, shape in new_block_shapes.items():
+            block_areas[block_name] = round(shape.area / 10000, 4)
+            cursor.insertRow([block_name, shape, block_areas[block_name]])
+
+    total_area = None
+    with arcpy.da.UpdateCursor(dissolved_total_polygon_fc, ['SHAPE@', 'Hectares']) as cursor:
+        for shape, hectares in cursor:
+            if new_total_shape is not None:
+                shape = shape.union(new_total_shape)
+            total_area = round(shape.area / 10000, 4)
+            cursor.updateRow([shape, total_area])
+            break
+    if total_area is None and new_total_shape is not None:
+        total_area = round(new_total_shape.area / 10000, 4)
+        with arcpy.da.InsertCursor(dissolved_total_polygon_fc, ['SHAPE@', 'Hectares']) as cursor:
+            cursor.insertRow([new_total_shape, total_area])
+
+    arcpy.Delete_management(new_dissolve_block_fc)
+    arcpy.Delete_management(new_polygons_lyr)
+    return block_areas, total_area or 0
+
+def update_dissolved_polygons(total_polygons, dissolve_block_fc, dissolved_total_polygon_fc, cache, rebuild=False, tile_size=None, max_workers=None):
     """
-    aprx = arcpy.mp.ArcGISProject("CURRENT")
-    map_view = aprx.listMaps('Map')[0]
+    Brings the dissolved by block and total dissolved featureclasses up to date with total_polygons.
+    The polygons added since the last update are unioned into them, they are rebuilt from all the
+    polygons if the cache does not account for every row of total_polygons. Edits to the geometry of
+    existing polygons are not detected, use rebuild after editing.
 
-    with arcpy.da.SearchCursor(total_polygons, ['BlockName']) as check_block_name:
-        check_block_list = []
-        for block_name in check_block_name:
-            check_block_list.append(block_name[0])
-        if '' not in check_block_list:
-            dissolve_block_fc = os.path.join(flight_data_gdb, 'dissolved_by_block_{0}'.format(str(time.strftime('%m%d%H%M'))))
-            arcpy.Dissolve_management(total_polygons, dissolve_block_fc, 'BlockName')
-            add_hectares_to_fc(dissolve_block_fc)
-            map_view.addDataFromPath(dissolve_block_fc)
-            # TODO add message arcpy.AddMessage(dissolved_block_fc + ' created and added to map')
-        else:
-            dissolve_block_fc = False
-            # TODO add warning message ('Some of the block name fields are empty - no dissolve by block undertaken)
+    Parameters
+    ----------
+    total_polygons : str - location of the total_polygons featureclass
+    dissolve_block_fc : str - location of the polygons dissolved by BlockName
+    dissolved_total_polygon_fc : str - location of the polygons dissolved in total
+    cache : dissolve_cache.DissolveCache - State of the dissolved featureclasses, updated and saved
+    rebuild : boolean - Dissolve all the polygons again
+    tile_size : float - Tile size of a tiled rebuild, see dissolve_total_polygons
+    max_workers : int - Number of worker processes of a tiled rebuild
 
-    # Dissolve the polygons to get an overall area
-    dissolved_total_polygon_fc = os.path.join(flight_data_gdb, 'total_dissolved_{0}'.format(str(time.strftime('%m%d%H%M'))))
-    arcpy.Dissolve_management(total_polygons, dissolved_total_polygon_fc)
-    add_hectares_to_fc(dissolved_total_polygon_fc)
-    map_view.addDataFromPath(dissolved_total_polygon_fc)
-    # TODO add message arcpy.AddMessage(dissolved_total_polygon_fc + ' created and added to map')
+    Returns
+    -------
+    rebuilt : boolean - True if the featureclasses were rebuilt
+    """
+
+    polygon_count = featureclass_record_count(total_polygons)
+    new_polygons_where_clause = cache.new_polygons_where_clause(arcpy.Describe(total_polygons).OIDFieldName)
+    with arcpy.da.SearchCursor(total_polygons, ['OID@'], new_polygons_where_clause) as cursor:
+        new_oids = [oid for oid, in cursor]
+    rebuild = rebuild or not cache.is_current(polygon_count, len(new_oids)) \
+        or not featureclass_exists(dissolve_block_fc) or not featureclass_exists(dissolved_total_polygon_fc)
+
+    if rebuild:
+        cache.clear()
+        dissolve_total_polygons(total_polygons, dissolve_block_fc, dissolved_total_polygon_fc, tile_size, max_workers)
+        block_areas = feature_class_as_dict(dissolve_block_fc, 'BlockName', ['Hectares'])
+        block_areas = dict([[block_name, values[0]] for block_name, values in block_areas.items()])
+        with arcpy.da.SearchCursor(dissolved_total_polygon_fc, ['Hectares']) as cursor:
+            total_area = next(iter(cursor), [0])[0] or 0
+        with arcpy.da.SearchCursor(total_polygons, ['OID@']) as cursor:
+            last_oid = max([oid for oid, in cursor] or [None])
+        cache.update(last_oid, polygon_count, block_areas, total_area)
+    elif new_oids:
+        block_areas, total_area = union_new_polygons(total_polygons, dissolve_block_fc, dissolved_total_polygon_fc, new_polygons_where_clause)
+        cache.update(max(new_oids), polygon_count, block_areas, total_area)
+    cache.save()
+    return rebuild
+
+def add_featureclass_to_map(map_view, featureclass):
+    """Adds the featureclass to the map unless it already has a layer of the same name"""
+
+    if not [lyr for lyr in map_view.listLayers() if lyr.name == os.path.basename(featureclass)]:
+        map_view.addDataFromPath(featureclass)
+
+def remove_dissolve_snapshots(flight_data_gdb, map_view):
+    """Removes the timestamped dissolved featureclasses earlier versions created on each summary, and their layers"""
+
+    snapshot_pattern = re.compile(r'^(dissolved_by_block|total_dissolved)_\d{8}$')
+    for lyr in map_view.listLayers():
+        if snapshot_pattern.match(lyr.name):
+            map_view.removeLayer(lyr)
+    workspace = arcpy.env.workspace
+    arcpy.env.workspace = flight_data_gdb
+    try:
+        for featureclass in arcpy.ListFeatureClasses() or []:
+            if snapshot_pattern.match(featureclass):
+                arcpy.Delete_management(os.path.join(flight_data_gdb, featureclass))
+    finally:
+        arcpy.env.workspace = workspace
+
+def summarize_flight_data(flight_data_gdb, total_polygons, sum_total_rows, df, sum_table_field_names, dissolve_block_fc=None, dissolved_total_polygon_fc=None, cache=None, rebuild=False, tile_size=None, max_workers=None):
+    """
+    Summarizes the current flight data. Updates the dissolved by block and total dissolved fcs and creates
+    a csv file summarizing the polygon data.
+
+    Parameters
+    ----------
+    flight_data_gdb : str - location of the flight data gdb
+    total_polygons : str - location of the total_polygons featureclass
+    sum_total_rows : str - location of the sum_totals table
+    df : arcpy Map - Map the dissolved featureclasses are added to, if None the map of the current project
+    sum_table_field_names : list<str> - list of the sum_totals_table field names
+    dissolve_block_fc : str - location of the polygons dissolved by BlockName, defaults to dissolved_by_block in the gdb
+    dissolved_total_polygon_fc : str - location of the polygons dissolved in total, defaults to total_dissolved in the gdb
+    cache : dissolve_cache.DissolveCache - State of the dissolved featureclasses, if None they are rebuilt
+    rebuild : boolean - Dissolve all the polygons again rather than only those added since the last summary
+    tile_size : float - If given a rebuild dissolves the polygons in tiles of this size on several cores
+    max_workers : int - Number of worker processes of a tiled rebuild, defaults to the number of cores
+
+    Returns
+    -------
+    csv_file : str - None if some polygons have no block name
+    """
+    map_view = df
+    if map_view is None:
+        aprx = arcpy.mp.ArcGISProject("CURRENT")
+        map_view = aprx.listMaps('Map')[0]
+
+    dissolve_block_fc = dissolve_block_fc or os.path.join(flight_data_gdb, 'dissolved_by_block')
+    dissolved_total_polygon_fc = dissolved_total_polygon_fc or os.path.join(flight_data_gdb, 'total_dissolved')
+    if cache is None:
+        cache = dissolve_cache.DissolveCache(None)
+
+    # Union the polygons added since the last summary into the dissolved featureclasses, which replace the old snapshots
+    remove_dissolve_snapshots(flight_data_gdb, map_view)
+    update_dissolved_polygons(total_polygons, dissolve_block_fc, dissolved_total_polygon_fc, cache, rebuild, tile_size, max_workers)
+    add_featureclass_to_map(map_view, dissolve_block_fc)
+    add_featureclass_to_map(map_view, dissolved_total_polygon_fc)
+    # TODO add message arcpy.AddMessage(dissolved_total_polygon_fc + ' updated')
 
     # Order the sum_totals table by BlockName and Last_Log_Time and export to a csv file
-    if dissolve_block_fc:
+    if not cache.has_unnamed_block():
         csv_table_field_names = sum_table_field_names[2:]
         csv_table_field_names.append('Dissolved area')
         csv_table_field_names.append('Percentage sown')
@@ -601,43 +1078,9 @@ def summarize_flight_data(flight_data_gdb, total_polygons, sum_total_rows, df, s
         with open(csv_file, 'w') as export_file:
             csv_write = csv.writer(export_file, delimiter=',', quotechar='"', quoting=csv.QUOTE_NONNUMERIC)
             csv_write.writerow(csv_table_field_names)
+            # The dissolved areas are held by the cache, each block's rows are consolidated as the sum_totals table is read
             with arcpy.da.SearchCursor(sum_total_rows, sum_table_field_names[2:], sql_clause=(None, 'ORDER BY BlockName, Last_log_time')) as csv_output:
-                csv_output_list = []
-                for row in csv_output:
-                    csv_output_list.append(list(row))
-                row_count = 0
-                for row in csv_output_list:
-                    dissolved_block_area = [block_area for block_name, block_area in arcpy.da.SearchCursor(dissolve_block_fc,['BlockName','Hectares']) if block_name == row[0]]
-                    if row_count == 0:
-                        row.append(round(dissolved_block_area[0], 4))
-                        if row[8] != 0:
-                            row.append(round((row[2] / row[8]) * 100, 2))
-                        else:
-                            row.append(0)
-                        first_row = row
-                    else:
-                        if row[0] == first_row[0]:
-                            row[2] += first_row[2]
-                            row.append(round(dissolved_block_area[0], 4))
-                            if row[8] != 0:
-                                row.append(round((row[2] / row[8]) * 100, 2))
-                            else:
-                                row.append(0)
-                            first_row = row
-                        else:
-                            row.append(round(dissolved_block_area[0], 4))
-                            if row[8] != 0:
-                                row.append(round((row[2] / row[8]) * 100, 2))
-                            else:
-                                row.append(0)
-                            csv_write.writerow(first_row)
-                            first_row = row
-                    if row_count +1 == len(csv_output_list):
-                        csv_write.writerow(row)
-                    row_count += 1
-                    csv_write.writerow('')
-                    dissolved_total_polygon_area = [total_area for total_area in arcpy.da.SearchCursor(dissolved_total_polygon_fc,['Hectares'])]
-                    csv_write.writerow(['Total dissolved area','','','','','','','','',dissolved_total_polygon_area[0][0],''])
+                csv_write.writerows(sum_totals.csv_summary_rows(csv_output, cache.block_areas, cache.total_area))
         return csv_file
 
         # TODO addmessage arcpy.AddMessage('sum_totals sorted and saved to ' + csv_file)
@@ -0,0 +1,164 @@
+# Flightline Project
+
+# Description:
+# Splits the secondary points of a download into the non sowing flight path.
+# Contains no arcpy so the segmentation can be tested on plain lists of points.
+# Run python -m flightline.flight_path to benchmark the segmenter.
+
+import argparse
+import math
+import time
+import tracemalloc
+
+SOW_START = 'sow_start'
+TIME_GAP = 'time_gap'
+BLOCK_CHANGE = 'block_change'
+BREAK_RULES = [SOW_START, TIME_GAP, BLOCK_CHANGE]
+
+# A point finishes a segment if it is near the start of a sowing line starting within this many seconds
+__sow_start_seconds__ = 5
+# A gap in the secondary points longer than this, e.g. landing to reload, finishes a segment
+__time_gap_seconds__ = 30
+
+
+def is_sow_start(point_time, near_distance, line_start_time):
+    """
+    Returns True if a point near a line start is where the helicopter starts sowing the line. A point
+    exactly on the line start has a near_distance of 0, no line start within the radius is None or -1.
+    """
+
+    return near_distance is not None and near_distance >= 0 and line_start_time is not None \
+        and point_time <= line_start_time and line_start_time - point_time < __sow_start_seconds__
+
+
+def iter_flight_path(points, line_start_times, operation_start_time, break_rules=BREAK_RULES, gap_seconds=__time_gap_seconds__):
+    """
+    Yields the flight path segments of the secondary points as each one is finished.
+    Only the coordinates of the current segment are held, each segment gets a new list.
+
+    A segment is finished by the enabled break rules
+    SOW_START - at a point near the start of a sowing line which starts within 5 seconds of it,
+                the point is the last point of the segment and each line start is only used once
+    TIME_GAP - before a point more than gap_seconds after the previous point
+    BLOCK_CHANGE - before a point in a different block to the previous point
+
+    Parameters
+    ----------
+    points : iterable<(x, y, time, block_name, near_distance, near_line_start)> - secondary points in
+             time order, time in seconds, near_line_start is the id of the nearest line start or None
+    line_start_times : dict - {line start id: time in seconds}
+    operation_start_time : int - Points at or before this time in seconds are ignored
+    break_rules : list<str> - Rules that finish a segment, see BREAK_RULES
+    gap_seconds : int - Gap in seconds for the TIME_GAP rule
+
+    Yields
+    ------
+    segment : [coordinates, start_time, end_time, block_name] - coordinates is a list<(x, y)> of at
+              least 2 points, a lone point between breaks is not a line and is dropped
+    """
+
+    unknown_rules = set(break_rules) - set(BREAK_RULES)
+    if unknown_rules:
+        raise ValueError("Unknown break rules {0}, expected {1}".format(sorted(unknown_rules), BREAK_RULES))
+    break_on_sow_start = SOW_START in break_rules
+    break_on_time_gap = TIME_GAP in break_rules
+    break_on_block_change = BLOCK_CHANGE in break_rules
+
+    sown_line_starts = set()
+    coordinates = []
+    start_time = end_time = block_name = None
+    for x, y, point_time, point_block_name, near_distance, near_line_start in points:
+        if point_time <= operation_start_time:
+            continue
+        if coordinates and ((break_on_time_gap and point_time - end_time > gap_seconds) or
+                            (break_on_block_change and point_block_name != block_name)):
+            if len(coordinates) > 1:
+                yield [coordinates, start_time, end_time, block_name]
+            coordinates = []
+        if not coordinates:
+            start_time = point_time
+        coordinates.append((x, y))
+        end_time = point_time
+        block_name = point_block_name
+
+        if break_on_sow_start and near_line_start not in sown_line_starts and len(coordinates) > 1 \
+                and is_sow_start(point_time, near_distance, line_start_times.get(near_line_start)):
+            sown_line_starts.add(near_line_start)
+            yield [coordinates, start_time, end_time, block_name]
+            coordinates = []
+
+    # Catch the final segment
+    if len(coordinates) > 1:
+        yield [coordinates, start_time, end_time, block_name]
+
+
+def segment_flight_path(points, line_start_times, operation_start_time, break_rules=BREAK_RULES, gap_seconds=__time_gap_seconds__):
+    """Returns the flight path segments of the secondary points as a list, see iter_flight_path"""
+
+    return list(iter_flight_path(points, line_start_times, operation_start_time, break_rules, gap_seconds))
+
+
+def benchmark_points(point_count, points_per_line=120, line_spacing=60.0):
+    """
+    Yields synthetic secondary points for the benchmark, a helicopter flying back and forth
+    across a block at one point a second and stopping near the start of each sowing line
+
+    Returns
+    -------
+    points : generator<(x, y, time, block_name, near_distance, near_line_start)>
+    """
+
+    for i in range(point_count):
+        line, step = divmod(i, points_per_line)
+        x = step * 10.0 if line % 2 == 0 else (points_per_line - step) * 10.0
+        y = line * line_spacing + 5.0 * math.sin(step / 10.0)
+        if step == points_per_line - 1:
+            yield (x, y, i, 'Block{0}'.format(line // 50), 4.0, line)
+        else:
+            yield (x, y, i, 'Block{0}'.format(line // 50), None, None)
+
+
+def benchmark(point_count, break_rules=BREAK_RULES, trace_memory=False):
+    """
+    Times segmenting point_count synthetic points
+
+    Returns
+    -------
+    result : dict - {'points', 'segments', 'seconds', 'points_per_second', 'peak_memory'}
+                    peak_memory is in bytes, None unless trace_memory
+    """
+
+    points_per_line = 120
+    line_start_times = dict([(line, line * points_per_line + points_per_line + 1) for line in range(point_count // points_per_line + 1)])
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    segment_count = 0
+    for segment in iter_flight_path(benchmark_points(point_count, points_per_line), line_start_times, -1, break_rules):
+        segment_count += 1
+    seconds = time.perf_counter() - start
+    peak_memory = None
+    if trace_memory:
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {'points': point_count, 'segments': segment_count, 'seconds': seconds,
+            'points_per_second': point_count / seconds if seconds else None, 'peak_memory': peak_memory}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks the flight path segmenter on synthetic secondary points")
+    parser.add_argument('--points', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--break-rules', nargs='+', choices=BREAK_RULES, default=BREAK_RULES)
+    parser.add_argument('--trace-memory', action='store_true', help="Report the peak memory, slows the segmenter down")
+    args = parser.parse_args(argv)
+
+    for point_count in args.points:
+        result = benchmark(point_count, args.break_rules, args.trace_memory)
+        message = "{points} points, {segments} segments in {seconds:.3f}s, {points_per_second:,.0f} points/s".format(**result)
+        if result['peak_memory'] is not None:
+            message += ", peak memory {0:,} bytes".format(result['peak_memory'])
+        print(message)
+
+
+if __name__ == '__main__':
+    main()
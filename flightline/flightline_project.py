@@ -2,17 +2,29 @@ import os
 from flightline import folder_handler
 from flightline import config_handler
 from flightline import featureclass_handler
+from flightline import tracmap_data
+from flightline import process_pool
+from flightline import ingest_manifest
+from flightline import copy_handler
+from flightline import time_handler
+from flightline import download_cache
+from flightline import download_index
+from flightline import coverage_grid
+from flightline import simplify
+from flightline import dissolve_cache
 import json
 import arcpy
 import time
-from distutils import dir_util
 import uuid
+import contextlib
 
 # Main class that manages the flightline project
 
 
 class FlightlineProject(object):
 
+    # Download indexes are kept on the class so they are not saved to the projectconfig.json
+    __download_indexes__ = {}
 
     def __init__(self, project_folder):
         #TODO remove hardcoded values below into .json file
@@ -20,6 +32,7 @@ class FlightlineProject(object):
         self.__load_project_folder__(project_folder)
         self.project_setup_json = None
         self.__projectconfig_name__ = "projectconfig.json"
+        self.__ingest_manifest_name__ = "ingest_manifest.json"
         self.__config_folder_name__ = "config"
         self.__data_folder_name__ = 'data'
         self.__maps_folder_name__ = "maps"
@@ -41,7 +54,26 @@ class FlightlineProject(object):
         self.__sum_totals_table_name__ = "sum_totals"
         self.__treatment_area_fc_name__ = "treatment_area"
         self.__tracmap_data_projection__ = 4326
+        # UTC offset tracmap version 1 units record their times in, +1200 outside daylight saving
+        self.tracmap_utc_offset = time_handler.__default_utc_offset__
         self.__block_field_name__ = 'HeliBlkNm'
+        self.__dedup_index_folder_name__ = 'indexes'
+        self.__log_shapefile_name__ = 'log.shp'
+        self.__secondary_shapefile_name__ = 'secondary.shp'
+        self.__lines_cache_name__ = 'lines'
+        self.__coverage_grid_folder_name__ = 'coverage'
+        # Cell size in metres of the grid the sown area is accumulated in
+        self.coverage_grid_resolution = 5.0
+        self.__vertex_archive_folder_name__ = 'vertex_archive'
+        self.__dissolve_cache_folder_name__ = 'dissolve'
+        self.__dissolved_by_block_fc_name__ = 'dissolved_by_block'
+        self.__total_dissolved_fc_name__ = 'total_dissolved'
+        # Tile size in metres to rebuild the dissolved polygons in tiles on several cores, None uses the Dissolve tool
+        self.dissolve_tile_size = None
+        self.dissolve_max_workers = None
+        # Tolerance in metres the flight path and total lines of each download are simplified with, None keeps every vertex
+        self.simplify_tolerance = None
+        self.__points_cache_name__ = 'points'
 
         self.operation_start_time = None
         self.operation_start_datetime = None
@@ -55,6 +87,7 @@ class FlightlineProject(object):
 
         self.csv_summaries = []
         self.copied_tracmap_datasets = []
+        self.ingested_tracmap_datasets = []
         self.flight_data_gdbs = [self.__flight_data_gdb_name__]
         self.__instance_id__ = None
         self.__set_unique_instance_id__()
@@ -107,6 +140,10 @@ class FlightlineProject(object):
     def project_config_location(self):
         return os.path.join(self.project_folder,self.__projectconfig_name__)
 
+    @property
+    def ingest_manifest_location(self):
+        return os.path.join(self.project_folder, self.__ingest_manifest_name__)
+
     @property
     def total_polygons_fc(self):
         return os.path.join(self.flight_data_gdb_location, self.__total_polygons_fc_name__)
@@ -296,125 +333,526 @@ class FlightlineProject(object):
 
                 map_view.addLayer(new_lyr, "TOP")
 
-    def copy_tracmap_data(self, source_folder, helicopter_rego, download_time):
+    def copy_tracmap_data(self, source_folder, helicopter_rego, download_time, max_workers=None):
         """
-        Copies tracmap helicopter data from source folder into the projects tracmap data store folder
+        Copies tracmap helicopter data from source folder into the projects tracmap data store folder.
+        Files are copied concurrently and verified, the download folder only appears once the
+        copy is complete and an interrupted copy is resumed the next time it is run.
         Parameters
         ---------
         source_folder : str - Folder location where the tarcmap data is coming from
         helicopter_rego : str - 3 character string, must exist in the helicopters table
         download_time : str - Time of download eg 0910
+        max_workers : int - Number of files copied at once
 
         Returns
         -------
-        result : boolean
+        result : copy_handler.CopyResult - False if the download has already been copied
         """
 
         destination_directory = os.path.join(self.tracmap_data_folder_location, helicopter_rego, download_time)
         helicopter_directory = os.path.join(self.tracmap_data_folder_location, helicopter_rego)
         if destination_directory in self.copied_tracmap_datasets:
             return False
-        self.copied_tracmap_datasets.append(destination_directory)
         if not os.path.exists(helicopter_directory):
             os.mkdir(helicopter_directory)
-        if not os.path.exists(destination_directory):
-            dir_util.copy_tree(source_folder, destination_directory)
+        if os.path.exists(destination_directory):
+            result = copy_handler.CopyResult(0, 0, 0, 0.0, 0.0)
+        else:
+            result = copy_handler.copy_tree_verified(source_folder, destination_directory, max_workers)
+            self.__download_indexes__.pop(destination_directory, None)
+        # Only recorded once the copy has completed so a failed copy can be run again
+        self.copied_tracmap_datasets.append(destination_directory)
 
-        return True
+        return result
 
-    @staticmethod
-    def merge_tracmap_data_to_flight_data_gdb(shapefile_name, downloaded_data_directory, destination_featureclass, coordinate_system):
+    def download_index(self, download_directory):
         """
-        Merges data from the specified shapefile into the flight data gdb datasets
+        Returns the index of the files in a download. The download folder is only
+        scanned the first time, the index is then reused by the merge and summary.
+
+        Parameters
+        ----------
+        download_directory : str - eg. ./TracMapData/HelicopterRego/DownloadTime
+
+        Returns
+        -------
+        index : download_index.DownloadIndex
+        """
+        if download_directory not in self.__download_indexes__:
+            self.__download_indexes__[download_directory] = download_index.DownloadIndex(download_directory)
+        return self.__download_indexes__[download_directory]
+
+    def dedup_index_location(self, featureclass):
+        """
+        Returns the location of the Time/Speed key file for a featureclass.
+        Key files are kept per flight data gdb so a new gdb starts a new index.
+        """
+        gdb_name = os.path.splitext(os.path.basename(os.path.dirname(featureclass)))[0]
+        index_name = "{0}_{1}.keys".format(gdb_name, os.path.basename(featureclass))
+        return os.path.join(self.config_folder_location, self.__dedup_index_folder_name__, index_name)
+
+    def coverage_grid_location(self):
+        """Returns the folder of the coverage grid, grids are kept per flight data gdb like the key files"""
+        gdb_name = os.path.splitext(os.path.basename(self.flight_data_gdb_location))[0]
+        return os.path.join(self.config_folder_location, self.__coverage_grid_folder_name__, gdb_name)
+
+    def load_coverage_grid(self):
+        """
+        Loads the coverage grid of the sown area. The grid is rebuilt from total_polygons if it
+        does not hold the same polygons or the coverage_grid_resolution has been changed.
+
+        Returns
+        -------
+        coverage : coverage_grid.CoverageGrid
+        """
+        grid_folder = self.coverage_grid_location()
+        polygon_count = featureclass_handler.featureclass_record_count(self.total_polygons_fc)
+        if coverage_grid.CoverageGrid.exists(grid_folder):
+            coverage = coverage_grid.CoverageGrid(grid_folder)
+            if coverage.complete and coverage.polygon_count == polygon_count and coverage.resolution == self.coverage_grid_resolution:
+                return coverage
+            coverage.close()
+            coverage_grid.CoverageGrid.remove(grid_folder)
+        coverage = coverage_grid.CoverageGrid(grid_folder, self.coverage_grid_resolution)
+        if polygon_count:
+            featureclass_handler.add_polygons_to_coverage(self.total_polygons_fc, coverage, self.helicopter_sow_rates())
+        return coverage
+
+    def helicopter_sow_rates(self):
+        """Returns the sow rate in kg/ha of each helicopter in the helicopter_info table, {helicopter_rego: sow_rate}"""
+        helicopter_info = featureclass_handler.feature_class_as_dict(self.helicopter_info_table, self.__helicopter_info_regno_field_name__, ['sow_rate'])
+        return dict([[helicopter_rego, values[0]] for helicopter_rego, values in helicopter_info.items()])
+
+    def coverage_statistics(self):
+        """
+        Returns the sowing statistics to date from the coverage grid, see coverage_grid.CoverageGrid.statistics
+
+        Returns
+        -------
+        statistics : dict - {'total': statistics, 'blocks': {block_name: statistics}}, None if there is no grid
+        """
+        grid_folder = self.coverage_grid_location()
+        if not coverage_grid.CoverageGrid.exists(grid_folder):
+            return None
+        with coverage_grid.CoverageGrid(grid_folder) as coverage:
+            return {'total': coverage.statistics(), 'blocks': coverage.block_statistics()}
+
+    def vertex_archive_location(self, featureclass, helicopter_rego, download_time):
+        """Returns the location of the archive of the raw vertices of a download, kept per flight data gdb like the coverage grid"""
+        gdb_name = os.path.splitext(os.path.basename(self.flight_data_gdb_location))[0]
+        return os.path.join(self.config_folder_location, self.__vertex_archive_folder_name__, gdb_name,
+                            os.path.basename(featureclass), simplify.archive_file_name(helicopter_rego, download_time))
+
+    def simplify_new_flight_data(self, helicopter_rego, download_time):
+        """
+        Simplifies the flight path and total lines added by a download with the simplify_tolerance,
+        the raw vertices are archived. A download is only simplified once, when it has no archive.
+
+        Returns
+        -------
+        vertex_counts : dict - {featureclass name: [raw_vertex_count, simplified_vertex_count]}, None if simplify_tolerance is not set
+        """
+        if not self.simplify_tolerance:
+            return None
+        new_row_where_clause = "Machine = '{0}' AND DL_TIME = '{1}'".format(helicopter_rego, download_time)
+        vertex_counts = {}
+        for featureclass in [self.total_lines_fc, self.flight_path_fc]:
+            archive_file = self.vertex_archive_location(featureclass, helicopter_rego, download_time)
+            if os.path.exists(archive_file):
+                continue
+            vertex_counts[os.path.basename(featureclass)] = featureclass_handler.simplify_featureclass_rows(
+                featureclass, new_row_where_clause, self.simplify_tolerance, archive_file)
+        return vertex_counts
+
+    def dissolve_cache_location(self):
+        """Returns the location of the dissolve cache state, kept per flight data gdb like the coverage grid"""
+        gdb_name = os.path.splitext(os.path.basename(self.flight_data_gdb_location))[0]
+        return os.path.join(self.config_folder_location, self.__dissolve_cache_folder_name__, "{0}.json".format(gdb_name))
+
+    @property
+    def dissolved_by_block_fc(self):
+        return os.path.join(self.flight_data_gdb_location, self.__dissolved_by_block_fc_name__)
+
+    @property
+    def total_dissolved_fc(self):
+        return os.path.join(self.flight_data_gdb_location, self.__total_dissolved_fc_name__)
+
+    def manifest_destination_name(self, featureclass):
+        """Returns the name a destination featureclass is recorded under in the ingest manifest"""
+        return os.path.relpath(featureclass, self.project_folder)
+
+    def load_ingest_manifest(self):
+        """
+        Loads the manifest of shapefiles already merged into the flight data gdb.
+        Destinations that have been replaced since the manifest was saved are forgotten.
+
+        Returns
+        -------
+        manifest : ingest_manifest.IngestManifest
+        """
+        manifest = ingest_manifest.IngestManifest(self.ingest_manifest_location)
+        manifest.load()
+        for featureclass in [self.total_lines_fc, self.total_points_fc]:
+            manifest.validate_destination(self.manifest_destination_name(featureclass),
+                                          featureclass_handler.featureclass_record_count(featureclass))
+        return manifest
+
+    def prepare_tracmap_shapefiles(self, shapefile_name, downloaded_data_directory, coordinate_system, manifest=None, destination_featureclass=None):
+        """
+        Returns the shapefiles in the download that can be merged. Each shapefile is validated
+        from its headers before any arcpy call, shapefiles that are empty, not points or polylines
+        or not a known tracmap version are skipped. The geometry of the others is repaired and
+        their .prj file written if the projection is missing.
 
         Parameters
         ----------
         shapefile_name : str - eg.. log.shp, secondary.shp
         downloaded_data_directory : str - eg. ./TracMapData/HelicopterRego/DownloadTime
-        destination_featureclass : str - Location of the destination_featureclass featureclass
-        coordinate_system - arcpy.SpatialReference()
+        coordinate_system - arcpy.SpatialReference() or its exported string eg. default_tracmap_data_projection_system
+        manifest : ingest_manifest.IngestManifest - If given, shapefiles already merged
+                   into the destination_featureclass are skipped
+        destination_featureclass : str - Location of the destination featureclass
 
         Returns
         -------
-        data_merged : boolean
+        shapefile_list : list<str>
         """
 
-        # Get list of shapefiles in the download_data_directory
-        shapefile_list = featureclass_handler.directory_shapefile_list(shapefile_name, downloaded_data_directory)
-        # Loop through each shapefile
-        for shapefile in shapefile_list:
-            # Get feature count, if empty then don't process shapefile
-            feature_count = featureclass_handler.featureclass_record_count(shapefile)
-            if feature_count == 0:
-                # TODO post warning saying shapefile contains no data
+        spatial_reference_wkt = tracmap_data.coordinate_system_wkt(coordinate_system)
+        shapefile_list = []
+        for shapefile in self.download_index(downloaded_data_directory).shapefile_list(shapefile_name):
+            # Skip shapefiles whose content has already been merged
+            if manifest and manifest.contains(shapefile, self.manifest_destination_name(destination_featureclass)):
                 continue
-            # Get shapetype, make sure is of type 'Polyline', 'Point'
-            shape_type = featureclass_handler.featureclass_shape_type(shapefile)
-            if shape_type not in ['Polyline','Point']:
-                # TODO post error saying that shapefile is not of type Polyline
+            validation = tracmap_data.validate_tracmap_shapefile(shapefile)
+            if not validation.valid:
+                arcpy.AddWarning("{0}, skipped".format(validation.reason))
                 continue
             # Repair the geometry
             featureclass_handler.repair_geometry(shapefile)
 
             # Define the projection if not alreay defined
-            featureclass_handler.define_projection(shapefile, coordinate_system)
+            if validation.spatial_reference_wkt is None:
+                tracmap_data.write_projection_file(shapefile, spatial_reference_wkt)
+            if manifest:
+                manifest.refresh_signature(shapefile)
+            shapefile_list.append(shapefile)
+
+        return shapefile_list
+
+    def merge_tracmap_data_to_flight_data_gdb(self, shapefile_name, downloaded_data_directory, destination_featureclass, coordinate_system, parsed_shapefiles=None, manifest=None, cache_name=None):
+        """
+        Merges data from the specified shapefile into the flight data gdb datasets
 
+        Parameters
+        ----------
+        shapefile_name : str - eg.. log.shp, secondary.shp
+        downloaded_data_directory : str - eg. ./TracMapData/HelicopterRego/DownloadTime
+        destination_featureclass : str - Location of the destination_featureclass featureclass
+        coordinate_system - arcpy.SpatialReference()
+        parsed_shapefiles : list<tracmap_data.ParsedShapefile> - Shapefiles already parsed by a worker
+                            process. If None the shapefiles are read from the downloaded_data_directory
+        manifest : ingest_manifest.IngestManifest - Manifest of shapefiles already merged, if None
+                   the manifest is loaded and saved by this method
+        cache_name : str - If given the rows added are written to the download cache of this name
+                     eg. 'lines', see load_download_cache
+
+        Returns
+        -------
+        rows_added : int
+        """
+
+        save_manifest = manifest is None
+        if save_manifest:
+            manifest = self.load_ingest_manifest()
+        destination_name = self.manifest_destination_name(destination_featureclass)
+
+        if parsed_shapefiles is None:
+            shapefile_list = self.prepare_tracmap_shapefiles(shapefile_name, downloaded_data_directory, coordinate_system,
+                                                             manifest, destination_featureclass)
+            # Stream the records straight from each shapefile
+            parsed_shapefiles = (tracmap_data.parse_tracmap_shapefile(downloaded_data_directory, shapefile, self.tracmap_utc_offset)
+                                 for shapefile in shapefile_list)
+
+        key_index = featureclass_handler.load_dedup_index(destination_featureclass,
+                                                          self.dedup_index_location(destination_featureclass))
+        cache_builder = None
+        cache_folder = download_cache.cache_folder_location(downloaded_data_directory)
+        if cache_name:
+            cache_builder = download_cache.ColumnCacheBuilder()
+            # Rows added by an earlier merge of the download are kept in the cache
+            if download_cache.ColumnCache.exists(cache_folder, cache_name):
+                with download_cache.ColumnCache(cache_folder, cache_name) as cache:
+                    cache_builder.add_cache(cache)
+        rows_added = 0
+        for parsed_shapefile in parsed_shapefiles:
+            if parsed_shapefile.field_list is None:
+                arcpy.AddWarning("{0} fields are not a known tracmap version, skipped".format(parsed_shapefile.shapefile))
+                continue
             # Merge the tracmap data
-            featureclass_handler.merge_tracmap_data_featureclass(downloaded_data_directory, shapefile, destination_featureclass)
+            shapefile_rows_added = featureclass_handler.merge_parsed_tracmap_shapefile(parsed_shapefile, destination_featureclass,
+                                                                                       key_index, coordinate_system, cache_builder)
+            manifest.record(parsed_shapefile.shapefile, destination_name, shapefile_rows_added, key_index.record_count)
+            rows_added += shapefile_rows_added
+
+        key_index.save()
+        if save_manifest:
+            manifest.save()
+        if cache_builder is not None and rows_added:
+            cache_builder.write(cache_folder, cache_name)
+        return rows_added
+
+    def load_download_cache(self, helicopter_rego, download_time, cache_name):
+        """
+        Returns the cache of the rows a download added to the flight data gdb
+
+        Parameters
+        ----------
+        helicopter_rego : str - 3 character string, must exist in the helicopters table
+        download_time : str - Time of download eg 0910
+        cache_name : str - 'lines' for total_lines or 'points' for total_points
+
+        Returns
+        -------
+        cache : download_cache.ColumnCache - None if the download has not been cached
+        """
+
+        download_directory = os.path.join(self.tracmap_data_folder_location, helicopter_rego, download_time)
+        cache_folder = download_cache.cache_folder_location(download_directory)
+        if not download_cache.ColumnCache.exists(cache_folder, cache_name):
+            return None
+        return download_cache.ColumnCache(cache_folder, cache_name)
+
+    def process_tracmap_download(self, helicopter_rego, download_time, coordinate_system, deflector=False, map_view=None, parsed_download=None, manifest=None):
+        """
+        Merges a download already copied into the project into the flight data gdb,
+        updates total lines, total points and flight path and summarizes the new data
+
+        Parameters
+        ----------
+        helicopter_rego : str - 3 character string, must exist in the helicopters table
+        download_time : str - Time of download eg 0910
+        coordinate_system - arcpy.SpatialReference()
+        deflector : boolean - Deflector bucket in use
+        map_view : arcpy Map - Map of the project, used to refresh the total_polygons symbology
+        parsed_download : dict - Result of tracmap_data.parse_tracmap_download, if None
+                          the shapefiles are read from the download directory
+        manifest : ingest_manifest.IngestManifest - Manifest of shapefiles already merged and the stages each download
+                   has finished, if None it is loaded. It is saved as each stage finishes.
+
+        Returns
+        -------
+        result : dict - Counts of the records added, the summary file used, the sowing statistics to date, see coverage_statistics,
+                 and the vertex counts of the simplified geometry, see simplify_new_flight_data
+        """
+
+        download_directory = os.path.join(self.tracmap_data_folder_location, helicopter_rego, download_time)
+        parsed_download = parsed_download or {}
+        result = {'lines_added': 0, 'points_added': 0, 'flight_path_added': 0, 'summary': '', 'coverage': None, 'simplified': None}
+        if manifest is None:
+            manifest = self.load_ingest_manifest()
+        # Each stage is recorded once it has finished, a download that failed part way is resumed from the first stage not finished
+        download_name = os.path.relpath(download_directory, self.project_folder)
+        finished_stages = manifest.finished_stages(download_name)
+
+        def finish_stage(stage):
+            manifest.record_stage(download_name, stage)
+            manifest.save()
+
+        if 'lines' not in finished_stages:
+            # Copy new rows in the log shapefiles to the totalLines feature class
+            self.merge_tracmap_data_to_flight_data_gdb(self.__log_shapefile_name__, download_directory, self.total_lines_fc,
+                                                       coordinate_system, parsed_download.get(self.__log_shapefile_name__), manifest,
+                                                       self.__lines_cache_name__)
+
+            # Update total_lines with the Machine and DL_Times etc - make sure 'Buffer is not empty
+            result['lines_added'] = self.update_total_lines_featureclass(helicopter_rego, download_time, deflector)
+            finish_stage('lines')
+        result['coverage'] = self.coverage_statistics()
+
+        if 'points' not in finished_stages:
+            # Copy new rows in the secondary shapefiles to the totalPoints featureclass
+            self.merge_tracmap_data_to_flight_data_gdb(self.__secondary_shapefile_name__, download_directory, self.total_points_fc,
+                                                       coordinate_system, parsed_download.get(self.__secondary_shapefile_name__), manifest,
+                                                       self.__points_cache_name__)
+            result['points_added'] = self.update_total_points_featureclass(helicopter_rego, download_time, deflector)
+            finish_stage('points')
+
+        if 'flight_path' not in finished_stages:
+            # Convert the secondary points to lines
+            result['flight_path_added'] = self.covert_secondary_points_to_lines(helicopter_rego, download_time)
+            finish_stage('flight_path')
+
+        if 'summary' not in finished_stages:
+            # Summarize new flight data
+            result['summary'] = self.summarize_new_flight_data(helicopter_rego, download_time, map_view)
+            finish_stage('summary')
+
+        if 'simplified' not in finished_stages:
+            # Simplify the new geometry once everything has been calculated from the raw vertices
+            result['simplified'] = self.simplify_new_flight_data(helicopter_rego, download_time)
+            finish_stage('simplified')
+        return result
+
+    def ingest_tracmap_download(self, source_folder, helicopter_rego, download_time, coordinate_system, deflector=False, map_view=None):
+        """
+        Copies a tracmap download into the project and processes it
+
+        Parameters
+        ----------
+        source_folder : str - Folder location where the tarcmap data is coming from
+        helicopter_rego : str - 3 character string, must exist in the helicopters table
+        download_time : str - Time of download eg 0910
+        coordinate_system - arcpy.SpatialReference()
+        deflector : boolean - Deflector bucket in use
+        map_view : arcpy Map - Map of the project
+
+        Returns
+        -------
+        result : dict - See process_tracmap_download, with 'copied' added
+        """
+
+        copied = self.copy_tracmap_data(source_folder, helicopter_rego, download_time)
+        result = self.process_tracmap_download(helicopter_rego, download_time, coordinate_system, deflector, map_view)
+        result['copied'] = copied
+        self.mark_tracmap_data_ingested(helicopter_rego, download_time)
+        return result
+
+    def mark_tracmap_data_ingested(self, helicopter_rego, download_time):
+        """
+        Records a download as ingested once it has been processed, a download that is
+        copied but fails to process is not recorded so it can be ingested again
+        """
+
+        download_directory = os.path.join(self.tracmap_data_folder_location, helicopter_rego, download_time)
+        if download_directory not in self.ingested_tracmap_datasets:
+            self.ingested_tracmap_datasets.append(download_directory)
+
+    def ingest_tracmap_downloads(self, jobs, coordinate_system, deflector=False, map_view=None, max_workers=None):
+        """
+        Ingests several tracmap downloads at once. Each download is parsed in a worker
+        process and the results are merged by this process, one download at a time in
+        the order of the jobs, so the flight data matches running each download in turn.
+
+        Parameters
+        ----------
+        jobs : list<[source_folder, helicopter_rego, download_time]>
+        coordinate_system - arcpy.SpatialReference()
+        deflector : boolean - Deflector bucket in use
+        map_view : arcpy Map - Map of the project
+        max_workers : int - Number of worker processes, defaults to the number of cores
+
+        Returns
+        -------
+        results : list<dict> - Result of each job, see ingest_tracmap_download
+        """
+
+        # Copying, repairing geometry and defining projections uses arcpy so is done here
+        manifest = self.load_ingest_manifest()
+        destinations = {self.__log_shapefile_name__: self.total_lines_fc,
+                        self.__secondary_shapefile_name__: self.total_points_fc}
+        copied_list = []
+        shapefile_lists = []
+        download_directories = []
+        for source_folder, helicopter_rego, download_time in jobs:
+            copied_list.append(self.copy_tracmap_data(source_folder, helicopter_rego, download_time))
+            download_directory = os.path.join(self.tracmap_data_folder_location, helicopter_rego, download_time)
+            download_directories.append(download_directory)
+            shapefile_lists.append(dict([[name, self.prepare_tracmap_shapefiles(name, download_directory, coordinate_system,
+                                                                                manifest, destination)]
+                                         for name, destination in destinations.items()]))
+
+        results = []
+        with process_pool.process_pool_executor(max_workers) as executor:
+            parsed_downloads = executor.map(tracmap_data.parse_tracmap_download, download_directories, shapefile_lists,
+                                            [self.tracmap_utc_offset] * len(jobs))
+            for job, copied, parsed_download in zip(jobs, copied_list, parsed_downloads):
+                source_folder, helicopter_rego, download_time = job
+                result = self.process_tracmap_download(helicopter_rego, download_time, coordinate_system, deflector,
+                                                       map_view, parsed_download, manifest)
+                result['copied'] = copied
+                self.mark_tracmap_data_ingested(helicopter_rego, download_time)
+                results.append(result)
+                manifest.save()
+
+        return results
 
     def update_total_lines_featureclass(self, helicopter_rego, download_time, deflector):
         """
         Updates the total lines featureclass
         """
-        result = featureclass_handler.update_totallines_featureclass(self.total_lines_fc,
-                                                            self.total_polygons_fc,
-                                                            helicopter_rego,
-                                                            download_time,
-                                                            deflector)
+        with self.load_download_cache(helicopter_rego, download_time, self.__lines_cache_name__) or contextlib.nullcontext() as new_lines, \
+                self.load_coverage_grid() as coverage:
+            result = featureclass_handler.update_totallines_featureclass(self.total_lines_fc,
+                                                                self.total_polygons_fc,
+                                                                helicopter_rego,
+                                                                download_time,
+                                                                deflector,
+                                                                new_lines,
+                                                                coverage,
+                                                                self.helicopter_sow_rates().get(helicopter_rego))
+            coverage.save()
         return result
 
     def update_total_points_featureclass(self, helicopter_rego, download_time, deflector):
         """
         Updates the total points featureclass with helicopter and time attributes
         """
-        result = featureclass_handler.update_totalpoints_featureclass(
-            self.total_points_fc,
-            helicopter_rego,
-            download_time)
+        with self.load_download_cache(helicopter_rego, download_time, self.__points_cache_name__) or contextlib.nullcontext() as new_points:
+            result = featureclass_handler.update_totalpoints_featureclass(
+                self.total_points_fc,
+                helicopter_rego,
+                download_time,
+                new_points)
 
         return result
 
     def covert_secondary_points_to_lines(self, helicopter_rego, download_time):
-        """Generates lines from the secondary points feature class"""
+        """Generates lines from the secondary points feature class, replacing any written by an earlier attempt that failed"""
 
+        featureclass_handler.delete_download_rows(self.flight_path_fc, helicopter_rego, download_time)
         # Check if there are any new records to add or not
 
-        records_added = featureclass_handler.convert_secondary_points_to_lines(self.total_points_fc,
-                                                               self.total_lines_fc,
-                                                               self.flight_path_fc,
-                                                               self.operation_times_table,
-                                                               helicopter_rego,
-                                                               download_time)
+        with self.load_download_cache(helicopter_rego, download_time, self.__points_cache_name__) or contextlib.nullcontext() as new_points, \
+                self.load_download_cache(helicopter_rego, download_time, self.__lines_cache_name__) or contextlib.nullcontext() as new_lines:
+            records_added = featureclass_handler.convert_secondary_points_to_lines(self.total_points_fc,
+                                                                   self.total_lines_fc,
+                                                                   self.flight_path_fc,
+                                                                   self.operation_times_table,
+                                                                   helicopter_rego,
+                                                                   download_time,
+                                                                   new_points,
+                                                                   new_lines)
         return records_added
 
-    def summarize_flight_data(self, df):
-        """Summarizes flight data for data loaded to date"""
+    def summarize_flight_data(self, df, rebuild=False):
+        """
+        Summarizes flight data for data loaded to date. Only the polygons added since the last
+        summary are dissolved unless rebuild is True, eg. after editing total_polygons. A rebuild
+        is tiled over dissolve_max_workers processes if dissolve_tile_size is set.
+        """
 
         flight_data_gdb = self.flight_data_gdb_location
         total_polygons = self.total_polygons_fc
         sum_total_rows = self.flightline_sum_totals_table
 
         sum_table_field_names = self.sum_total_fieldnames
+        cache = dissolve_cache.DissolveCache(self.dissolve_cache_location())
 
-        results = featureclass_handler.summarize_flight_data(flight_data_gdb, total_polygons, sum_total_rows, df, sum_table_field_names)
+        results = featureclass_handler.summarize_flight_data(flight_data_gdb, total_polygons, sum_total_rows, df, sum_table_field_names,
+                                                             self.dissolved_by_block_fc, self.total_dissolved_fc, cache, rebuild,
+                                                             self.dissolve_tile_size, self.dissolve_max_workers)
 
         self.csv_summaries.append(results)
 
     def summarize_new_flight_data(self, helicopter_rego, download_time, map_view):
         """
         For newly added tracmap data this creaes a summary.txt file and
-        adds a new record to the sum_totals_table
+        adds a new record to the sum_totals_table. Rows written by an earlier
+        attempt that failed are replaced.
         """
+        featureclass_handler.delete_download_rows(self.flightline_sum_totals_table, helicopter_rego, download_time)
         total_lines = self.total_lines_fc
         total_points = self.total_points_fc
         total_polygons = self.total_polygons_fc
@@ -425,17 +863,20 @@ class FlightlineProject(object):
 
         block_area_dict = featureclass_handler.feature_class_as_dict(self.treatment_area_fc, self.__block_field_name__, ['Hectares'])
 
-        results = featureclass_handler.new_flight_data_summary(total_lines,
-                                                    total_points,
-                                                    total_polygons,
-                                                    tracmap_data_folder,
-                                                    helicopter_rego,
-                                                    download_time,
-                                                    sum_totals_table,
-                                                    sum_totals_field_names,
-                                                    block_area_dict,
-                                                    map_view,
-                                                    total_polygons_lyr_file)
+        with self.load_download_cache(helicopter_rego, download_time, self.__points_cache_name__) or contextlib.nullcontext() as new_points:
+            results = featureclass_handler.new_flight_data_summary(total_lines,
+                                                        total_points,
+                                                        total_polygons,
+                                                        tracmap_data_folder,
+                                                        helicopter_rego,
+                                                        download_time,
+                                                        sum_totals_table,
+                                                        sum_totals_field_names,
+                                                        block_area_dict,
+                                                        map_view,
+                                                        total_polygons_lyr_file,
+                                                        new_points,
+                                                        self.download_index(os.path.join(tracmap_data_folder, helicopter_rego, download_time)))
 
         if results:
             self.csv_summaries.append(results)
@@ -495,7 +936,11 @@ class FlightlineProject(object):
 
     def load_from_projectconfig(self):
         """Loads from the projectconfig json file into the self"""
+        self.ingested_tracmap_datasets = None
         config_handler.load_from_projectconfig(self, self.project_config_location)
+        if self.ingested_tracmap_datasets is None:
+            # Configs saved before ingested downloads were recorded only copied downloads once they were processed
+            self.ingested_tracmap_datasets = list(self.copied_tracmap_datasets)
 
 
 
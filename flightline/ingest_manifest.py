@@ -0,0 +1,214 @@
+# Flightline Project
+
+# Description:
+# Persistent manifest of the tracmap shapefiles merged into the flight data
+# featureclasses, keyed by a hash of their content so a download that is
+# copied in a second time is not merged again. The processing stages each
+# download has finished are also recorded so a failed ingest is resumed.
+
+import os
+import json
+import time
+import hashlib
+
+__content_extensions__ = ['.shp', '.dbf']
+__hash_block_size__ = 1024 * 1024
+
+
+def shapefile_content_files(shapefile):
+    """
+    Returns the files of a shapefile whose content identifies its records
+
+    Parameters
+    ----------
+    shapefile : str - location of the .shp file
+
+    Returns
+    -------
+    file_list : list<str>
+    """
+
+    base_name = os.path.splitext(shapefile)[0]
+    return [base_name + extension for extension in __content_extensions__ if os.path.exists(base_name + extension)]
+
+
+def shapefile_signature(shapefile):
+    """
+    Returns the size and modified time of each content file of a shapefile
+
+    Returns
+    -------
+    signature : list<int> - [size, mtime_ns, size, mtime_ns ...]
+    """
+
+    signature = []
+    for content_file in shapefile_content_files(shapefile):
+        stat = os.stat(content_file)
+        signature.extend([stat.st_size, stat.st_mtime_ns])
+    return signature
+
+
+def shapefile_content_hash(shapefile):
+    """
+    Returns the sha1 hex digest of the content files of a shapefile
+
+    Parameters
+    ----------
+    shapefile : str - location of the .shp file
+
+    Returns
+    -------
+    content_hash : str
+    """
+
+    content_hash = hashlib.sha1()
+    for content_file in shapefile_content_files(shapefile):
+        with open(content_file, 'rb') as f:
+            for block in iter(lambda: f.read(__hash_block_size__), b''):
+                content_hash.update(block)
+    return content_hash.hexdigest()
+
+
+class IngestManifest(object):
+    """
+    Records which shapefiles have been merged into each destination featureclass.
+
+    Content hashes are cached against the size and modified time of each file so
+    unchanged files are only read once. The hash recorded for a file is the hash
+    of its content before it was repaired, so the same export copied in again is
+    recognised even though the project copy has since been modified.
+    """
+
+    def __init__(self, manifest_file):
+        """
+        Parameters
+        ----------
+        manifest_file : str - Location of the manifest json file
+        """
+
+        self.manifest_file = manifest_file
+        self.files = {}
+        self.destinations = {}
+        self.downloads = {}
+
+    @property
+    def exists(self):
+        return os.path.exists(self.manifest_file)
+
+    def content_hash(self, shapefile):
+        """
+        Returns the content hash of a shapefile, only reading the file if its
+        size or modified time has changed since it was last hashed
+        """
+
+        signature = shapefile_signature(shapefile)
+        cached = self.files.get(shapefile)
+        if cached and cached['signature'] == signature:
+            return cached['sha1']
+        content_hash = shapefile_content_hash(shapefile)
+        self.files[shapefile] = {'signature': signature, 'sha1': content_hash}
+        return content_hash
+
+    def refresh_signature(self, shapefile):
+        """
+        Updates the cached size and modified time of a shapefile that has been
+        modified in place, eg. by repairing its geometry, keeping its original content hash
+        """
+
+        cached = self.files.get(shapefile)
+        if cached:
+            cached['signature'] = shapefile_signature(shapefile)
+
+    def validate_destination(self, destination, record_count):
+        """
+        Forgets the shapefiles merged into a destination if it now has fewer
+        records than when they were merged, ie. the featureclass has been replaced
+
+        Parameters
+        ----------
+        destination : str - Name of the destination featureclass
+        record_count : int - Current number of records in the destination featureclass
+        """
+
+        recorded = self.destinations.get(destination)
+        if recorded and record_count < recorded['record_count']:
+            del self.destinations[destination]
+            # The stages were run against the featureclass that has been replaced
+            self.downloads = {}
+
+    def contains(self, shapefile, destination):
+        """Returns True if the content of the shapefile has been merged into the destination"""
+
+        # Always hash so the content is recorded before the shapefile is modified
+        content_hash = self.content_hash(shapefile)
+        recorded = self.destinations.get(destination)
+        if not recorded:
+            return False
+        return content_hash in recorded['shapefiles']
+
+    def record(self, shapefile, destination, rows_added, record_count):
+        """
+        Records a shapefile as merged into the destination
+
+        Parameters
+        ----------
+        shapefile : str - location of the .shp file
+        destination : str - Name of the destination featureclass
+        rows_added : int - Number of rows the shapefile added to the destination
+        record_count : int - Number of records in the destination after the merge
+        """
+
+        recorded = self.destinations.setdefault(destination, {'record_count': 0, 'shapefiles': {}})
+        recorded['record_count'] = record_count
+        recorded['shapefiles'][self.content_hash(shapefile)] = {'shapefile': shapefile,
+                                                                 'rows_added': rows_added,
+                                                                 'ingested': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+    def finished_stages(self, download):
+        """
+        Returns the processing stages a download has finished
+
+        Parameters
+        ----------
+        download : str - Name of the download eg. 'raw_data/NSB/1102'
+
+        Returns
+        -------
+        stages : list<str>
+        """
+
+        return list(self.downloads.get(download, []))
+
+    def record_stage(self, download, stage):
+        """Records a processing stage of a download as finished, see finished_stages"""
+
+        stages = self.downloads.setdefault(download, [])
+        if stage not in stages:
+            stages.append(stage)
+
+    def load(self):
+        """
+        Loads the manifest file
+
+        Returns
+        -------
+        loaded : boolean - False if there is no manifest file
+        """
+
+        if not self.exists:
+            return False
+        with open(self.manifest_file, 'r') as manifest:
+            json_dict = json.load(manifest)
+        self.files = json_dict.get('files', {})
+        self.destinations = json_dict.get('destinations', {})
+        self.downloads = json_dict.get('downloads', {})
+        return True
+
+    def save(self):
+        """Writes the manifest file, replacing the existing file"""
+
+        temp_file = "{0}.tmp".format(self.manifest_file)
+        with open(temp_file, 'w') as manifest:
+            json.dump({'files': self.files, 'destinations': self.destinations, 'downloads': self.downloads},
+                      manifest, indent=1, sort_keys=True)
+        os.replace(temp_file, self.manifest_file)
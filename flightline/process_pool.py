@@ -0,0 +1,38 @@
+# Flightline Project
+
+# Description:
+# Creates process pools that also work when the tools are run inside ArcGIS Pro.
+
+import os
+import sys
+import multiprocessing
+from concurrent import futures
+
+
+def python_executable():
+    """
+    Returns the python interpreter used to start worker processes.
+    Inside ArcGIS Pro sys.executable is ArcGISPro.exe so the python.exe
+    of the active environment is used instead.
+    """
+
+    if os.path.basename(sys.executable).lower().startswith('python'):
+        return sys.executable
+    for name in ['python.exe', 'python']:
+        executable = os.path.join(sys.exec_prefix, name)
+        if os.path.exists(executable):
+            return executable
+    return sys.executable
+
+
+def process_pool_executor(max_workers=None):
+    """
+    Returns a concurrent.futures.ProcessPoolExecutor
+
+    Parameters
+    ----------
+    max_workers : int - Number of worker processes, defaults to the number of cores
+    """
+
+    multiprocessing.set_executable(python_executable())
+    return futures.ProcessPoolExecutor(max_workers=max_workers)
@@ -0,0 +1,211 @@
+# Flightline Project
+
+# Description:
+# Streams records straight from a shapefile's .shp and .dbf files without
+# going through arcpy. Used to read the tracmap log.shp and secondary.shp files.
+
+import os
+import struct
+import datetime
+from collections import namedtuple
+
+SHAPE_TYPE_NAMES = {0: 'Null',
+                    1: 'Point', 11: 'Point', 21: 'Point',
+                    3: 'Polyline', 13: 'Polyline', 23: 'Polyline',
+                    5: 'Polygon', 15: 'Polygon', 25: 'Polygon',
+                    8: 'Multipoint', 18: 'Multipoint', 28: 'Multipoint',
+                    31: 'MultiPatch'}
+
+POINT_SHAPE_TYPES = (1, 11, 21)
+MULTIPOINT_SHAPE_TYPES = (8, 18, 28)
+PART_SHAPE_TYPES = (3, 13, 23, 5, 15, 25)
+
+DbfField = namedtuple('DbfField', ['name', 'field_type', 'length', 'decimal_count'])
+
+
+def normalise_field_name(field_name):
+    """
+    Replaces characters that are not valid in a geodatabase field name with '_'
+    the same way arcpy does when copying a shapefile eg. 'GPS Alt' -> 'GPS_Alt'
+    """
+
+    return ''.join([c if c.isalnum() or c == '_' else '_' for c in field_name])
+
+
+class ShapefileReader(object):
+    """
+    Reads the shapefile headers once and streams the records as tuples.
+    Geometry is returned as (x, y) for points and a list of parts, each a
+    list of (x, y), for everything else.
+    """
+
+    def __init__(self, shapefile):
+        """
+        Parameters
+        ----------
+        shapefile : str - location of the .shp file
+        """
+
+        base_name = os.path.splitext(shapefile)[0]
+        self.shapefile = shapefile
+        self.dbf_file = self.__find_sidecar_file__(base_name, '.dbf')
+        self.prj_file = self.__find_sidecar_file__(base_name, '.prj')
+        self.cpg_file = self.__find_sidecar_file__(base_name, '.cpg')
+
+        self.shape_type = None
+        self.bounding_box = None
+        self.record_count = None
+        self.fields = []
+        self.__dbf_header_length__ = None
+        self.__dbf_record_length__ = None
+        self.encoding = self.__read_encoding__()
+        self.__read_shp_header__()
+        self.__read_dbf_header__()
+
+    @staticmethod
+    def __find_sidecar_file__(base_name, extension):
+        """Returns the location of a sidecar file, matching the extension in either case"""
+        for ext in [extension, extension.upper()]:
+            if os.path.exists(base_name + ext):
+                return base_name + ext
+        return None
+
+    def __read_encoding__(self):
+        """Returns the dbf text encoding from the .cpg file, default utf-8"""
+        if not self.cpg_file:
+            return 'utf-8'
+        with open(self.cpg_file, 'r') as cpg:
+            encoding = cpg.read().strip()
+        return encoding or 'utf-8'
+
+    def __read_shp_header__(self):
+        """Reads the shape type and bounding box from the .shp file header"""
+        with open(self.shapefile, 'rb') as shp:
+            header = shp.read(100)
+        if len(header) < 100 or struct.unpack('>i', header[0:4])[0] != 9994:
+            raise ValueError("{0} is not a valid shapefile".format(self.shapefile))
+        self.shape_type = struct.unpack('<i', header[32:36])[0]
+        self.bounding_box = struct.unpack('<4d', header[36:68])
+
+    def __read_dbf_header__(self):
+        """Reads the record count and field descriptors from the .dbf file header"""
+        if not self.dbf_file:
+            raise ValueError("{0} has no .dbf file".format(self.shapefile))
+        with open(self.dbf_file, 'rb') as dbf:
+            header = dbf.read(32)
+            self.record_count, self.__dbf_header_length__, self.__dbf_record_length__ = struct.unpack('<IHH', header[4:12])
+            self.fields = []
+            descriptor = dbf.read(32)
+            while descriptor and descriptor[0:1] != b'\r':
+                name = descriptor[0:11].split(b'\x00')[0].decode('ascii', 'replace').strip()
+                field_type = descriptor[11:12].decode('ascii')
+                self.fields.append(DbfField(name, field_type, descriptor[16], descriptor[17]))
+                descriptor = dbf.read(32)
+
+    @property
+    def shape_type_name(self):
+        """Shape type named the same as arcpy.Describe().shapeType"""
+        return SHAPE_TYPE_NAMES.get(self.shape_type, 'Unknown')
+
+    @property
+    def field_names(self):
+        """Field names normalised to the names arcpy gives the copied featureclass"""
+        return [normalise_field_name(f.name) for f in self.fields]
+
+    @property
+    def spatial_reference_wkt(self):
+        """Returns the well known text from the .prj file or None if not defined"""
+        if not self.prj_file:
+            return None
+        with open(self.prj_file, 'r') as prj:
+            wkt = prj.read().strip()
+        return wkt or None
+
+    def __parse_value__(self, field, raw_value):
+        """Converts the raw dbf bytes to a python value"""
+        if field.field_type in ('C', 'M'):
+            return raw_value.decode(self.encoding, 'replace').rstrip(' \x00')
+        value = raw_value.strip(b' \x00')
+        if field.field_type in ('N', 'F'):
+            if not value or value.startswith(b'*'):
+                return None
+            if field.decimal_count == 0 and field.field_type == 'N':
+                try:
+                    return int(value)
+                except ValueError:
+                    return float(value)
+            return float(value)
+        if field.field_type == 'D':
+            if not value or value.strip(b'0') == b'':
+                return None
+            return datetime.datetime.strptime(value.decode('ascii'), '%Y%m%d')
+        if field.field_type == 'L':
+            if value in (b'T', b't', b'Y', b'y'):
+                return True
+            if value in (b'F', b'f', b'N', b'n'):
+                return False
+            return None
+        return value.decode(self.encoding, 'replace')
+
+    def iter_attributes(self):
+        """Generator of the attribute values of each non deleted dbf record as a tuple"""
+        offsets = []
+        position = 1
+        for field in self.fields:
+            offsets.append((field, position, position + field.length))
+            position += field.length
+
+        with open(self.dbf_file, 'rb') as dbf:
+            dbf.seek(self.__dbf_header_length__)
+            for i in range(self.record_count):
+                record = dbf.read(self.__dbf_record_length__)
+                if len(record) < self.__dbf_record_length__:
+                    break
+                if record[0:1] == b'*':
+                    yield None
+                    continue
+                yield tuple([self.__parse_value__(field, record[start:end]) for field, start, end in offsets])
+
+    def iter_shapes(self):
+        """Generator of the geometry of each .shp record"""
+        with open(self.shapefile, 'rb') as shp:
+            shp.seek(100)
+            while True:
+                record_header = shp.read(8)
+                if len(record_header) < 8:
+                    break
+                content_length = struct.unpack('>2i', record_header)[1] * 2
+                content = shp.read(content_length)
+                yield self.__parse_shape__(content)
+
+    @staticmethod
+    def __parse_shape__(content):
+        """Converts the content of a .shp record to coordinates"""
+        shape_type = struct.unpack('<i', content[0:4])[0]
+        if shape_type == 0:
+            return None
+        if shape_type in POINT_SHAPE_TYPES:
+            return struct.unpack('<2d', content[4:20])
+        if shape_type in MULTIPOINT_SHAPE_TYPES:
+            point_count = struct.unpack('<i', content[36:40])[0]
+            coordinates = struct.unpack('<{0}d'.format(point_count * 2), content[40:40 + point_count * 16])
+            return [list(zip(coordinates[0::2], coordinates[1::2]))]
+        if shape_type in PART_SHAPE_TYPES:
+            part_count, point_count = struct.unpack('<2i', content[36:44])
+            parts_end = 44 + part_count * 4
+            part_starts = list(struct.unpack('<{0}i'.format(part_count), content[44:parts_end]))
+            coordinates = struct.unpack('<{0}d'.format(point_count * 2), content[parts_end:parts_end + point_count * 16])
+            points = list(zip(coordinates[0::2], coordinates[1::2]))
+            part_starts.append(point_count)
+            return [points[part_starts[i]:part_starts[i + 1]] for i in range(part_count)]
+        raise ValueError("Shape type {0} is not supported".format(shape_type))
+
+    def __iter__(self):
+        """
+        Generator of (geometry, attribute values...) tuples, reading the
+        .shp and .dbf files in step. Deleted dbf records are skipped.
+        """
+        for shape, attributes in zip(self.iter_shapes(), self.iter_attributes()):
+            if attributes is None:
+                continue
+            yield (shape,) + attributes
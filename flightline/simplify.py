@@ -0,0 +1,112 @@
+# Flightline Project
+
+# Description:
+# Douglas-Peucker simplification of the flight path and total lines geometry. The raw
+# vertices of simplified rows are kept in a gzipped json sidecar archive for audit.
+# Contains no arcpy.
+
+import os
+import gzip
+import json
+import math
+
+
+def perpendicular_distance(point, start, end):
+    """Returns the distance from the point to the line segment start - end"""
+
+    dx = end[0] - start[0]
+    dy = end[1] - start[1]
+    length_squared = dx * dx + dy * dy
+    if length_squared == 0:
+        return math.hypot(point[0] - start[0], point[1] - start[1])
+    t = max(0.0, min(1.0, ((point[0] - start[0]) * dx + (point[1] - start[1]) * dy) / length_squared))
+    return math.hypot(point[0] - start[0] - t * dx, point[1] - start[1] - t * dy)
+
+
+def douglas_peucker(points, tolerance):
+    """
+    Simplifies a line with the Douglas-Peucker algorithm, the first and last points are always kept.
+    Ranges are taken from a stack rather than by recursion so long flight paths do not hit the recursion limit.
+
+    Parameters
+    ----------
+    points : list<(x, y)>
+    tolerance : float - Maximum distance a removed vertex may be from the simplified line
+
+    Returns
+    -------
+    simplified_points : list<(x, y)>
+    """
+
+    if len(points) < 3 or not tolerance or tolerance <= 0:
+        return list(points)
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    ranges = [(0, len(points) - 1)]
+    while ranges:
+        first, last = ranges.pop()
+        max_distance = -1
+        max_index = None
+        for i in range(first + 1, last):
+            distance = perpendicular_distance(points[i], points[first], points[last])
+            if distance > max_distance:
+                max_distance = distance
+                max_index = i
+        if max_index is not None and max_distance > tolerance:
+            keep[max_index] = True
+            ranges.append((first, max_index))
+            ranges.append((max_index, last))
+    return [point for point, kept in zip(points, keep) if kept]
+
+
+def simplify_parts(parts, tolerance):
+    """Simplifies each part of a line, see douglas_peucker"""
+
+    return [douglas_peucker(part, tolerance) for part in parts]
+
+
+def vertex_count(parts):
+    """Returns the number of vertices in a list of parts"""
+
+    return sum([len(part) for part in parts])
+
+
+def archive_file_name(helicopter_rego, download_time):
+    """Returns the name of the archive of a download"""
+
+    return "{0}_{1}.json.gz".format(helicopter_rego, download_time)
+
+
+def write_vertex_archive(archive_file, tolerance, raw_rows):
+    """
+    Writes the raw vertices of simplified rows to a gzipped json archive
+
+    Parameters
+    ----------
+    archive_file : str - location of the archive, its folder is created if it does not exist
+    tolerance : float - Tolerance the rows were simplified with
+    raw_rows : list<[oid, parts]> - parts is a list<list<(x, y)>> of the vertices before simplification
+    """
+
+    archive_folder = os.path.dirname(archive_file)
+    if archive_folder and not os.path.exists(archive_folder):
+        os.makedirs(archive_folder)
+    temp_file = archive_file + '.tmp'
+    with gzip.open(temp_file, 'wt') as f:
+        json.dump({'tolerance': tolerance, 'rows': raw_rows}, f)
+    os.replace(temp_file, archive_file)
+
+
+def read_vertex_archive(archive_file):
+    """
+    Reads an archive written by write_vertex_archive
+
+    Returns
+    -------
+    tolerance, raw_vertices : float, dict - {oid: list<list<(x, y)>>}
+    """
+
+    with gzip.open(archive_file, 'rt') as f:
+        archive = json.load(f)
+    raw_vertices = dict([[oid, [[tuple(point) for point in part] for part in parts]] for oid, parts in archive['rows']])
+    return archive['tolerance'], raw_vertices
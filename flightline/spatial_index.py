@@ -0,0 +1,59 @@
+# Flightline Project
+
+# Description:
+# Uniform grid hash of points for finding the nearest point within a radius,
+# used in place of arcpy.Near_analysis. Contains no arcpy.
+
+import math
+
+
+class GridIndex(object):
+    """
+    Points hashed into square cells. With the cell size set to the search radius
+    a query only has to look at the 3 x 3 cells around the query point.
+    """
+
+    def __init__(self, cell_size):
+        """
+        Parameters
+        ----------
+        cell_size : float - Size of the cells, usually the search radius
+        """
+
+        if cell_size <= 0:
+            raise ValueError("cell_size must be greater than 0, got {0}".format(cell_size))
+        self.cell_size = float(cell_size)
+        self.cells = {}
+
+    def __cell__(self, x, y):
+        return (int(math.floor(x / self.cell_size)), int(math.floor(y / self.cell_size)))
+
+    def add(self, point_id, x, y):
+        self.cells.setdefault(self.__cell__(x, y), []).append((point_id, x, y))
+
+    def nearest(self, x, y, radius):
+        """
+        Returns the nearest point within the radius
+
+        Parameters
+        ----------
+        x, y : float - Query point
+        radius : float - Search radius
+
+        Returns
+        -------
+        [distance, point_id] - [None, None] if there is no point within the radius
+        """
+
+        reach = int(math.ceil(radius / self.cell_size))
+        column, row = self.__cell__(x, y)
+        nearest = [None, None]
+        for c in range(column - reach, column + reach + 1):
+            for r in range(row - reach, row + reach + 1):
+                for point_id, px, py in self.cells.get((c, r), ()):
+                    distance = math.hypot(px - x, py - y)
+                    if distance > radius:
+                        continue
+                    if nearest[0] is None or distance < nearest[0] or (distance == nearest[0] and point_id < nearest[1]):
+                        nearest = [distance, point_id]
+        return nearest
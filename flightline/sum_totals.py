@@ -0,0 +1,125 @@
+# Flightline Project
+
+# Description:
+# Consolidates the new polygons of a download into the rows of the sum_totals
+# table, and the sum_totals rows into the csv summary. Rows are streamed through
+# in one pass, only the current group is held.
+# Contains no arcpy. Run python -m flightline.sum_totals to benchmark it.
+
+import argparse
+import time
+
+
+def consolidate_rows(rows, key_length=3, sum_index=4):
+    """
+    Yields one row for each run of rows sharing the same first key_length values, eg. Machine,
+    DL_Time and BlockName. The value at sum_index is the total of the run and the other values
+    are those of the last row of the run. Rows must be ordered by the key, as the polygons
+    cursor of new_flight_data_summary is.
+
+    Parameters
+    ----------
+    rows : iterable<list> - eg. [Machine, DL_Time, BlockName, Bucket, Hectares]
+    key_length : int - Number of leading values rows are grouped by
+    sum_index : int - Index of the value that is summed
+
+    Yields
+    ------
+    row : list
+    """
+
+    group_key = last_row = total = None
+    for row in rows:
+        key = tuple(row[0:key_length])
+        if last_row is not None and key == group_key:
+            total += row[sum_index]
+            last_row = row
+            continue
+        if last_row is not None:
+            yield __group_row__(last_row, sum_index, total)
+        group_key = key
+        last_row = row
+        total = row[sum_index]
+    if last_row is not None:
+        yield __group_row__(last_row, sum_index, total)
+
+
+def __group_row__(last_row, sum_index, total):
+    group_row = list(last_row)
+    group_row[sum_index] = total
+    return group_row
+
+
+def csv_summary_rows(rows, dissolved_block_areas, total_dissolved_area):
+    """
+    Yields the rows of the sum_totals csv export in one pass. The sum_totals rows of each block
+    are consolidated into one row with the hectares sown to date, followed by the dissolved area
+    of the block and the percentage of the block area sown. A blank row and the total dissolved
+    area are yielded last.
+
+    Parameters
+    ----------
+    rows : iterable<list> - [BlockName, Bucket, Hectares, Last_log_time, Nominal_Area, Real_Area,
+           Distance_travelled, Distance_spreading, Block_Area] ordered by BlockName and Last_log_time
+    dissolved_block_areas : dict - {block_name: hectares} of the polygons dissolved by block
+    total_dissolved_area : float - Hectares of all the polygons dissolved
+
+    Yields
+    ------
+    csv_row : list
+    """
+
+    for row in consolidate_rows(rows, 1, 2):
+        row.append(round(dissolved_block_areas.get(row[0], 0), 4))
+        if row[8]:
+            row.append(round((row[2] / row[8]) * 100, 2))
+        else:
+            row.append(0)
+        yield row
+    yield []
+    yield ['Total dissolved area', '', '', '', '', '', '', '', '', total_dissolved_area, '']
+
+
+def benchmark_rows(block_count, bucket_count, polygons_per_bucket):
+    """Yields ordered [Machine, DL_Time, BlockName, Bucket, Hectares] rows for the benchmark"""
+
+    for block in range(block_count):
+        for bucket in range(bucket_count):
+            for polygon in range(polygons_per_bucket):
+                yield ['HBC', '0910', 'Block{0:05d}'.format(block), 'Bucket{0:03d}'.format(bucket), 0.25]
+
+
+def benchmark(block_count, bucket_count, polygons_per_bucket):
+    """
+    Times consolidating the rows of block_count x bucket_count combinations
+
+    Returns
+    -------
+    result : dict - {'rows', 'groups', 'seconds', 'rows_per_second'}
+    """
+
+    row_count = block_count * bucket_count * polygons_per_bucket
+    start = time.perf_counter()
+    group_count = 0
+    for row in consolidate_rows(benchmark_rows(block_count, bucket_count, polygons_per_bucket)):
+        group_count += 1
+    seconds = time.perf_counter() - start
+    return {'rows': row_count, 'groups': group_count, 'seconds': seconds,
+            'rows_per_second': row_count / seconds if seconds else None}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks consolidating new polygon rows into sum_totals rows")
+    parser.add_argument('--blocks', type=int, nargs='+', default=[100, 1000, 5000])
+    parser.add_argument('--buckets', type=int, default=4)
+    parser.add_argument('--polygons', type=int, default=50, help="Polygons in each block/bucket combination")
+    args = parser.parse_args(argv)
+
+    for block_count in args.blocks:
+        result = benchmark(block_count, args.buckets, args.polygons)
+        print("{0} block/bucket combinations, {rows} rows into {groups} groups in {seconds:.3f}s, {rows_per_second:,.0f} rows/s".format(
+            block_count * args.buckets, **result))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+# Flightline Project
+
+# Description:
+# Parses the summary .txt files tracmap writes into each download. Values are
+# found by their label rather than by column offset, each file is parsed once and
+# kept by its path and modified time, and the summaries of a download are loaded
+# on a thread pool. Contains no arcpy.
+
+import os
+import re
+import threading
+from collections import namedtuple, OrderedDict
+from concurrent import futures
+
+TracmapSummary = namedtuple('TracmapSummary', ['summary_file', 'nominal_area', 'real_area', 'distance_flown', 'distance_spread'])
+
+__summary_values__ = ['nominal_area', 'real_area', 'distance_flown', 'distance_spread']
+# Order of the values in the two layouts of summary file, used for lines whose label is not recognised
+__summary_layouts__ = {'distance': ['distance_flown', 'distance_spread', 'nominal_area', 'real_area'],
+                       'area': ['nominal_area', 'real_area', 'distance_flown', 'distance_spread']}
+# Words in a label identifying the value, checked in order
+__label_words__ = [['nominal', 'nominal_area'], ['real', 'real_area'], ['actual', 'real_area'],
+                   ['spread', 'distance_spread'], ['flown', 'distance_flown'], ['travel', 'distance_flown']]
+__line_pattern__ = re.compile(r'^(?P<label>[^\d+-].*?)[\s:=]*(?P<value>[-+]?\d+(?:\.\d*)?)\s*(?P<unit>[^\d\s]*)\s*$')
+__max_cached_summaries__ = 256
+
+__summary_cache__ = OrderedDict()
+__summary_cache_lock__ = threading.Lock()
+
+
+def label_value_name(label):
+    """Returns the TracmapSummary field a summary line label is for, None if it is not recognised"""
+
+    label = label.lower()
+    for word, value_name in __label_words__:
+        if word in label:
+            return value_name
+    return None
+
+
+def parse_summary_lines(lines, summary_file=None):
+    """
+    Parses the lines of a tracmap summary file eg. 'Distance Flown    : 123.45 km'
+
+    Parameters
+    ----------
+    lines : iterable<str>
+    summary_file : str - Location of the file the lines were read from
+
+    Returns
+    -------
+    summary : TracmapSummary - Values that are not in the lines are None
+    """
+
+    labelled_values = []
+    for line in lines:
+        match = __line_pattern__.match(line.strip())
+        if match:
+            labelled_values.append([match.group('label').strip(), float(match.group('value'))])
+
+    values = dict([[value_name, None] for value_name in __summary_values__])
+    layout = None
+    if labelled_values:
+        layout = __summary_layouts__.get(labelled_values[0][0].split(' ')[0].lower())
+    for i, (label, value) in enumerate(labelled_values):
+        value_name = label_value_name(label)
+        if value_name is None and layout is not None and i < len(layout):
+            value_name = layout[i]
+        if value_name is not None and values[value_name] is None:
+            values[value_name] = value
+    return TracmapSummary(summary_file, **values)
+
+
+def parse_summary_file(summary_file):
+    """
+    Returns the parsed summary file, files are only parsed again if they have been modified
+
+    Parameters
+    ----------
+    summary_file : str
+
+    Returns
+    -------
+    summary : TracmapSummary
+    """
+
+    stat = os.stat(summary_file)
+    key = (stat.st_mtime_ns, stat.st_size)
+    with __summary_cache_lock__:
+        cached = __summary_cache__.get(summary_file)
+        if cached is not None and cached[0] == key:
+            __summary_cache__.move_to_end(summary_file)
+            return cached[1]
+
+    with open(summary_file, 'r', errors='replace') as f:
+        summary = parse_summary_lines(f, summary_file)
+
+    with __summary_cache_lock__:
+        __summary_cache__[summary_file] = [key, summary]
+        __summary_cache__.move_to_end(summary_file)
+        while len(__summary_cache__) > __max_cached_summaries__:
+            __summary_cache__.popitem(last=False)
+    return summary
+
+
+def clear_cache():
+    """Removes every parsed summary from the cache"""
+
+    with __summary_cache_lock__:
+        __summary_cache__.clear()
+
+
+def load_download_summaries(tracmap_download_index, max_workers=None):
+    """
+    Parses every summary file of a download at once
+
+    Parameters
+    ----------
+    tracmap_download_index : download_index.DownloadIndex
+    max_workers : int - Number of files parsed at once, defaults to the ThreadPoolExecutor default
+
+    Returns
+    -------
+    summaries : dict - {summary_file: TracmapSummary}
+    """
+
+    summary_files = sorted(set([summary_file for file_list in tracmap_download_index.summary_files.values() for summary_file in file_list]))
+    if not summary_files:
+        return {}
+    with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return dict(zip(summary_files, executor.map(parse_summary_file, summary_files)))
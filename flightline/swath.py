@@ -0,0 +1,486 @@
+# Flightline Project
+
+# Description:
+# Builds swath polygons from sowing lines, the equivalent of arcpy.Buffer_analysis
+# with round, full/flat or right/flat buffers. Contains no arcpy so the swaths can
+# be built in worker processes and tested outside ArcGIS. Coordinates are planar,
+# lines are given as a list of parts, each a list of (x, y).
+
+import heapq
+import math
+from itertools import repeat
+
+from flightline import process_pool
+
+# Buffer styles eg. arcpy.Buffer_analysis(line_side, line_end_type)
+ROUND = 'ROUND'  # FULL, ROUND
+FLAT = 'FLAT'  # FULL, FLAT
+RIGHT_FLAT = 'RIGHT_FLAT'  # RIGHT, FLAT
+BUFFER_STYLES = [ROUND, FLAT, RIGHT_FLAT]
+
+__arc_vertices_per_circle__ = 36
+# Outlines are traced on a micrometre grid, points closer than the touch tolerance are on the same edge
+__snap_decimals__ = 6
+__touch_tolerance__ = 2e-6
+__join_tolerance__ = 1e-3
+
+# [Bucket, minimum width, buffer type] from the widest bucket, a width must be above 0 to be sown
+__bucket_classes__ = [['Broadcast', 120, 'Round'], ['Narrow', 40, 'Round'],
+                      ['Trickle', 4, 'Square'], ['Sprayboom', 0, 'Square']]
+__trickle_buffer_distance__ = 15
+
+
+def bucket_class(width):
+    """
+    Returns the bucket of a line from its swath width
+
+    Parameters
+    ----------
+    width : float - Width of the line
+
+    Returns
+    -------
+    [bucket, buffer_type, buffer_distance] - eg. ['Broadcast', 'Round', 60.0], None if the width is missing or not above 0
+    """
+
+    if width is None or width <= 0:
+        return None
+    for bucket, minimum_width, buffer_type in __bucket_classes__:
+        if width >= minimum_width:
+            if bucket == 'Trickle':
+                return [bucket, buffer_type, __trickle_buffer_distance__]
+            return [bucket, buffer_type, width / 2]
+
+
+def buffer_style(buffer_type, deflector):
+    """
+    Returns the buffer style of a line
+
+    Parameters
+    ----------
+    buffer_type : str - 'Round' or 'Square'
+    deflector : boolean - Deflector bucket in use, only the right side of the line is sown
+
+    Returns
+    -------
+    buffer_style : str - ROUND, FLAT or RIGHT_FLAT
+    """
+
+    if deflector:
+        return RIGHT_FLAT
+    if buffer_type == 'Round':
+        return ROUND
+    return FLAT
+
+
+def remove_repeated_vertices(points):
+    """Returns the points without consecutive duplicates"""
+    unique_points = []
+    for point in points:
+        if not unique_points or point != unique_points[-1]:
+            unique_points.append(tuple(point))
+    return unique_points
+
+
+def arc_points(center, radius, start_angle, sweep):
+    """
+    Returns the points of an arc, excluding the start point and including the end point
+
+    Parameters
+    ----------
+    center : (x, y)
+    radius : float
+    start_angle : float - radians anticlockwise from the x axis
+    sweep : float - radians, negative is clockwise
+    """
+
+    steps = max(1, int(math.ceil(abs(sweep) / (2 * math.pi) * __arc_vertices_per_circle__)))
+    return [(center[0] + radius * math.cos(start_angle + sweep * i / steps),
+             center[1] + radius * math.sin(start_angle + sweep * i / steps)) for i in range(1, steps + 1)]
+
+
+def segment_intersection(a0, a1, b0, b1):
+    """Returns the intersection of segments a0-a1 and b0-b1 or None if they do not intersect"""
+    dax, day = a1[0] - a0[0], a1[1] - a0[1]
+    dbx, dby = b1[0] - b0[0], b1[1] - b0[1]
+    denominator = dax * dby - day * dbx
+    if denominator == 0:
+        return None
+    t = ((b0[0] - a0[0]) * dby - (b0[1] - a0[1]) * dbx) / denominator
+    u = ((b0[0] - a0[0]) * day - (b0[1] - a0[1]) * dax) / denominator
+    if 0 <= t <= 1 and 0 <= u <= 1:
+        return (a0[0] + t * dax, a0[1] + t * day)
+    return None
+
+
+def ring_signed_area(ring):
+    """Returns the planar area of a closed ring, negative if the ring is clockwise"""
+    # Relative to the first vertex so large projected coordinates do not lose precision
+    x, y = ring[0]
+    return sum([(x0 - x) * (y1 - y) - (x1 - x) * (y0 - y) for (x0, y0), (x1, y1) in zip(ring[:-1], ring[1:])]) / 2
+
+
+def clockwise(polygon):
+    """Returns the vertices of a polygon in clockwise order"""
+    if ring_signed_area(polygon + polygon[:1]) > 0:
+        return polygon[::-1]
+    return polygon
+
+
+def arc_piece(center, radius, start_angle, sweep):
+    """Returns the clockwise sector of a circle, or the whole circle if the sweep is a full turn"""
+    arc = arc_points(center, radius, start_angle, sweep)
+    if abs(sweep) >= 2 * math.pi:
+        return clockwise(arc)
+    start = (center[0] + radius * math.cos(start_angle), center[1] + radius * math.sin(start_angle))
+    return clockwise([center, start] + arc)
+
+
+def swath_pieces(points, distance, style):
+    """
+    Returns the swath of a single part line as overlapping convex pieces: a rectangle
+    for each segment, a sector joining the segments on the outside of each turn and for
+    round buffers a circle at each end. The swath is the union of the pieces.
+
+    Parameters
+    ----------
+    points : list<(x, y)>
+    distance : float - Buffer distance, half the swath width
+    style : str - ROUND, FLAT or RIGHT_FLAT
+
+    Returns
+    -------
+    pieces : list<list<(x, y)>> - clockwise convex polygons, not closed
+    """
+
+    if not distance or distance <= 0:
+        return []
+    points = remove_repeated_vertices(points)
+    if len(points) < 2:
+        if style != ROUND or not points:
+            return []
+        # A round buffer of a point is a circle
+        return [arc_piece(points[0], distance, 0, -2 * math.pi)]
+
+    angles = [math.atan2(y1 - y0, x1 - x0) for (x0, y0), (x1, y1) in zip(points[:-1], points[1:])]
+    pieces = []
+    for i, angle in enumerate(angles):
+        ox = distance * math.cos(angle + math.pi / 2)
+        oy = distance * math.sin(angle + math.pi / 2)
+        (x0, y0), (x1, y1) = points[i], points[i + 1]
+        if style == RIGHT_FLAT:
+            pieces.append([(x0, y0), (x1, y1), (x1 - ox, y1 - oy), (x0 - ox, y0 - oy)])
+        else:
+            pieces.append([(x0 + ox, y0 + oy), (x1 + ox, y1 + oy), (x1 - ox, y1 - oy), (x0 - ox, y0 - oy)])
+
+    for i in range(len(angles) - 1):
+        turn = (angles[i + 1] - angles[i] + math.pi) % (2 * math.pi) - math.pi
+        if turn < 0 and style != RIGHT_FLAT:
+            # Right turn, the left side is on the outside
+            pieces.append(arc_piece(points[i + 1], distance, angles[i] + math.pi / 2, turn))
+        elif turn > 0:
+            pieces.append(arc_piece(points[i + 1], distance, angles[i] - math.pi / 2, turn))
+
+    if style == ROUND:
+        pieces.append(arc_piece(points[0], distance, angles[0] - math.pi / 2, -2 * math.pi))
+        pieces.append(arc_piece(points[-1], distance, angles[-1] + math.pi / 2, -2 * math.pi))
+    return pieces
+
+
+def snap(point):
+    """Rounds a point to the precision the outline is traced at, so shared vertices compare equal"""
+    return (round(point[0], __snap_decimals__), round(point[1], __snap_decimals__))
+
+
+def piece_edge_lines(piece):
+    """Returns the (x, y, unit_x, unit_y) line of each edge of a piece"""
+    lines = []
+    for (x0, y0), (x1, y1) in zip(piece, piece[1:] + piece[:1]):
+        length = math.hypot(x1 - x0, y1 - y0)
+        lines.append((x0, y0, (x1 - x0) / length, (y1 - y0) / length))
+    return lines
+
+
+def fragment_in_piece(edge_lines, point, direction, keep_shared):
+    """
+    Returns True if an edge fragment is covered by a clockwise convex piece, so it is not on the outline
+
+    Parameters
+    ----------
+    edge_lines : list - piece_edge_lines of the piece
+    point : (x, y) - midpoint of the fragment
+    direction : (x, y) - unit direction of the fragment
+    keep_shared : boolean - If the fragment lies on an edge of the piece running the same
+                  way, whether this fragment is the one kept on the outline
+    """
+
+    shared_edge = None
+    for x0, y0, ux, uy in edge_lines:
+        # Signed distance of the point from the edge, negative is inside
+        distance = ux * (point[1] - y0) - uy * (point[0] - x0)
+        if distance > __touch_tolerance__:
+            return False
+        if distance >= -__touch_tolerance__:
+            shared_edge = (ux, uy)
+    if shared_edge is None:
+        return True
+    if shared_edge[0] * direction[0] + shared_edge[1] * direction[1] < 0:
+        # Edge between two pieces, there is swath on both sides of it
+        return True
+    return not keep_shared
+
+
+def overlapping_piece_pairs(boxes, cell_size):
+    """Returns the pairs of pieces whose bounding boxes overlap, found through a grid of cell_size"""
+
+    cells = {}
+    for i, (min_x, min_y, max_x, max_y) in enumerate(boxes):
+        for column in range(int(math.floor(min_x / cell_size)), int(math.floor(max_x / cell_size)) + 1):
+            for row in range(int(math.floor(min_y / cell_size)), int(math.floor(max_y / cell_size)) + 1):
+                cells.setdefault((column, row), []).append(i)
+    pairs = set()
+    for cell_pieces in cells.values():
+        for a in range(len(cell_pieces)):
+            i = cell_pieces[a]
+            for j in cell_pieces[a + 1:]:
+                if boxes[i][0] <= boxes[j][2] and boxes[j][0] <= boxes[i][2] and boxes[i][1] <= boxes[j][3] and boxes[j][1] <= boxes[i][3]:
+                    pairs.add((i, j))
+    return sorted(pairs)
+
+
+def touching_points(a0, a1, b0, b1):
+    """Returns the ends of segment b0-b1 that lie on segment a0-a1, within the snapping precision"""
+    dx, dy = a1[0] - a0[0], a1[1] - a0[1]
+    length = math.hypot(dx, dy)
+    points = []
+    for point in (b0, b1):
+        t = ((point[0] - a0[0]) * dx + (point[1] - a0[1]) * dy) / (length * length)
+        if 0 < t < 1 and abs(dx * (point[1] - a0[1]) - dy * (point[0] - a0[0])) <= __touch_tolerance__ * length:
+            points.append(point)
+    return points
+
+
+def union_outline(pieces):
+    """
+    Traces the outline of the union of convex pieces. The edges of every piece are split
+    where they cross the edges of the other pieces, the edge fragments with no piece on
+    their outer (left) side are the outline and are chained into rings.
+
+    Parameters
+    ----------
+    pieces : list<list<(x, y)>> - clockwise convex polygons, not closed
+
+    Returns
+    -------
+    rings : list<list<(x, y)>> - closed rings, clockwise for outer rings and anticlockwise for holes
+    """
+
+    pieces = [remove_repeated_vertices([snap(point) for point in piece]) for piece in pieces]
+    pieces = [piece[:-1] if piece[0] == piece[-1] else piece for piece in pieces]
+    pieces = [piece for piece in pieces if len(piece) > 2 and ring_signed_area(piece + piece[:1]) < 0]
+    if not pieces:
+        return []
+
+    edges = [list(zip(piece, piece[1:] + piece[:1])) for piece in pieces]
+    edge_lines = [piece_edge_lines(piece) for piece in pieces]
+    # Bounding boxes are widened by the touch tolerance so edges that only touch are compared
+    edge_boxes = [[(min(a0[0], a1[0]) - __touch_tolerance__, min(a0[1], a1[1]) - __touch_tolerance__,
+                    max(a0[0], a1[0]) + __touch_tolerance__, max(a0[1], a1[1]) + __touch_tolerance__) for a0, a1 in piece_edges] for piece_edges in edges]
+    boxes = [(min([box[0] for box in piece_boxes]), min([box[1] for box in piece_boxes]),
+              max([box[2] for box in piece_boxes]), max([box[3] for box in piece_boxes])) for piece_boxes in edge_boxes]
+    cell_size = max([max(box[2] - box[0], box[3] - box[1]) for box in boxes])
+    neighbours = [[] for piece in pieces]
+    splits = [[[] for edge in piece_edges] for piece_edges in edges]
+    for i, j in overlapping_piece_pairs(boxes, cell_size):
+        neighbours[i].append(j)
+        neighbours[j].append(i)
+        for a, (a0, a1) in enumerate(edges[i]):
+            a_box = edge_boxes[i][a]
+            for b, (b0, b1) in enumerate(edges[j]):
+                b_box = edge_boxes[j][b]
+                if a_box[2] < b_box[0] or b_box[2] < a_box[0] or a_box[3] < b_box[1] or b_box[3] < a_box[1]:
+                    continue
+                # Vertices on the other edge split it, this covers collinear edges and corners that
+                # touch an edge, where the intersection is too close to an end to be found reliably
+                splits[i][a].extend(touching_points(a0, a1, b0, b1))
+                splits[j][b].extend(touching_points(b0, b1, a0, a1))
+                intersection = segment_intersection(a0, a1, b0, b1)
+                if intersection:
+                    # The same snapped point splits both edges so their fragments share it
+                    intersection = snap(intersection)
+                    splits[i][a].append(intersection)
+                    splits[j][b].append(intersection)
+
+    outline = {}
+    for i, piece_edges in enumerate(edges):
+        covering = None
+        for (a0, a1), edge_splits in zip(piece_edges, splits[i]):
+            dx, dy = a1[0] - a0[0], a1[1] - a0[1]
+            length = math.hypot(dx, dy)
+            edge_points = sorted(set([a0, a1] + edge_splits), key=lambda point: (point[0] - a0[0]) * dx + (point[1] - a0[1]) * dy)
+            direction = (dx / length, dy / length)
+            for start, end in zip(edge_points[:-1], edge_points[1:]):
+                if start == end or (start, end) in outline:
+                    continue
+                # Fragments are split where they cross other pieces, so the midpoint is inside,
+                # outside or on the edge of each other piece for the whole fragment. The piece
+                # covering the last fragment is tried first, neighbouring fragments are often both in it.
+                x, y = midpoint = ((start[0] + end[0]) / 2, (start[1] + end[1]) / 2)
+                if covering is not None and fragment_in_piece(edge_lines[covering], midpoint, direction, i < covering):
+                    continue
+                for j in neighbours[i]:
+                    box = boxes[j]
+                    if box[0] <= x <= box[2] and box[1] <= y <= box[3] and fragment_in_piece(edge_lines[j], midpoint, direction, i < j):
+                        covering = j
+                        break
+                else:
+                    outline[(start, end)] = True
+
+    fragments = {}
+    for start, end in outline:
+        fragments.setdefault(start, []).append(end)
+    rings = []
+    while fragments:
+        start = next(iter(fragments))
+        ring = [start]
+        while True:
+            point = ring[-1]
+            if point not in fragments:
+                # Pieces meeting in a sliver narrower than the snapping precision can leave a gap
+                # in the outline, it is closed or joined to the nearest fragment within the tolerance
+                if distance_squared(point, start) <= __join_tolerance__ ** 2 and len(ring) > 2:
+                    ring.append(start)
+                    rings.append(ring)
+                    break
+                point = nearest_point(fragments, point, __join_tolerance__)
+                if point is None:
+                    break
+                ring.append(point)
+            ends = fragments[point]
+            end = ends.pop()
+            if not ends:
+                del fragments[point]
+            ring.append(end)
+            if end == start:
+                rings.append(ring)
+                break
+    return rings
+
+
+def distance_squared(a, b):
+    return (a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2
+
+
+def nearest_point(points, point, tolerance):
+    """Returns the nearest of the points within the tolerance of the point, None if there is none"""
+    if not points:
+        return None
+    nearest = min(points, key=lambda other: distance_squared(other, point))
+    if distance_squared(nearest, point) <= tolerance ** 2:
+        return nearest
+    return None
+
+
+def swath_rings(parts, distance, style):
+    """
+    Returns the outline of the swath of a line, the equivalent of Buffer_analysis. Parts
+    and turns tighter than the buffer distance overlap, so the swath is traced as the
+    union of its pieces rather than by offsetting the line.
+
+    Parameters
+    ----------
+    parts : list<list<(x, y)>> - parts of the line
+    distance : float - Buffer distance, half the swath width
+    style : str - ROUND, FLAT or RIGHT_FLAT
+
+    Returns
+    -------
+    rings : list<list<(x, y)>> - closed rings, clockwise for outer rings and anticlockwise for holes,
+            empty if the line has no swath
+    """
+
+    pieces = []
+    for part in parts:
+        pieces.extend(swath_pieces(part, distance, style))
+    return union_outline(pieces)
+
+
+def polygon_area(rings):
+    """
+    Returns the planar area of a polygon using the shoelace formula
+
+    Parameters
+    ----------
+    rings : list<list<(x, y)>> - closed rings, clockwise for outer rings and anticlockwise for holes
+    """
+
+    return abs(sum([ring_signed_area(ring) for ring in rings]))
+
+
+def swath_hectares(rings):
+    """
+    Returns the hectares of a swath to 4 decimal places
+
+    Parameters
+    ----------
+    rings : list<list<(x, y)>> - outline of the swath from swath_rings, overlapping passes of the
+            line are already dissolved so they are only counted once
+    """
+
+    return round(polygon_area(rings) / 10000, 4)
+
+
+def swath_polygons(rows, style, time_index, distance_index):
+    """
+    Builds the swaths of a batch of lines
+
+    Parameters
+    ----------
+    rows : iterable<list> - rows whose first value is the line, a list of parts of (x, y)
+    style : str - ROUND, FLAT or RIGHT_FLAT
+    time_index : int - index of the Time value in each row
+    distance_index : int - index of the buffer distance in each row
+
+    Returns
+    -------
+    swath_rows : list<list> - the rows with the line replaced by the rings of its swath, sorted
+                 by Time. Rows without a swath eg. zero buffer distance are left out.
+    """
+
+    if style not in BUFFER_STYLES:
+        raise ValueError("Unknown buffer style {0}, expected one of {1}".format(style, BUFFER_STYLES))
+    swath_rows = []
+    for row in rows:
+        rings = swath_rings(row[0], row[distance_index], style)
+        if rings:
+            swath_rows.append([rings] + list(row[1:]))
+    swath_rows.sort(key=lambda swath_row: swath_row[time_index] or '')
+    return swath_rows
+
+
+def swath_polygon_groups(grouped_rows, time_index, distance_index, max_workers=None):
+    """
+    Builds the swaths of groups of lines with different buffer styles, each group
+    in one batch. When there is more than one group they are built concurrently in
+    worker processes.
+
+    Parameters
+    ----------
+    grouped_rows : dict - {buffer_style: list<list>} rows as passed to swath_polygons
+    time_index : int - index of the Time value in each row
+    distance_index : int - index of the buffer distance in each row
+    max_workers : int - Number of worker processes, defaults to one per group
+
+    Returns
+    -------
+    swath_rows : list<list> - the swath rows of every group merged in Time order
+    """
+
+    styles = sorted(grouped_rows)
+    if len(styles) > 1:
+        with process_pool.process_pool_executor(max_workers or len(styles)) as executor:
+            results = list(executor.map(swath_polygons, [grouped_rows[style] for style in styles], styles,
+                                        repeat(time_index), repeat(distance_index)))
+    else:
+        results = [swath_polygons(grouped_rows[style], style, time_index, distance_index) for style in styles]
+    return list(heapq.merge(*results, key=lambda swath_row: swath_row[time_index] or ''))
@@ -0,0 +1,104 @@
+# Flightline Project
+
+# Description:
+# Plans a tiled dissolve of the swath polygons. Polygons are partitioned into
+# square tiles by their centroid so each tile can be unioned in a worker process,
+# the tile results of each block are then unioned together to stitch the tile
+# boundaries. Contains no arcpy, the unions are passed in as functions.
+
+import math
+
+# Default tile size in metres, a few swath widths across a typical block
+__default_tile_size__ = 2000.0
+
+
+def tile_key(x, y, tile_size):
+    """Returns the (column, row) of the tile containing the point"""
+
+    return (int(math.floor(x / tile_size)), int(math.floor(y / tile_size)))
+
+
+def partition(rows, tile_size):
+    """
+    Partitions polygons into tiles by their centroid, each polygon is in one tile only
+
+    Parameters
+    ----------
+    rows : iterable<(block_name, x, y, polygon)> - x, y is the centroid of the polygon
+    tile_size : float - Size of the square tiles in the units of the centroids
+
+    Returns
+    -------
+    tiles : dict - {(column, row): {block_name: list<polygon>}}
+    """
+
+    if tile_size <= 0:
+        raise ValueError("tile_size must be greater than 0, got {0}".format(tile_size))
+    tiles = {}
+    for block_name, x, y, polygon in rows:
+        tiles.setdefault(tile_key(x, y, tile_size), {}).setdefault(block_name, []).append(polygon)
+    return tiles
+
+
+def tile_tasks(tiles):
+    """
+    Returns the union task of each block in each tile, in tile order
+
+    Returns
+    -------
+    tasks : list<[block_name, list<polygon>]>
+    """
+
+    tasks = []
+    for key in sorted(tiles):
+        for block_name in sorted(tiles[key], key=lambda name: name or ''):
+            tasks.append([block_name, tiles[key][block_name]])
+    return tasks
+
+
+def group_by_block(tasks, results):
+    """
+    Groups the results of the tile tasks by block, ready to be stitched
+
+    Parameters
+    ----------
+    tasks : list<[block_name, list<polygon>]> - see tile_tasks
+    results : iterable - result of each task
+
+    Returns
+    -------
+    block_names, block_pieces : list, list<list> - the pieces of each block in the order of block_names
+    """
+
+    pieces = {}
+    for (block_name, polygons), result in zip(tasks, results):
+        pieces.setdefault(block_name, []).append(result)
+    block_names = sorted(pieces, key=lambda name: name or '')
+    return block_names, [pieces[block_name] for block_name in block_names]
+
+
+def pairwise_reduce(values, function):
+    """
+    Reduces the values by applying function to pairs of values until one is left. Unioning
+    pairs keeps the geometries of each union of similar size, rather than unioning every
+    polygon into one ever larger geometry.
+
+    Parameters
+    ----------
+    values : list
+    function : function(value, value) -> value
+
+    Returns
+    -------
+    value - None if there are no values
+    """
+
+    values = list(values)
+    if not values:
+        return None
+    while len(values) > 1:
+        reduced = [function(values[i], values[i + 1]) for i in range(0, len(values) - 1, 2)]
+        if len(values) % 2:
+            reduced.append(values[-1])
+        values = reduced
+    return values[0]
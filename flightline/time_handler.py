@@ -0,0 +1,124 @@
+# Flightline Project
+
+# Description:
+# Normalises and parses the Time values of tracmap records. Times are stored in
+# the flight data featureclasses as text eg. '2017-08-29T09:37:50+1300'. Columns
+# of these are parsed into seconds in one pass so comparisons between records
+# use integers rather than a datetime.strptime call per record.
+
+import datetime
+from array import array
+
+__default_utc_offset__ = '+1300'
+__epoch__ = datetime.datetime(1970, 1, 1)
+
+
+def validate_utc_offset(utc_offset):
+    """
+    Checks a UTC offset is in the +HHMM form used by tracmap
+
+    Parameters
+    ----------
+    utc_offset : str - eg. '+1300'
+
+    Returns
+    -------
+    utc_offset : str
+    """
+
+    if len(utc_offset) != 5 or utc_offset[0] not in '+-' or not utc_offset[1:].isdigit():
+        raise ValueError("UTC offset {0} is not in the form +HHMM".format(utc_offset))
+    return utc_offset
+
+
+def tracmap_v1_time(date_text, time_text, utc_offset=__default_utc_offset__):
+    """
+    Returns the Time value of a tracmap version 1 record, which has its date and
+    time in separate fields, in the form used by tracmap version 2
+
+    Parameters
+    ----------
+    date_text : str - eg. '2014-11-30'
+    time_text : str - eg. '07:45:10.0000', the fraction of a second is dropped whatever its width
+    utc_offset : str - UTC offset the tracmap unit was recording in eg. '+1300'
+
+    Returns
+    -------
+    time_value : str - eg. '2014-11-30T07:45:10+1300'
+    """
+
+    return "{0}T{1}{2}".format(date_text, time_text[:8], utc_offset)
+
+
+def datetime_seconds(date_time):
+    """Returns the seconds since 1970-01-01 of a naive datetime"""
+
+    return int((date_time - __epoch__).total_seconds())
+
+
+def seconds_datetime(seconds):
+    """Returns the naive datetime of a number of seconds since 1970-01-01"""
+
+    return __epoch__ + datetime.timedelta(seconds=seconds)
+
+
+def time_column_seconds(time_values):
+    """
+    Parses a column of Time values into the seconds since 1970-01-01 of their
+    local time, ignoring the UTC offset, as datetime.strptime(value[0:19]) would.
+    Each date is only parsed once as the records of a download share a few dates.
+
+    Parameters
+    ----------
+    time_values : iterable<str> - eg. ['2017-08-29T09:37:50+1300', ...]
+
+    Returns
+    -------
+    seconds : array('q')
+    """
+
+    date_seconds = {}
+    seconds = array('q')
+    for time_value in time_values:
+        date_text = time_value[0:10]
+        day_seconds = date_seconds.get(date_text)
+        if day_seconds is None:
+            day_seconds = datetime_seconds(datetime.datetime(int(date_text[0:4]), int(date_text[5:7]), int(date_text[8:10])))
+            date_seconds[date_text] = day_seconds
+        seconds.append(day_seconds + int(time_value[11:13]) * 3600 + int(time_value[14:16]) * 60 + int(time_value[17:19]))
+    return seconds
+
+
+def time_seconds(time_value):
+    """Parses a single Time value, see time_column_seconds"""
+
+    return time_column_seconds([time_value])[0]
+
+
+def last_time_by_group(rows, key_index, time_index):
+    """
+    Returns the latest Time value of each group of rows in one pass. Times are compared on
+    their local time, ignoring the UTC offset like time_column_seconds, which for the
+    'YYYY-MM-DDTHH:MM:SS' prefix is the same as comparing the text.
+
+    Parameters
+    ----------
+    rows : iterable<list> - eg. rows of a SearchCursor
+    key_index : int or list<int> - Index of the value, or values, the rows are grouped by
+    time_index : int - Index of the Time value, rows without a Time are ignored
+
+    Returns
+    -------
+    last_times : dict - {key: time_text}, the key is a tuple if key_index is a list
+    """
+
+    last_times = {}
+    for row in rows:
+        time_value = row[time_index]
+        if not time_value:
+            continue
+        key = tuple([row[i] for i in key_index]) if isinstance(key_index, list) else row[key_index]
+        last_time = last_times.get(key)
+        if last_time is None or time_value[0:19] > last_time[0:19]:
+            last_times[key] = time_value
+    return last_times
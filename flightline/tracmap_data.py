@@ -0,0 +1,220 @@
+# Flightline Project
+
+# Description:
+# Parses and normalises tracmap shapefile records into the layout of the
+# flight data featureclasses. Contains no arcpy so it can run in worker processes.
+
+import os
+from collections import namedtuple
+
+from flightline import dedup_index
+from flightline import shapefile_reader
+from flightline import time_handler
+
+ParsedShapefile = namedtuple('ParsedShapefile', ['shapefile', 'shape_type', 'spatial_reference_wkt', 'field_list', 'rows'])
+ShapefileValidation = namedtuple('ShapefileValidation', ['shapefile', 'valid', 'reason', 'record_count', 'shape_type',
+                                                         'field_list', 'tracmap_version', 'spatial_reference_wkt'])
+
+__mergeable_shape_types__ = ['Polyline', 'Point']
+
+
+def tracmap_block_name(tracmap_data_directory, shapefile, tracmap_version):
+    """
+    Returns the block name of a tracmap shapefile. This is the name of the folder
+    the shapefile is in, unless the shapefile is in the root of the download.
+
+    Parameters
+    ----------
+    tracmap_data_directory : str - Directory containing the tracmap data
+    shapefile : str - location of the shapefile
+    tracmap_version : int - 1 or 2
+
+    Returns
+    -------
+    block_name : str
+    """
+
+    block_name = os.path.basename(os.path.dirname(shapefile))
+    if block_name != os.path.basename(tracmap_data_directory):
+        return block_name
+    if tracmap_version == 1:
+        # Tracmap version 1 prefixes the shapefile name with the block name
+        if shapefile.endswith('log.shp'):
+            return os.path.basename(shapefile)[:-7]
+        return os.path.basename(shapefile)[:-13]
+    return ''
+
+
+def tracmap_version(field_list):
+    """
+    Returns the tracmap version from the field names, field_list[0] being the geometry
+
+    Returns
+    -------
+    version : int - 1 (Date and Time fields are seperated), 2 (Date and Time are concatenated) or None
+    """
+
+    if field_list[1] == 'Date':
+        return 1
+    if field_list[1] == 'Time':
+        return 2
+    return None
+
+
+def normalise_tracmap_rows(tracmap_data_directory, shapefile, field_list, rows, utc_offset=time_handler.__default_utc_offset__):
+    """
+    Converts tracmap rows into the layout of the flight data featureclasses.
+    Version 1 Date and Time values are concatenated into the Time field and the
+    BlockName is appended to every row.
+
+    Parameters
+    ----------
+    tracmap_data_directory : str - Directory containing the tracmap data
+    shapefile : str - location of the shapefile the rows are from
+    field_list : list<str> - field names of the rows, the geometry is the first value
+    rows : iterable<list> - rows of the shapefile
+    utc_offset : str - UTC offset of version 1 times eg. '+1300'
+
+    Returns
+    -------
+    [destination_field_list, keyed_rows] - keyed_rows is a generator of
+    (Time/Speed key, row). Both are None if the tracmap version is not recognised.
+    """
+
+    version = tracmap_version(field_list)
+    if version is None:
+        return [None, None]
+    time_handler.validate_utc_offset(utc_offset)
+    block_name = tracmap_block_name(tracmap_data_directory, shapefile, version)
+    destination_field_list = list(field_list)
+    if version == 1:
+        destination_field_list.pop(1)
+    destination_field_list.append('BlockName')
+
+    def keyed_rows():
+        for row in rows:
+            row = list(row)
+            if version == 1:
+                row[1] = time_handler.tracmap_v1_time(row[1], row[2], utc_offset)
+                del row[2]
+            row.append(block_name)
+            yield dedup_index.time_speed_key(row[1], row[2]), row
+
+    return [destination_field_list, keyed_rows()]
+
+
+def validate_tracmap_shapefile(shapefile):
+    """
+    Validates a tracmap shapefile from the .shp header, .dbf header and .prj file
+    without reading any records. Shapefiles that are empty, are not points or polylines
+    or whose fields are not a known tracmap version are not valid.
+
+    Parameters
+    ----------
+    shapefile : str - location of the shapefile
+
+    Returns
+    -------
+    validation : ShapefileValidation - reason is None if the shapefile is valid,
+                 spatial_reference_wkt is None if the projection is not defined
+    """
+
+    try:
+        reader = shapefile_reader.ShapefileReader(shapefile)
+    except (IOError, ValueError) as e:
+        return ShapefileValidation(shapefile, False, str(e), 0, None, [], None, None)
+
+    field_list = ['SHAPE@'] + reader.field_names
+    version = tracmap_version(field_list) if len(field_list) > 1 else None
+    reason = None
+    if reader.record_count == 0:
+        reason = "{0} contains no records".format(shapefile)
+    elif reader.shape_type_name not in __mergeable_shape_types__:
+        reason = "{0} is of type {1}, expected {2}".format(shapefile, reader.shape_type_name, ' or '.join(__mergeable_shape_types__))
+    elif version is None:
+        reason = "{0} fields are not a known tracmap version".format(shapefile)
+    return ShapefileValidation(shapefile, reason is None, reason, reader.record_count, reader.shape_type_name,
+                               field_list, version, reader.spatial_reference_wkt)
+
+
+def coordinate_system_wkt(coordinate_system):
+    """
+    Returns the well known text of a coordinate system
+
+    Parameters
+    ----------
+    coordinate_system : arcpy.SpatialReference or str - A spatial reference, or the string exported from
+                        one eg. FlightlineProject.default_tracmap_data_projection_system
+    """
+
+    if not isinstance(coordinate_system, str):
+        coordinate_system = coordinate_system.exportToString()
+    # The well known text is followed by the coordinate system extents and resolution
+    return coordinate_system.split(';')[0]
+
+
+def write_projection_file(shapefile, spatial_reference_wkt):
+    """
+    Defines the projection of a shapefile by writing its .prj file
+
+    Parameters
+    ----------
+    shapefile : str - location of the shapefile
+    spatial_reference_wkt : str - ESRI well known text of the coordinate system
+    """
+
+    prj_file = "{0}.prj".format(os.path.splitext(shapefile)[0])
+    with open(prj_file, 'w') as prj:
+        prj.write(spatial_reference_wkt)
+
+
+def parse_tracmap_shapefile(tracmap_data_directory, shapefile, utc_offset=time_handler.__default_utc_offset__):
+    """
+    Reads a tracmap shapefile and normalises its records. Records without
+    geometry are skipped. The rows are streamed from the shapefile as a generator
+    of (Time/Speed key, row) with the geometry as coordinates.
+
+    Parameters
+    ----------
+    tracmap_data_directory : str - Directory containing the tracmap data
+    shapefile : str - location of the shapefile
+    utc_offset : str - UTC offset of version 1 times eg. '+1300'
+
+    Returns
+    -------
+    parsed_shapefile : ParsedShapefile - field_list is None and there are no rows if the tracmap version is not recognised
+    """
+
+    reader = shapefile_reader.ShapefileReader(shapefile)
+    field_list = ['SHAPE@'] + reader.field_names
+    rows = (row for row in reader if row[0])
+    destination_field_list, keyed_rows = normalise_tracmap_rows(tracmap_data_directory, shapefile, field_list, rows, utc_offset)
+    if destination_field_list is None:
+        return ParsedShapefile(shapefile, reader.shape_type_name, reader.spatial_reference_wkt, None, [])
+    return ParsedShapefile(shapefile, reader.shape_type_name, reader.spatial_reference_wkt, destination_field_list, keyed_rows)
+
+
+def parse_tracmap_download(tracmap_data_directory, shapefile_lists, utc_offset=time_handler.__default_utc_offset__):
+    """
+    Parses all the shapefiles of a download, reading every record into memory.
+    This is run in a worker process so everything returned can be pickled.
+
+    Parameters
+    ----------
+    tracmap_data_directory : str - Directory containing the tracmap data
+    shapefile_lists : dict - {shapefile_name: list<str>} eg. {'log.shp': ['./ABC/0910/Block1/log.shp']}
+    utc_offset : str - UTC offset of version 1 times eg. '+1300'
+
+    Returns
+    -------
+    parsed_download : dict - {shapefile_name: list<ParsedShapefile>} - shapefiles that are not a known
+                      tracmap version are kept with a field_list of None so they can be reported
+    """
+
+    parsed_download = {}
+    for shapefile_name, shapefile_list in shapefile_lists.items():
+        parsed_download[shapefile_name] = []
+        for shapefile in shapefile_list:
+            parsed = parse_tracmap_shapefile(tracmap_data_directory, shapefile, utc_offset)
+            parsed_download[shapefile_name].append(parsed._replace(rows=list(parsed.rows)))
+    return parsed_download
@@ -0,0 +1,402 @@
+# Flightline Project
+
+# Description:
+# Watches a drop folder for tracmap exports and ingests them into a flightline
+# project as soon as they are complete. Exports are dropped into the folder as
+# <drop_folder>/<helicopter_rego>/<download_time>. Uses inotify where it is
+# available and polls the drop folder otherwise.
+#
+# Usage:
+# python -m flightline.watch_folder <project_folder> <drop_folder> [--deflector]
+
+import os
+import sys
+import time
+import queue
+import select
+import ctypes
+import ctypes.util
+import logging
+import argparse
+import threading
+
+from flightline import download_index
+
+logger = logging.getLogger(__name__)
+
+
+def export_folders(drop_folder):
+    """
+    Returns the export folders in the drop folder
+
+    Returns
+    -------
+    export_list : list<[export_folder, helicopter_rego, download_time]>
+    """
+
+    export_list = []
+    for helicopter_rego in sorted(os.listdir(drop_folder)):
+        helicopter_folder = os.path.join(drop_folder, helicopter_rego)
+        if not os.path.isdir(helicopter_folder):
+            continue
+        for download_time in sorted(os.listdir(helicopter_folder)):
+            export_folder = os.path.join(helicopter_folder, download_time)
+            if os.path.isdir(export_folder):
+                export_list.append([export_folder, helicopter_rego, download_time])
+    return export_list
+
+
+def export_signature(export_folder):
+    """
+    Returns the number, total size and latest modified time of the files in an export
+
+    Returns
+    -------
+    signature : tuple
+    """
+
+    file_count = 0
+    total_size = 0
+    latest_mtime = 0
+    for dirpath, dirnames, filenames in os.walk(export_folder):
+        for filename in filenames:
+            stat = os.stat(os.path.join(dirpath, filename))
+            file_count += 1
+            total_size += stat.st_size
+            latest_mtime = max(latest_mtime, stat.st_mtime_ns)
+    return (file_count, total_size, latest_mtime)
+
+
+def export_complete(export_folder):
+    """
+    Checks an export contains a log and a secondary shapefile, each with
+    their .shx and .dbf files, and a summary .txt file
+
+    Returns
+    -------
+    complete : boolean
+    """
+
+    export_index = download_index.DownloadIndex(export_folder)
+    for shapefile_list in export_index.shapefiles.values():
+        if not shapefile_list:
+            return False
+        if not all([export_index.has_sidecars(shapefile) for shapefile in shapefile_list]):
+            return False
+    return bool(export_index.summary_files)
+
+
+class ExportDetector(object):
+    """
+    Finds exports in the drop folder that are complete and have not changed
+    for settle_seconds, so exports still being copied are not ingested.
+    """
+
+    def __init__(self, drop_folder, settle_seconds=5):
+        """
+        Parameters
+        ----------
+        drop_folder : str - Folder the tracmap exports are dropped into
+        settle_seconds : float - Time an export must be unchanged before it is ingested
+        """
+
+        self.drop_folder = drop_folder
+        self.settle_seconds = settle_seconds
+        self.signatures = {}
+        self.detected = set()
+        self.retry_times = {}
+
+    def scan(self):
+        """
+        Returns
+        -------
+        [ready, pending] - ready is a list of [export_folder, helicopter_rego, download_time]
+        not returned by a previous scan, pending is the number of exports waiting to settle
+        """
+
+        ready = []
+        pending = 0
+        now = time.time()
+        for export in export_folders(self.drop_folder):
+            export_folder = export[0]
+            if export_folder in self.detected:
+                continue
+            if self.retry_times.get(export_folder, 0) > now:
+                pending += 1
+                continue
+            self.retry_times.pop(export_folder, None)
+            signature = export_signature(export_folder)
+            previous = self.signatures.get(export_folder)
+            if not previous or previous[0] != signature:
+                self.signatures[export_folder] = [signature, now]
+                previous = self.signatures[export_folder]
+            if not export_complete(export_folder) or now - previous[1] < self.settle_seconds:
+                pending += 1
+                continue
+            self.detected.add(export_folder)
+            del self.signatures[export_folder]
+            ready.append(export)
+        return [ready, pending]
+
+    def retry(self, export_folder, retry_seconds=0):
+        """Returns an export that failed to ingest to the scan, it is ready again after retry_seconds"""
+        self.retry_times[export_folder] = time.time() + retry_seconds
+        self.detected.discard(export_folder)
+
+
+class PollingWatcher(object):
+    """Waits a fixed interval between scans of the drop folder"""
+
+    def __init__(self, drop_folder, poll_interval=5):
+        self.drop_folder = drop_folder
+        self.poll_interval = poll_interval
+        self.wake_event = threading.Event()
+
+    def wait(self, timeout=None):
+        """Sleeps for the poll interval, or the timeout if it is shorter, unless woken"""
+        woken = self.wake_event.wait(self.poll_interval if timeout is None else min(timeout, self.poll_interval))
+        self.wake_event.clear()
+        return not woken
+
+    def wake(self):
+        """Ends a wait from another thread"""
+        self.wake_event.set()
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher(object):
+    """
+    Waits for files to be written or moved into the drop folder using the linux
+    inotify api. Every folder in the drop folder is watched, new folders are
+    watched as they are found.
+    """
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+
+    def __init__(self, drop_folder):
+        self.drop_folder = drop_folder
+        self.watched = set()
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        # Writing to the pipe ends a wait, so another thread can stop the watcher
+        self.wake_read, self.wake_write = os.pipe()
+        os.set_blocking(self.wake_read, False)
+        os.set_blocking(self.wake_write, False)
+        self.watch_tree()
+
+    @staticmethod
+    def available():
+        """Returns True if inotify can be used on this platform"""
+        if not sys.platform.startswith('linux'):
+            return False
+        library = ctypes.util.find_library('c')
+        return bool(library) and hasattr(ctypes.CDLL(library), 'inotify_init1')
+
+    def watch_tree(self):
+        """Adds a watch to every folder in the drop folder not already watched"""
+        mask = self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE | self.IN_DELETE
+        for dirpath, dirnames, filenames in os.walk(self.drop_folder):
+            if dirpath in self.watched:
+                continue
+            if self.libc.inotify_add_watch(self.fd, os.fsencode(dirpath), mask) >= 0:
+                self.watched.add(dirpath)
+
+    def wait(self, timeout=None):
+        """
+        Waits for a change in the drop folder
+
+        Parameters
+        ----------
+        timeout : float - Seconds to wait, waits until there is a change if None
+
+        Returns
+        -------
+        changed : boolean
+        """
+
+        readable = select.select([self.fd, self.wake_read], [], [], timeout)[0]
+        if self.wake_read in readable:
+            try:
+                while os.read(self.wake_read, 512):
+                    pass
+            except BlockingIOError:
+                pass
+            return False
+        if not readable:
+            return False
+        # The events are only used to trigger a scan so they are discarded
+        try:
+            while os.read(self.fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+        self.watched = set([d for d in self.watched if os.path.isdir(d)])
+        self.watch_tree()
+        return True
+
+    def wake(self):
+        """Ends a wait from another thread"""
+        try:
+            os.write(self.wake_write, b'\0')
+        except (BlockingIOError, OSError):
+            # The pipe is full so a wake is already pending, or the watcher is closed
+            pass
+
+    def close(self):
+        os.close(self.fd)
+        os.close(self.wake_read)
+        os.close(self.wake_write)
+
+
+class WatchFolder(object):
+    """
+    Ingests the exports found in a drop folder into a flightline project.
+    Exports are put on a bounded queue and ingested one at a time by a worker
+    thread, so the flight data gdb is only written to by one process.
+    """
+
+    def __init__(self, project, drop_folder, coordinate_system, deflector=False, queue_size=4,
+                 settle_seconds=5, poll_interval=5, use_inotify=True, retry_seconds=60):
+        """
+        Parameters
+        ----------
+        project : flightline_project.FlightlineProject - Loaded project
+        drop_folder : str - Folder the tracmap exports are dropped into
+        coordinate_system : arcpy.SpatialReference - Coordinate system of the tracmap data
+        deflector : boolean - Deflector bucket in use
+        queue_size : int - Number of exports that can wait to be ingested
+        settle_seconds : float - Time an export must be unchanged before it is ingested
+        poll_interval : float - Seconds between scans when inotify is not available
+        use_inotify : boolean - Use inotify if it is available
+        retry_seconds : float - Time before an export that failed to ingest is tried again
+        """
+
+        self.project = project
+        self.drop_folder = drop_folder
+        self.coordinate_system = coordinate_system
+        self.deflector = deflector
+        self.retry_seconds = retry_seconds
+        self.detector = ExportDetector(drop_folder, settle_seconds)
+        self.jobs = queue.Queue(maxsize=queue_size)
+        self.stop_event = threading.Event()
+        self.results = []
+        if use_inotify and InotifyWatcher.available():
+            self.watcher = InotifyWatcher(drop_folder)
+        else:
+            self.watcher = PollingWatcher(drop_folder, poll_interval)
+
+    def already_ingested(self, helicopter_rego, download_time):
+        """Returns True if the download has already been copied into the project and processed"""
+        destination_directory = os.path.join(self.project.tracmap_data_folder_location, helicopter_rego, download_time)
+        return destination_directory in self.project.ingested_tracmap_datasets
+
+    def queue_ready_exports(self):
+        """
+        Scans the drop folder and queues the exports that are ready,
+        blocking while the queue is full
+
+        Returns
+        -------
+        pending : int - Number of exports waiting to settle
+        """
+
+        ready, pending = self.detector.scan()
+        for export_folder, helicopter_rego, download_time in ready:
+            if self.already_ingested(helicopter_rego, download_time):
+                logger.info("%s has already been ingested", export_folder)
+                continue
+            logger.info("Queued %s", export_folder)
+            self.jobs.put([export_folder, helicopter_rego, download_time])
+        return pending
+
+    def ingest(self, job):
+        """Ingests an export into the project and saves the project config"""
+        export_folder, helicopter_rego, download_time = job
+        start_time = time.time()
+        result = self.project.ingest_tracmap_download(export_folder, helicopter_rego, download_time,
+                                                      self.coordinate_system, self.deflector)
+        self.project.dump_to_projectconfig()
+        logger.info("Ingested %s in %.1fs: %s lines, %s points, %s flight path records added",
+                    export_folder, time.time() - start_time, result['lines_added'],
+                    result['points_added'], result['flight_path_added'])
+        self.results.append(result)
+        return result
+
+    def worker(self):
+        """Ingests queued exports until a None job is received"""
+        while True:
+            job = self.jobs.get()
+            try:
+                if job is None:
+                    return
+                self.ingest(job)
+            except Exception:
+                # Keep watching, the export is tried again after retry_seconds
+                logger.exception("Failed to ingest %s, retrying in %ss", job[0], self.retry_seconds)
+                self.detector.retry(job[0], self.retry_seconds)
+                self.watcher.wake()
+            finally:
+                self.jobs.task_done()
+
+    def run(self):
+        """Watches the drop folder until stop is called"""
+        worker_thread = threading.Thread(target=self.worker, name='flightline-ingest')
+        worker_thread.start()
+        logger.info("Watching %s with %s", self.drop_folder, type(self.watcher).__name__)
+        try:
+            while not self.stop_event.is_set():
+                pending = self.queue_ready_exports()
+                # Wake up to check exports that are settling, otherwise wait for a change
+                self.watcher.wait(self.detector.settle_seconds if pending else None)
+        finally:
+            self.jobs.put(None)
+            worker_thread.join()
+            self.watcher.close()
+
+    def stop(self):
+        self.stop_event.set()
+        self.watcher.wake()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingests tracmap exports dropped into a folder into a flightline project")
+    parser.add_argument('project_folder', help="Flightline project folder containing projectconfig.json")
+    parser.add_argument('drop_folder', help="Folder exports are dropped into as <helicopter_rego>/<download_time>")
+    parser.add_argument('--deflector', action='store_true', help="Deflector bucket in use")
+    parser.add_argument('--queue-size', type=int, default=4)
+    parser.add_argument('--settle-seconds', type=float, default=5)
+    parser.add_argument('--poll-interval', type=float, default=5)
+    parser.add_argument('--retry-seconds', type=float, default=60, help="Time before an export that failed to ingest is tried again")
+    parser.add_argument('--polling', action='store_true', help="Poll the drop folder rather than using inotify")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    # arcpy is only needed once the watcher is started
+    import arcpy
+    from flightline import flightline_project
+
+    project = flightline_project.FlightlineProject(args.project_folder)
+    if not project.projectconfig_json_exists:
+        parser.error("{0} does not contain a projectconfig.json".format(args.project_folder))
+    project.load_from_projectconfig()
+    arcpy.env.geographicTransformations = 'NZGD_2000_To_WGS_1984_1'
+
+    watch_folder = WatchFolder(project, args.drop_folder, arcpy.SpatialReference(project.__tracmap_data_projection__),
+                               args.deflector, args.queue_size, args.settle_seconds, args.poll_interval,
+                               not args.polling, args.retry_seconds)
+    try:
+        watch_folder.run()
+    except KeyboardInterrupt:
+        watch_folder.stop()
+
+
+if __name__ == '__main__':
+    main()
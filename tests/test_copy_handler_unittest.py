@@ -0,0 +1,131 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from flightline import copy_handler
+
+
+class Resources(object):
+
+    download_files = {os.path.join('Block1', 'log.shp'): b'log' * 1000,
+                      os.path.join('Block1', 'log.dbf'): b'dbf' * 500,
+                      'secondary.shp': b'secondary',
+                      'summary.txt': b'Job summary'}
+
+    @staticmethod
+    def generate_temp_space():
+        """
+        Provides a temp name containing a source download folder
+
+        Returns
+        -------
+        [temp_name, source_folder, destination_folder]
+        """
+        temp_name = tempfile.mkdtemp()
+        source_folder = os.path.join(temp_name, 'usb', 'export')
+        destination_folder = os.path.join(temp_name, 'raw_data', 'NSB', '1102')
+        for relative_path, content in Resources.download_files.items():
+            source_file = os.path.join(source_folder, relative_path)
+            if not os.path.exists(os.path.dirname(source_file)):
+                os.makedirs(os.path.dirname(source_file))
+            with open(source_file, 'wb') as f:
+                f.write(content)
+        return [temp_name, source_folder, destination_folder]
+
+
+class TestCopyFileVerified(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_name, self.source_folder, self.destination_folder = Resources.generate_temp_space()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_name, ignore_errors=True)
+
+    def test_copy_file_verified(self):
+        source_file = os.path.join(self.source_folder, 'summary.txt')
+        destination_file = os.path.join(self.destination_folder, 'summary.txt')
+
+        checksum = copy_handler.copy_file_verified(source_file, destination_file)
+
+        self.assertEqual(checksum, copy_handler.file_checksum(source_file))
+        with open(destination_file, 'rb') as f:
+            self.assertEqual(f.read(), b'Job summary')
+
+
+class TestCopyTreeVerified(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_name, self.source_folder, self.destination_folder = Resources.generate_temp_space()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_name, ignore_errors=True)
+
+    def test_copy_tree_verified(self):
+        result = copy_handler.copy_tree_verified(self.source_folder, self.destination_folder, 2)
+
+        self.assertEqual(result.files_copied, 4, msg = "Expected 4 files copied, got: {0}".format(result.files_copied))
+        self.assertEqual(result.bytes_copied, sum([len(c) for c in Resources.download_files.values()]))
+        self.assertFalse(os.path.exists(self.destination_folder + '.partial'), msg = "Partial folder was not renamed")
+        for relative_path, content in Resources.download_files.items():
+            with open(os.path.join(self.destination_folder, relative_path), 'rb') as f:
+                self.assertEqual(f.read(), content, msg = "{0} was not copied".format(relative_path))
+
+    def test_resume_interrupted_copy(self):
+        # Simulate a copy interrupted after the first file, with a second file half written
+        first_file = os.path.join('Block1', 'log.shp')
+        copy_handler.copy_file_verified(os.path.join(self.source_folder, first_file),
+                                        os.path.join(self.destination_folder + '.partial', first_file))
+        stat = os.stat(os.path.join(self.source_folder, first_file))
+        with open(self.destination_folder + '.partial.journal', 'w') as f:
+            f.write("{0}\t{1}\t{2}\t{3}\n".format(first_file, stat.st_size, stat.st_mtime_ns, copy_handler.file_checksum(os.path.join(self.source_folder, first_file))))
+            f.write("summary.txt\t11\t")
+        with open(os.path.join(self.destination_folder + '.partial', 'summary.txt'), 'wb') as f:
+            f.write(b'Job')
+
+        result = copy_handler.copy_tree_verified(self.source_folder, self.destination_folder)
+
+        self.assertEqual(result.files_resumed, 1, msg = "Expected 1 file resumed, got: {0}".format(result.files_resumed))
+        self.assertEqual(result.files_copied, 3, msg = "Expected 3 files copied, got: {0}".format(result.files_copied))
+        self.assertFalse(os.path.exists(self.destination_folder + '.partial.journal'), msg = "Journal was not removed")
+        with open(os.path.join(self.destination_folder, 'summary.txt'), 'rb') as f:
+            self.assertEqual(f.read(), b'Job summary')
+
+    def test_resume_corrupted_partial_file(self):
+        # Simulate a copy interrupted after the first file, which was then changed in the partial folder
+        first_file = os.path.join('Block1', 'log.shp')
+        partial_file = os.path.join(self.destination_folder + '.partial', first_file)
+        copy_handler.copy_file_verified(os.path.join(self.source_folder, first_file), partial_file)
+        stat = os.stat(os.path.join(self.source_folder, first_file))
+        with open(self.destination_folder + '.partial.journal', 'w') as f:
+            f.write("{0}\t{1}\t{2}\t{3}\n".format(first_file, stat.st_size, stat.st_mtime_ns, copy_handler.file_checksum(partial_file)))
+        with open(partial_file, 'r+b') as f:
+            f.write(b'bad')
+
+        result = copy_handler.copy_tree_verified(self.source_folder, self.destination_folder)
+
+        self.assertEqual(result.files_resumed, 0, msg = "Partial file that does not match its checksum should be copied again")
+        self.assertEqual(result.files_copied, 4)
+        with open(os.path.join(self.destination_folder, first_file), 'rb') as f:
+            self.assertEqual(f.read(), Resources.download_files[first_file])
+
+    def test_resume_removes_stale_files(self):
+        # Simulate a copy interrupted before files were removed from the source
+        stale_files = [os.path.join('Block2', 'log.shp'), 'old_summary.txt']
+        for relative_path in stale_files:
+            copy_handler.copy_file_verified(os.path.join(self.source_folder, 'summary.txt'),
+                                            os.path.join(self.destination_folder + '.partial', relative_path))
+
+        copy_handler.copy_tree_verified(self.source_folder, self.destination_folder)
+
+        for relative_path in stale_files:
+            self.assertFalse(os.path.exists(os.path.join(self.destination_folder, relative_path)),
+                             msg = "{0} is no longer in the source and should not be copied".format(relative_path))
+        self.assertFalse(os.path.exists(os.path.join(self.destination_folder, 'Block2')), msg = "Empty folder was not removed")
+        self.assertTrue(os.path.exists(os.path.join(self.destination_folder, 'summary.txt')))
+
+    def test_existing_destination(self):
+        os.makedirs(self.destination_folder)
+
+        with self.assertRaises(IOError):
+            copy_handler.copy_tree_verified(self.source_folder, self.destination_folder)
@@ -0,0 +1,177 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from flightline import coverage_grid
+
+
+class Resources(object):
+
+    square = [(0.0, 0.0), (0.0, 10.0), (10.0, 10.0), (10.0, 0.0), (0.0, 0.0)]
+    hole = [(2.0, 2.0), (4.0, 2.0), (4.0, 4.0), (2.0, 4.0), (2.0, 2.0)]
+
+    @staticmethod
+    def moved(ring, dx, dy):
+        return [(x + dx, y + dy) for x, y in ring]
+
+
+class TestPolygonCells(unittest.TestCase):
+
+    def test_square(self):
+        cells = coverage_grid.polygon_cells([Resources.square], 1)
+
+        self.assertEqual(len(cells), 100, msg = "Expected 100 cells, got: {0}".format(len(cells)))
+        self.assertIn((0, 0), cells)
+        self.assertIn((9, 9), cells)
+        self.assertNotIn((10, 9), cells)
+
+    def test_hole(self):
+        cells = coverage_grid.polygon_cells([Resources.square, Resources.hole], 1)
+
+        self.assertEqual(len(cells), 96)
+        self.assertNotIn((3, 3), cells)
+
+    def test_overlapping_rings(self):
+        cells = coverage_grid.polygon_cells([Resources.square, Resources.moved(Resources.square, 5, 0)], 1)
+
+        self.assertEqual(len(cells), 150, msg = "Overlapping rings should both be filled")
+
+
+class TestSwathPasses(unittest.TestCase):
+
+    def test_swath_passes(self):
+        rows = [[None, '2017-08-29T09:37:50+1300', 'Block1'], [None, '2017-08-29T09:37:51+1300', 'Block1'],
+                [None, '2017-08-29T09:38:30+1300', 'Block1'], [None, '2017-08-29T09:38:31+1300', 'Block2'],
+                [None, None, 'Block2']]
+
+        self.assertListEqual(coverage_grid.swath_passes(rows, 1, 2), [[0, 1], [2], [3], [4]],
+                             msg = "Expected a new pass after a gap in time or a change of block")
+
+
+class TestCoverageGrid(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_name = tempfile.mkdtemp()
+        self.grid_folder = os.path.join(self.temp_name, 'coverage', 'FlightData')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_name, ignore_errors=True)
+
+    def test_hectares(self):
+        with coverage_grid.CoverageGrid(self.grid_folder, 10) as coverage:
+            coverage.add_polygon([Resources.moved(Resources.square, 0, 0)], 'Block1')
+            coverage.add_polygon([[(x * 10, y * 10) for x, y in Resources.square]], 'Block1')
+            coverage.add_polygon([[(x * 10 + 50, y * 10) for x, y in Resources.square]], 'Block2')
+
+            self.assertEqual(coverage.hectares(), 1.5)
+            self.assertDictEqual(coverage.block_hectares(), {'Block1': 1.0, 'Block2': 1.0})
+            self.assertEqual(coverage.count(5, 5), 2, msg = "Expected the cell to be covered twice")
+            self.assertEqual(coverage.count(75, 5), 2)
+            self.assertEqual(coverage.count(75, 5, 'Block1'), 1)
+            self.assertEqual(coverage.count(500, 500), 0)
+
+    def test_save_and_load(self):
+        with coverage_grid.CoverageGrid(self.grid_folder, 1) as coverage:
+            coverage.add_polygon([Resources.square], 'Block1')
+            coverage.add_polygon([Resources.moved(Resources.square, 1000, 1000)], 'Block1')
+            coverage.save()
+
+        self.assertTrue(coverage_grid.CoverageGrid.exists(self.grid_folder))
+        with coverage_grid.CoverageGrid(self.grid_folder, 5) as coverage:
+            self.assertEqual(coverage.resolution, 1, msg = "An existing grid should keep its resolution")
+            self.assertEqual(coverage.polygon_count, 2)
+            self.assertEqual(coverage.hectares('Block1'), 0.02)
+            self.assertEqual(coverage.count(1005, 1005), 1)
+
+    def test_tiles_are_added(self):
+        with coverage_grid.CoverageGrid(self.grid_folder, 1) as coverage:
+            for i in range(coverage_grid.__initial_tile_capacity__ + 1):
+                coverage.add_polygon([Resources.moved(Resources.square, i * coverage.tile_size, 0)])
+
+            self.assertEqual(coverage.tile_count, 2 * (coverage_grid.__initial_tile_capacity__ + 1))
+            self.assertEqual(coverage.count(5, 5), 1)
+            self.assertEqual(coverage.count(coverage_grid.__initial_tile_capacity__ * coverage.tile_size + 5, 5), 1)
+
+    def test_remove(self):
+        with coverage_grid.CoverageGrid(self.grid_folder) as coverage:
+            coverage.save()
+        coverage_grid.CoverageGrid.remove(self.grid_folder)
+
+        self.assertFalse(coverage_grid.CoverageGrid.exists(self.grid_folder))
+
+    def test_pass_counted_once(self):
+        with coverage_grid.CoverageGrid(self.grid_folder, 1) as coverage:
+            first_swath = coverage_grid.polygon_cells([Resources.square], 1)
+            second_swath = coverage_grid.polygon_cells([Resources.moved(Resources.square, 5, 0)], 1)
+            coverage.add_pass([first_swath, second_swath], 'Block1', 100)
+
+            self.assertEqual(coverage.count(7, 5), 1, msg = "Swaths of a pass should only be counted once")
+            self.assertEqual(coverage.polygon_count, 2)
+            self.assertEqual(coverage.mean_count(second_swath), 1)
+
+            coverage.add_pass([second_swath], 'Block1', 50)
+            statistics = coverage.statistics('Block1')
+
+            self.assertEqual(coverage.mean_count(second_swath), 2)
+            self.assertEqual(statistics['hectares'], 0.015)
+            self.assertEqual(statistics['overlap_hectares'], 0.01)
+            self.assertEqual(statistics['mean_passes'], round(250 / 150, 2))
+            self.assertEqual(statistics['applied_rate'], round((0.015 * 100 + 0.01 * 50) / 0.015, 2))
+
+    def test_applied_rate(self):
+        with coverage_grid.CoverageGrid(self.grid_folder, 1) as coverage:
+            first_swath = coverage_grid.polygon_cells([Resources.square], 1)
+            second_swath = coverage_grid.polygon_cells([Resources.moved(Resources.square, 5, 0)], 1)
+            coverage.add_pass([first_swath], 'Block1', 100)
+            coverage.add_pass([second_swath], 'Block1', 50)
+
+            self.assertAlmostEqual(coverage.applied_rate(first_swath), 125, places = 4,
+                                   msg = "Half the swath was sown at 100 kg/ha and half at 150 kg/ha")
+            self.assertAlmostEqual(coverage.applied_rate(second_swath), 100, places = 4)
+            self.assertIsNone(coverage.applied_rate(set()), msg = "A polygon without cells has no applied rate")
+
+    def test_applied_rate_saved(self):
+        with coverage_grid.CoverageGrid(self.grid_folder, 1) as coverage:
+            coverage.add_polygon([Resources.square], 'Block1', 80)
+            coverage.save()
+
+        with coverage_grid.CoverageGrid(self.grid_folder) as coverage:
+            self.assertAlmostEqual(coverage.applied_rate(coverage_grid.polygon_cells([Resources.square], 1)), 80, places = 4)
+
+    def test_grid_without_applied_file_incomplete(self):
+        with coverage_grid.CoverageGrid(self.grid_folder, 1) as coverage:
+            coverage.add_polygon([Resources.square], 'Block1', 80)
+            coverage.save()
+        os.remove(os.path.join(self.grid_folder, coverage_grid.__applied_file_name__))
+
+        with coverage_grid.CoverageGrid(self.grid_folder) as coverage:
+            self.assertFalse(coverage.complete, msg = "A grid without the product applied to each cell should be rebuilt")
+
+    def test_empty_polygons_counted(self):
+        with coverage_grid.CoverageGrid(self.grid_folder, 1) as coverage:
+            coverage.add_pass([coverage_grid.polygon_cells([Resources.square], 1), set()], 'Block1')
+            coverage.add_pass([set()], 'Block2')
+
+            self.assertEqual(coverage.polygon_count, 3, msg = "Polygons covering no cells should be counted")
+            self.assertDictEqual(coverage.block_hectares(), {'Block1': 0.01})
+
+    def test_no_sow_rate(self):
+        with coverage_grid.CoverageGrid(self.grid_folder, 1) as coverage:
+            coverage.add_polygon([Resources.square], 'Block1')
+
+            self.assertIsNone(coverage.statistics()['applied_rate'])
+            self.assertDictEqual(coverage.statistics('Block2'), {'hectares': 0.0, 'overlap_hectares': 0.0,
+                                                                 'mean_passes': 0.0, 'applied_rate': None})
+
+    def test_incomplete_until_saved(self):
+        with coverage_grid.CoverageGrid(self.grid_folder, 1) as coverage:
+            coverage.add_polygon([Resources.square], 'Block1')
+
+        with coverage_grid.CoverageGrid(self.grid_folder, 1) as coverage:
+            self.assertFalse(coverage.complete, msg = "A grid changed without being saved should be incomplete")
+            coverage.add_polygon([Resources.square], 'Block1')
+            coverage.save()
+
+        with coverage_grid.CoverageGrid(self.grid_folder, 1) as coverage:
+            self.assertTrue(coverage.complete)
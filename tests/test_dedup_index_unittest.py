@@ -0,0 +1,62 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from flightline import dedup_index
+
+
+class Resources(object):
+
+    keys = ['2017-08-29T09:37:50+1300_45.0', '2017-08-29T09:37:51+1300_46.5', '2017-08-29T09:37:52+1300_47.0']
+
+    @staticmethod
+    def generate_temp_space():
+        """
+        Provides a temp name and a key file location inside it
+
+        Returns
+        -------
+        [temp_name, index_file]
+        """
+        temp_name = tempfile.mkdtemp()
+        index_file = os.path.join(temp_name, 'indexes', 'FlightData_total_lines.keys')
+        return [temp_name, index_file]
+
+
+class TestTimeSpeedKey(unittest.TestCase):
+
+    def test_time_speed_key(self):
+        key = dedup_index.time_speed_key('2017-08-29T09:37:50+1300', 45.0)
+
+        self.assertEqual(key, '2017-08-29T09:37:50+1300_45.0', msg = "Got: {0}".format(key))
+
+
+class TestDedupIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_name, self.index_file = Resources.generate_temp_space()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_name, ignore_errors=True)
+
+    def test_load_missing_index(self):
+        index = dedup_index.DedupIndex(self.index_file)
+
+        self.assertFalse(index.load(), msg = "Loading a missing key file should return False")
+        self.assertEqual(len(index), 0, msg = "Index should be empty, got: {0}".format(len(index)))
+
+    def test_save_and_load(self):
+        index = dedup_index.DedupIndex(self.index_file)
+        index.rebuild(Resources.keys[:2], 2)
+        index.add(Resources.keys[2])
+        index.record_count += 1
+        index.save()
+
+        loaded_index = dedup_index.DedupIndex(self.index_file)
+
+        self.assertTrue(loaded_index.load(), msg = "Key file was not loaded")
+        self.assertEqual(loaded_index.record_count, 3, msg = "Expected record count 3, got: {0}".format(loaded_index.record_count))
+        for key in Resources.keys:
+            self.assertIn(key, loaded_index, msg = "Key: {0} missing from loaded index".format(key))
+        self.assertNotIn('2017-08-29T09:37:53+1300_45.0', loaded_index)
@@ -0,0 +1,64 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from flightline import dissolve_cache
+
+
+class TestDissolveCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_name = tempfile.mkdtemp()
+        self.state_file = os.path.join(self.temp_name, 'config', 'dissolve', 'FlightData.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_name, ignore_errors=True)
+
+    def test_new_cache(self):
+        cache = dissolve_cache.DissolveCache(self.state_file)
+
+        self.assertFalse(cache.is_current(0, 0), msg = "A new cache should be rebuilt")
+        self.assertEqual(cache.new_polygons_where_clause('OBJECTID'), 'OBJECTID > -1')
+
+    def test_save_and_load(self):
+        cache = dissolve_cache.DissolveCache(self.state_file)
+        cache.update(10, 10, {'Block1': 5.5, 'Block2': 2.0}, 7.5)
+        cache.save()
+
+        self.assertTrue(os.path.exists(self.state_file))
+        cache = dissolve_cache.DissolveCache(self.state_file)
+        self.assertEqual(cache.last_oid, 10)
+        self.assertDictEqual(cache.block_areas, {'Block1': 5.5, 'Block2': 2.0})
+        self.assertEqual(cache.new_polygons_where_clause('OBJECTID'), 'OBJECTID > 10')
+
+    def test_is_current(self):
+        cache = dissolve_cache.DissolveCache(self.state_file)
+        cache.update(10, 10, {'Block1': 5.5}, 5.5)
+
+        self.assertTrue(cache.is_current(15, 5))
+        self.assertFalse(cache.is_current(14, 5), msg = "Deleted polygons should need a rebuild")
+
+    def test_update_keeps_other_blocks(self):
+        cache = dissolve_cache.DissolveCache(self.state_file)
+        cache.update(10, 10, {'Block1': 5.5, 'Block2': 2.0}, 7.5)
+        cache.update(None, 12, {'Block2': 3.0}, 8.5)
+
+        self.assertEqual(cache.last_oid, 10, msg = "last_oid should be kept when None")
+        self.assertDictEqual(cache.block_areas, {'Block1': 5.5, 'Block2': 3.0})
+
+    def test_unnamed_block(self):
+        cache = dissolve_cache.DissolveCache(self.state_file)
+        cache.update(1, 1, {None: 1.0}, 1.0)
+        cache.save()
+
+        self.assertTrue(dissolve_cache.DissolveCache(self.state_file).has_unnamed_block())
+        cache.clear()
+        self.assertFalse(cache.has_unnamed_block())
+
+    def test_memory_only(self):
+        cache = dissolve_cache.DissolveCache(None)
+        cache.update(1, 1, {'Block1': 1.0}, 1.0)
+        cache.save()
+
+        self.assertEqual(os.listdir(self.temp_name), [])
@@ -0,0 +1,104 @@
+import unittest
+import math
+import os
+import shutil
+import tempfile
+
+from flightline import download_cache
+
+
+class Resources(object):
+
+    line_fields = ['SHAPE@', 'Time', 'Speed', 'Width', 'GPS_Alt', 'BlockName']
+    line_rows = [[[[(172.5, -43.5), (172.501, -43.501)]], '2017-08-29T09:37:50+1300', 45.0, 120.0, 310, 'Block1'],
+                 [[[(172.501, -43.501), (172.502, -43.502), (172.503, -43.502)]], '2017-08-29T09:37:51+1300', 46.5, 120.0, 312, 'Block1'],
+                 [[[(172.6, -43.6), (172.601, -43.601)], [(172.7, -43.7), (172.701, -43.701)]], '2017-08-29T09:40:00+1300', 40.0, 30.0, None, 'Block2']]
+    point_fields = ['SHAPE@', 'Time', 'Speed', 'BlockName']
+    point_rows = [[(172.5, -43.5), '2014-11-30T07:45:10+1300', 40.0, 'Block1'],
+                  [(172.6, -43.6), '2014-11-30T07:45:11+1300', 41.0, 'Block2'],
+                  [(172.7, -43.7), '2014-11-30T07:45:12+1300', 42.0, 'Block1']]
+
+    @staticmethod
+    def build_cache(shape_type, field_list, rows, first_oid=1):
+        builder = download_cache.ColumnCacheBuilder(shape_type, "GEOGCS['GCS_WGS_1984']")
+        for i, row in enumerate(rows):
+            builder.add(first_oid + i, field_list, row)
+        return builder
+
+
+class TestColumnCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_name = tempfile.mkdtemp()
+        self.cache_folder = download_cache.cache_folder_location(os.path.join(self.temp_name, 'NSB', '1102'))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_name, ignore_errors=True)
+
+    def test_lines(self):
+        Resources.build_cache('Polyline', Resources.line_fields, Resources.line_rows).write(self.cache_folder, 'lines')
+
+        self.assertTrue(download_cache.ColumnCache.exists(self.cache_folder, 'lines'))
+        with download_cache.ColumnCache(self.cache_folder, 'lines') as cache:
+            self.assertEqual(len(cache), 3, msg = "Expected 3 records, got: {0}".format(len(cache)))
+            self.assertListEqual(cache.columns['oid'].tolist(), [1, 2, 3])
+            for i, row in enumerate(Resources.line_rows):
+                self.assertEqual(cache.coordinates(i), row[0])
+                self.assertEqual(cache.time_text(i), row[1])
+                self.assertEqual(cache.block_name(i), row[5])
+            self.assertEqual(cache.columns['time'][1] - cache.columns['time'][0], 1)
+            self.assertEqual(cache.columns['width'][2], 30.0)
+            self.assertTrue(math.isnan(cache.columns['gps_alt'][2]), msg = "Missing value should be nan")
+            self.assertEqual(cache.spatial_reference_wkt, "GEOGCS['GCS_WGS_1984']")
+
+    def test_points(self):
+        Resources.build_cache('Point', Resources.point_fields, Resources.point_rows).write(self.cache_folder, 'points')
+
+        with download_cache.ColumnCache(self.cache_folder, 'points') as cache:
+            self.assertEqual(cache.coordinates(1), (172.6, -43.6))
+            self.assertEqual(cache.mean('speed'), 41.0)
+            self.assertIsNone(cache.mean('width'), msg = "Points have no width")
+            self.assertDictEqual(cache.last_time_text_by_block(), {'Block1': '2014-11-30T07:45:12+1300',
+                                                                   'Block2': '2014-11-30T07:45:11+1300'})
+
+    def test_last_time_not_in_cache_order(self):
+        # Points merged from a second shapefile of the block can be earlier than those already cached
+        rows = [Resources.point_rows[2], Resources.point_rows[0]]
+        Resources.build_cache('Point', Resources.point_fields, rows).write(self.cache_folder, 'points')
+
+        with download_cache.ColumnCache(self.cache_folder, 'points') as cache:
+            self.assertDictEqual(cache.last_time_text_by_block(), {'Block1': '2014-11-30T07:45:12+1300'},
+                                 msg = "Expected the latest Time of the block rather than the last record")
+
+    def test_time_text_kept_whole(self):
+        # The Time field is 25 wide, values of any length and text are written back unchanged
+        time_values = ['2017-08-29T09:37:50.5+1300', '2017-08-29T09:37:51+1300', '2017-08-29T09:37:52+1300 \u00b0', '']
+        rows = [[(172.5, -43.5), time_value, 40.0, 'Block1'] for time_value in time_values[:3]] + [[(172.5, -43.5), None, 40.0, 'Block1']]
+        Resources.build_cache('Point', Resources.point_fields, rows).write(self.cache_folder, 'points')
+
+        with download_cache.ColumnCache(self.cache_folder, 'points') as cache:
+            self.assertListEqual([cache.time_text(i) for i in range(len(cache))], time_values)
+
+    def test_add_cache(self):
+        Resources.build_cache('Polyline', Resources.line_fields, Resources.line_rows[:2]).write(self.cache_folder, 'lines')
+
+        builder = download_cache.ColumnCacheBuilder()
+        with download_cache.ColumnCache(self.cache_folder, 'lines') as cache:
+            builder.add_cache(cache)
+        builder.add(3, Resources.line_fields, Resources.line_rows[2])
+        builder.write(self.cache_folder, 'lines')
+
+        with download_cache.ColumnCache(self.cache_folder, 'lines') as cache:
+            self.assertEqual(len(cache), 3, msg = "Expected 3 records, got: {0}".format(len(cache)))
+            self.assertEqual(cache.shape_type, 'Polyline')
+            self.assertListEqual(cache.block_names, ['Block1', 'Block2'])
+            for i, row in enumerate(Resources.line_rows):
+                self.assertEqual(cache.coordinates(i), row[0])
+                self.assertEqual(cache.columns['speed'][i], row[2])
+
+    def test_empty_cache(self):
+        download_cache.ColumnCacheBuilder('Point').write(self.cache_folder, 'points')
+
+        with download_cache.ColumnCache(self.cache_folder, 'points') as cache:
+            self.assertEqual(len(cache), 0)
+            self.assertDictEqual(cache.last_time_text_by_block(), {})
@@ -0,0 +1,73 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from flightline import download_index
+from flightline import download_cache
+
+
+class Resources(object):
+
+    download_files = [os.path.join('Block1', 'Log.shp'), os.path.join('Block1', 'Log.shx'), os.path.join('Block1', 'Log.dbf'),
+                      os.path.join('Block1', 'secondary.shp'), os.path.join('Block1', 'secondary.dbf'),
+                      os.path.join('Block1', 'Block1.txt'), 'Block2log.shp', 'Block2log.shx', 'Block2log.dbf', 'Block2.txt',
+                      os.path.join(download_cache.__cache_folder_name__, 'lines.json')]
+
+    @staticmethod
+    def generate_temp_space():
+        """
+        Provides a temp name containing a download folder
+
+        Returns
+        -------
+        [temp_name, download_directory]
+        """
+        temp_name = tempfile.mkdtemp()
+        download_directory = os.path.join(temp_name, 'NSB', '1102')
+        for relative_path in Resources.download_files:
+            download_file = os.path.join(download_directory, relative_path)
+            if not os.path.exists(os.path.dirname(download_file)):
+                os.makedirs(os.path.dirname(download_file))
+            with open(download_file, 'w') as f:
+                f.write(relative_path)
+        return [temp_name, download_directory]
+
+
+class TestDownloadIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_name, self.download_directory = Resources.generate_temp_space()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_name, ignore_errors=True)
+
+    def test_shapefile_list(self):
+        index = download_index.DownloadIndex(self.download_directory)
+
+        self.assertListEqual(index.shapefile_list('log.shp'), [os.path.join(self.download_directory, 'Block1', 'Log.shp'),
+                                                                os.path.join(self.download_directory, 'Block2log.shp')])
+        self.assertListEqual(index.shapefile_list('secondary.shp'), [os.path.join(self.download_directory, 'Block1', 'secondary.shp')])
+        self.assertListEqual(index.shapefile_list('.txt'), [os.path.join(self.download_directory, 'Block1', 'Block1.txt'),
+                                                             os.path.join(self.download_directory, 'Block2.txt')])
+
+    def test_cache_folder_not_indexed(self):
+        index = download_index.DownloadIndex(self.download_directory)
+
+        self.assertNotIn(download_cache.__cache_folder_name__, index.block_folders)
+        self.assertEqual(len(index.files), len(Resources.download_files) - 1)
+
+    def test_has_sidecars(self):
+        index = download_index.DownloadIndex(self.download_directory)
+
+        self.assertTrue(index.has_sidecars(os.path.join(self.download_directory, 'Block1', 'Log.shp')))
+        self.assertFalse(index.has_sidecars(os.path.join(self.download_directory, 'Block1', 'secondary.shp')),
+                         msg = "secondary.shx is missing")
+
+    def test_summary_file(self):
+        index = download_index.DownloadIndex(self.download_directory)
+
+        self.assertEqual(index.summary_file('Block1'), os.path.join(self.download_directory, 'Block1', 'Block1.txt'))
+        self.assertEqual(index.summary_file('BLOCK1'), os.path.join(self.download_directory, 'Block1', 'Block1.txt'))
+        self.assertEqual(index.summary_file('Block2'), os.path.join(self.download_directory, 'Block2.txt'),
+                         msg = "Blocks without a folder should use the summary in the root of the download")
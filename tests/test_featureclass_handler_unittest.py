@@ -4,8 +4,11 @@ import uuid
 import arcpy
 import datetime
 import tempfile
+import shutil
 
 from flightline import featureclass_handler
+from flightline import download_cache
+from flightline import coverage_grid
 
 arcpy.env.overwriteOutput = True
 
@@ -26,6 +29,25 @@ class Resources(object):
     repair_geometry_result = 'in_memory\\testshp'
     sum_total_fieldnames = ['Machine','DL_Time','BlockName','Bucket','Hectares','Last_log_time','Nominal_Area','Real_Area','Distance_Travelled','Distance_spreading','Block_Area']
 
+    @staticmethod
+    def featureclass_cache(featureclass, field_list, cache_folder, name, where_clause=None):
+        """
+        Writes a download cache of the rows of a featureclass, as the merge does
+
+        Returns
+        -------
+        cache : download_cache.ColumnCache
+        """
+        desc = arcpy.Describe(featureclass)
+        builder = download_cache.ColumnCacheBuilder(desc.shapeType, desc.spatialReference.exportToString())
+        with arcpy.da.SearchCursor(featureclass, ['OID@', 'SHAPE@'] + field_list, where_clause) as cursor:
+            for row in cursor:
+                if row[1]:
+                    coordinates = (row[1].firstPoint.X, row[1].firstPoint.Y) if desc.shapeType == 'Point' else featureclass_handler.geometry_to_coordinates(row[1])
+                    builder.add(row[0], ['SHAPE@'] + field_list, [coordinates] + list(row[2:]))
+        builder.write(cache_folder, name)
+        return download_cache.ColumnCache(cache_folder, name)
+
     @staticmethod
     def generate_temp_space():
         """
@@ -701,6 +723,48 @@ class TestUpdateTotallinesFeatureclass(unittest.TestCase):
         total_polygon_count = int(arcpy.GetCount_management(self.total_polygons_featureclass).getOutput(0))
         self.assertGreater(total_polygon_count, 0, msg = 'No new records added to total_polygons_featureclass')
 
+    def test_update_from_lines_cache(self):
+        cache_folder = tempfile.mkdtemp()
+        try:
+            with Resources.featureclass_cache(self.lines_featureclass, ['Time', 'Speed', 'Width', 'GPS_Alt', 'BlockName'], cache_folder,
+                                              'lines', 'Buffer IS NULL') as new_lines:
+                cached_line_count = len(new_lines)
+                line_count = featureclass_handler.update_totallines_featureclass(self.lines_featureclass, self.total_polygons_featureclass,
+                                                                                 'NSB', '1102', False, new_lines)
+        finally:
+            shutil.rmtree(cache_folder, ignore_errors=True)
+
+        polygon_count = int(arcpy.GetCount_management(self.total_polygons_featureclass).getOutput(0))
+
+        self.assertEqual(line_count, cached_line_count, msg = "Expected every cached line to be read, got: {0}".format(line_count))
+        self.assertGreater(polygon_count, 0, msg = "No swath polygons were added from the cached lines")
+
+    def test_applied_rate_of_overlapped_polygons(self):
+        grid_folder = tempfile.mkdtemp()
+        try:
+            with coverage_grid.CoverageGrid(grid_folder) as coverage:
+                featureclass_handler.update_totallines_featureclass(self.lines_featureclass, self.total_polygons_featureclass,
+                                                                    'NSB', '1102', False, coverage=coverage, sow_rate=10.0)
+                with arcpy.da.SearchCursor(self.total_polygons_featureclass, ['Applied_rate']) as cursor:
+                    first_rates = [row[0] for row in cursor]
+
+                # Sow the same lines again as a later download
+                with arcpy.da.UpdateCursor(self.lines_featureclass, ['Buffer']) as cursor:
+                    for row in cursor:
+                        row[0] = None
+                        cursor.updateRow(row)
+                featureclass_handler.update_totallines_featureclass(self.lines_featureclass, self.total_polygons_featureclass,
+                                                                    'NSB', '1103', False, coverage=coverage, sow_rate=10.0)
+        finally:
+            shutil.rmtree(grid_folder, ignore_errors=True)
+
+        with arcpy.da.SearchCursor(self.total_polygons_featureclass, ['Applied_rate'], "DL_Time = '1102'") as cursor:
+            updated_rates = [row[0] for row in cursor]
+
+        self.assertEqual(len(updated_rates), len(first_rates))
+        self.assertGreater(sum(updated_rates), sum(first_rates),
+                           msg = "Expected the earlier polygons' Applied_rate to include the later pass, got: {0}".format(updated_rates))
+
 
 class TestUpdateTotalpointsFeatureclass(unittest.TestCase):
 
@@ -780,6 +844,30 @@ class TestConvertSecondaryPointsToLines(unittest.TestCase):
         self.assertEqual(records_added_count, actual_record_count, msg = "Function reported adding {0} records but record count is {1}".format(records_added_count, actual_record_count))
         self.assertGreater(actual_record_count, 0, msg = 'No new records added to flight_path_featureclass')
 
+    def test_convert_from_caches(self):
+        helicopter_rego = 'NSB'
+        download_time = '1102'
+        tracmap_data_directory = r'C:\ProjectFolder\TracmapData\{0}'.format(download_time) # This doesn't actually need to exist
+
+        featureclass_handler.merge_tracmap_data_featureclass(tracmap_data_directory, self.log_featureclass.getOutput(0), self.total_lines_featureclass)
+        featureclass_handler.update_totallines_featureclass(self.total_lines_featureclass, self.total_polygons_featureclass, helicopter_rego, download_time, False)
+        featureclass_handler.merge_tracmap_data_featureclass(tracmap_data_directory, self.secondary_featureclass.getOutput(0), self.total_points_featureclass)
+        featureclass_handler.update_totalpoints_featureclass(self.total_points_featureclass, helicopter_rego, download_time)
+        cache_folder = tempfile.mkdtemp()
+        try:
+            with Resources.featureclass_cache(self.total_points_featureclass, ['Time', 'Speed', 'BlockName'], cache_folder, 'points') as new_points, \
+                    Resources.featureclass_cache(self.total_lines_featureclass, ['Time', 'Speed', 'Width', 'GPS_Alt', 'BlockName'], cache_folder, 'lines') as new_lines:
+                records_added_count = featureclass_handler.convert_secondary_points_to_lines(
+                    self.total_points_featureclass, self.total_lines_featureclass, self.flight_path_featureclass,
+                    self.operations_start_times_table, helicopter_rego, download_time, new_points, new_lines)
+        finally:
+            shutil.rmtree(cache_folder, ignore_errors=True)
+
+        actual_record_count = int(arcpy.GetCount_management(self.flight_path_featureclass).getOutput(0))
+
+        self.assertEqual(records_added_count, actual_record_count, msg = "Function reported adding {0} records but record count is {1}".format(records_added_count, actual_record_count))
+        self.assertGreater(actual_record_count, 0, msg = 'No new records added to flight_path_featureclass from the caches')
+
 
 class TestCalculateOperationalAreaCompletionDict(unittest.TestCase):
 
@@ -0,0 +1,96 @@
+import unittest
+
+from flightline import flight_path
+
+
+class Resources(object):
+
+    operation_start_time = 1000
+    # Line 7 starts at 1004, just after the helicopter reaches it
+    line_start_times = {7: 1004}
+
+    @staticmethod
+    def points():
+        """Secondary points flying to the start of line 7, sowing it and flying on"""
+        return [(0.0, 0.0, 1000, 'Block1', -1, -1),
+                (1.0, 0.0, 1001, 'Block1', -1, -1),
+                (2.0, 0.0, 1002, 'Block1', -1, -1),
+                (3.0, 0.0, 1003, 'Block1', 4.5, 7),
+                (4.0, 0.0, 1004, 'Block1', -1, -1),
+                (5.0, 0.0, 1005, 'Block1', -1, -1)]
+
+
+class TestSegmentFlightPath(unittest.TestCase):
+
+    def test_segments(self):
+        segments = flight_path.segment_flight_path(Resources.points(), Resources.line_start_times, Resources.operation_start_time)
+
+        self.assertEqual(len(segments), 2, msg = "Expected 2 segments, got: {0}".format(segments))
+        self.assertListEqual(segments[0], [[(1.0, 0.0), (2.0, 0.0), (3.0, 0.0)], 1001, 1003, 'Block1'],
+                             msg = "Expected the first segment to finish at the start of the sowing line")
+        self.assertListEqual(segments[1][0], [(4.0, 0.0), (5.0, 0.0)])
+        self.assertEqual(segments[1][2], 1005)
+
+    def test_point_on_line_start(self):
+        # Secondary points and line starts come from the same GPS fixes so the nearest line start is often exact
+        points = Resources.points()
+        points[3] = (3.0, 0.0, 1003, 'Block1', 0.0, 7)
+        segments = flight_path.segment_flight_path(points, Resources.line_start_times, Resources.operation_start_time)
+
+        self.assertEqual(len(segments), 2, msg = "A point exactly on a line start should finish the segment, got: {0}".format(segments))
+        self.assertEqual(segments[0][2], 1003)
+
+    def test_line_start_too_late(self):
+        line_start_times = {7: 1020}
+        segments = flight_path.segment_flight_path(Resources.points(), line_start_times, Resources.operation_start_time)
+
+        self.assertEqual(len(segments), 1, msg = "A line starting more than 5 seconds later should not split the path")
+        self.assertEqual(len(segments[0][0]), 5)
+
+    def test_no_points(self):
+        self.assertListEqual(flight_path.segment_flight_path([], {}, 0), [])
+
+    def test_time_gap(self):
+        points = Resources.points()
+        points[2] = (2.0, 0.0, 1102, 'Block1', -1, -1)
+        points[3] = (3.0, 0.0, 1103, 'Block1', -1, -1)
+        points[4] = (4.0, 0.0, 1104, 'Block1', -1, -1)
+        points[5] = (5.0, 0.0, 1105, 'Block1', -1, -1)
+        segments = flight_path.segment_flight_path(points, {}, Resources.operation_start_time)
+
+        self.assertEqual(len(segments), 1, msg = "Expected the lone point before the gap to be dropped, got: {0}".format(segments))
+        self.assertListEqual(segments[0], [[(2.0, 0.0), (3.0, 0.0), (4.0, 0.0), (5.0, 0.0)], 1102, 1105, 'Block1'])
+
+        segments = flight_path.segment_flight_path(points, {}, Resources.operation_start_time, gap_seconds=200)
+        self.assertEqual(len(segments), 1)
+        self.assertEqual(len(segments[0][0]), 5)
+
+    def test_block_change(self):
+        points = [point[:3] + ('Block2' if point[0] >= 3 else 'Block1',) + point[4:] for point in Resources.points()]
+        segments = flight_path.segment_flight_path(points, {}, Resources.operation_start_time)
+
+        self.assertListEqual([[segment[0][0], segment[3]] for segment in segments], [[(1.0, 0.0), 'Block1'], [(3.0, 0.0), 'Block2']],
+                             msg = "Expected a segment for each block, got: {0}".format(segments))
+
+        segments = flight_path.segment_flight_path(points, {}, Resources.operation_start_time, [flight_path.SOW_START])
+        self.assertEqual(len(segments), 1, msg = "Block changes should not split the path when the rule is not enabled")
+
+    def test_segments_are_yielded(self):
+        segments = flight_path.iter_flight_path(iter(Resources.points()), Resources.line_start_times, Resources.operation_start_time)
+
+        self.assertEqual(next(segments)[2], 1003, msg = "Expected the first segment before the points are exhausted")
+        self.assertEqual(len(list(segments)), 1)
+
+    def test_unknown_break_rule(self):
+        segments = flight_path.iter_flight_path(Resources.points(), {}, 0, ['sow_end'])
+
+        self.assertRaises(ValueError, list, segments)
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_benchmark(self):
+        result = flight_path.benchmark(1200)
+
+        self.assertEqual(result['points'], 1200)
+        self.assertEqual(result['segments'], 10, msg = "Expected a segment for each sowing line, got: {0}".format(result))
@@ -6,6 +6,9 @@ import time
 import tempfile
 
 from flightline import flightline_project
+from flightline import tracmap_data
+from flightline import ingest_manifest
+from test_shapefile_reader_unittest import Resources as ShapefileResources
 
 class Resources():
 
@@ -95,6 +98,7 @@ class TestFlightlineProject(unittest.TestCase):
         self.assertEqual(flp.flight_gdb_xml_file_name, 'total_gdb.xml', msg = "flight_gdb_xml_file_name attribute. Expected: {0} Got: {1}".format('total_gdb.xml', flp.flight_gdb_xml_file_name))
         self.assertEqual(flp.csv_summaries, [], msg = "csv_summaries attribute. Expected: {0} Got: {1}".format([], flp.csv_summaries))
         self.assertEqual(flp.copied_tracmap_datasets, [], msg = "copied_tracmap_datasets attribute. Expected: {0} Got: {1}".format([], flp.copied_tracmap_datasets))
+        self.assertEqual(flp.ingested_tracmap_datasets, [], msg = "ingested_tracmap_datasets attribute. Expected: {0} Got: {1}".format([], flp.ingested_tracmap_datasets))
         self.assertEqual(flp.flight_data_gdbs, ['FlightData.gdb'], msg = "flight_data_gdbs attribute. Expected: {0} Got: {1}".format(['FlightData.gdb'], flp.flight_data_gdbs))
 
     def test_flightline_project_properties(self):
@@ -221,6 +225,59 @@ class TestFlightlineProject(unittest.TestCase):
             flp.get_config_attribute('Dummy')
             self.assertEqual(e.exception, 'Attribute name: {0} not in __config_attributes__'.format('Dummy'))
 
+    def test_prepare_tracmap_shapefiles_exported_coordinate_system(self):
+        flp = self.flightline_project_obj
+        download_directory = os.path.join(self.temp_name, 'NSB', '1102')
+        os.makedirs(os.path.join(download_directory, 'Block1'))
+        log_shapefile = os.path.join(download_directory, 'Block1', 'log.shp')
+        ShapefileResources.write_shapefile(log_shapefile, 3, ShapefileResources.log_records, ShapefileResources.log_fields,
+                                           ShapefileResources.log_attributes)
+
+        # The watch folder daemon passes the exported string rather than an arcpy.SpatialReference
+        shapefile_list = flp.prepare_tracmap_shapefiles('log.shp', download_directory, flp.default_tracmap_data_projection_system)
+
+        self.assertListEqual(shapefile_list, [log_shapefile])
+        self.assertEqual(tracmap_data.validate_tracmap_shapefile(log_shapefile).spatial_reference_wkt, Resources.wgs84_system.split(';')[0],
+                         msg = "Method prepare_tracmap_shapefiles should write the .prj file of a shapefile without one")
+
+    def test_process_tracmap_download_resumed(self):
+        flp = self.flightline_project_obj
+        manifest = ingest_manifest.IngestManifest(os.path.join(self.temp_name, 'ingest_manifest.json'))
+        flight_data = {'lines': 0, 'points': 0, 'flight_path': 0, 'summaries': 0}
+        failures = {'points': 1}
+
+        # The stages are replaced so only the order they are resumed in is tested
+        def merge_tracmap_data_to_flight_data_gdb(shapefile_name, *args):
+            if shapefile_name == 'secondary.shp':
+                if failures['points']:
+                    failures['points'] -= 1
+                    raise IOError("Secondary merge failed")
+                flight_data['points'] += 3
+            else:
+                flight_data['lines'] += 2
+
+        flp.merge_tracmap_data_to_flight_data_gdb = merge_tracmap_data_to_flight_data_gdb
+        flp.update_total_lines_featureclass = lambda *args: flight_data['lines']
+        flp.coverage_statistics = lambda: None
+        flp.update_total_points_featureclass = lambda *args: flight_data['points']
+        flp.covert_secondary_points_to_lines = lambda *args: flight_data.update(flight_path = flight_data['points'] - 1) or flight_data['flight_path']
+        flp.summarize_new_flight_data = lambda *args: flight_data.update(summaries = flight_data['summaries'] + 1) or 'summary.txt'
+        flp.simplify_new_flight_data = lambda *args: None
+
+        with self.assertRaises(IOError):
+            flp.process_tracmap_download('NSB', '1102', None, manifest = manifest)
+        result = flp.process_tracmap_download('NSB', '1102', None, manifest = manifest)
+
+        self.assertEqual(flight_data['lines'], 2, msg = "Lines merged before the failure should not be merged again")
+        self.assertEqual(result['points_added'], 3, msg = "Retry should add the points, got: {0}".format(result))
+        self.assertEqual(result['flight_path_added'], 2, msg = "Retry should add the flight path, got: {0}".format(result))
+        self.assertEqual(result['summary'], 'summary.txt')
+
+        result = flp.process_tracmap_download('NSB', '1102', None, manifest = manifest)
+
+        self.assertEqual(flight_data['summaries'], 1, msg = "A finished download should not be summarized again")
+        self.assertEqual(result['points_added'], 0)
+
     def test_dump_to_projectconfig(self):
         flp = self.flightline_project_obj
 
@@ -0,0 +1,122 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from flightline import ingest_manifest
+
+
+class Resources(object):
+
+    destination = os.path.join('data', 'FlightData.gdb', 'total_lines')
+
+    @staticmethod
+    def write_shapefile(shapefile, shp_content=b'shp', dbf_content=b'dbf'):
+        """Writes placeholder .shp and .dbf files, only their content is hashed"""
+        with open(shapefile, 'wb') as shp:
+            shp.write(shp_content)
+        with open(shapefile[:-4] + '.dbf', 'wb') as dbf:
+            dbf.write(dbf_content)
+
+    @staticmethod
+    def generate_temp_space():
+        """
+        Provides a temp name, a manifest location and two copies of the same shapefile
+
+        Returns
+        -------
+        [temp_name, manifest_file, shapefile, copied_shapefile]
+        """
+        temp_name = tempfile.mkdtemp()
+        manifest_file = os.path.join(temp_name, 'ingest_manifest.json')
+        shapefile = os.path.join(temp_name, 'log.shp')
+        os.mkdir(os.path.join(temp_name, 'copy'))
+        copied_shapefile = os.path.join(temp_name, 'copy', 'log.shp')
+        Resources.write_shapefile(shapefile)
+        Resources.write_shapefile(copied_shapefile)
+        return [temp_name, manifest_file, shapefile, copied_shapefile]
+
+
+class TestShapefileContentHash(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_name, self.manifest_file, self.shapefile, self.copied_shapefile = Resources.generate_temp_space()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_name, ignore_errors=True)
+
+    def test_shapefile_content_hash(self):
+        self.assertEqual(ingest_manifest.shapefile_content_hash(self.shapefile),
+                         ingest_manifest.shapefile_content_hash(self.copied_shapefile))
+
+        Resources.write_shapefile(self.copied_shapefile, dbf_content=b'changed')
+
+        self.assertNotEqual(ingest_manifest.shapefile_content_hash(self.shapefile),
+                            ingest_manifest.shapefile_content_hash(self.copied_shapefile))
+
+
+class TestIngestManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_name, self.manifest_file, self.shapefile, self.copied_shapefile = Resources.generate_temp_space()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_name, ignore_errors=True)
+
+    def test_load_missing_manifest(self):
+        manifest = ingest_manifest.IngestManifest(self.manifest_file)
+
+        self.assertFalse(manifest.load(), msg = "Loading a missing manifest should return False")
+        self.assertFalse(manifest.contains(self.shapefile, Resources.destination))
+
+    def test_copied_shapefile_is_recognised(self):
+        manifest = ingest_manifest.IngestManifest(self.manifest_file)
+        self.assertFalse(manifest.contains(self.shapefile, Resources.destination))
+        # Repairing the geometry modifies the shapefile after it has been hashed
+        Resources.write_shapefile(self.shapefile, shp_content=b'repaired')
+        manifest.refresh_signature(self.shapefile)
+        manifest.record(self.shapefile, Resources.destination, 10, 10)
+        manifest.save()
+
+        loaded_manifest = ingest_manifest.IngestManifest(self.manifest_file)
+
+        self.assertTrue(loaded_manifest.load(), msg = "Manifest was not loaded")
+        self.assertTrue(loaded_manifest.contains(self.shapefile, Resources.destination))
+        self.assertTrue(loaded_manifest.contains(self.copied_shapefile, Resources.destination),
+                        msg = "Copy of an ingested shapefile was not recognised")
+        self.assertFalse(loaded_manifest.contains(self.copied_shapefile, 'total_points'))
+
+    def test_validate_destination(self):
+        manifest = ingest_manifest.IngestManifest(self.manifest_file)
+        manifest.record(self.shapefile, Resources.destination, 10, 10)
+
+        manifest.validate_destination(Resources.destination, 12)
+        self.assertTrue(manifest.contains(self.shapefile, Resources.destination))
+
+        manifest.validate_destination(Resources.destination, 0)
+        self.assertFalse(manifest.contains(self.shapefile, Resources.destination),
+                         msg = "Shapefiles should be forgotten when the destination is replaced")
+
+    def test_finished_stages(self):
+        download = os.path.join('raw_data', 'NSB', '1102')
+        manifest = ingest_manifest.IngestManifest(self.manifest_file)
+        manifest.record_stage(download, 'lines')
+        manifest.record_stage(download, 'lines')
+        manifest.save()
+
+        loaded_manifest = ingest_manifest.IngestManifest(self.manifest_file)
+        loaded_manifest.load()
+
+        self.assertListEqual(loaded_manifest.finished_stages(download), ['lines'])
+        self.assertListEqual(loaded_manifest.finished_stages(os.path.join('raw_data', 'NSB', '1103')), [])
+
+    def test_stages_forgotten_with_destination(self):
+        download = os.path.join('raw_data', 'NSB', '1102')
+        manifest = ingest_manifest.IngestManifest(self.manifest_file)
+        manifest.record(self.shapefile, Resources.destination, 10, 10)
+        manifest.record_stage(download, 'lines')
+
+        manifest.validate_destination(Resources.destination, 0)
+
+        self.assertListEqual(manifest.finished_stages(download), [],
+                             msg = "Stages should be forgotten when the destination is replaced")
@@ -0,0 +1,140 @@
+import unittest
+import os
+import shutil
+import struct
+import tempfile
+
+from flightline import shapefile_reader
+
+
+class Resources(object):
+
+    log_fields = [('Time', 'C', 25, 0), ('Speed', 'N', 6, 1), ('Width', 'N', 6, 1), ('GPS Alt', 'N', 6, 0)]
+    log_records = [[[(172.5, -43.5), (172.501, -43.501)]], [[(172.501, -43.501), (172.502, -43.502), (172.503, -43.502)]]]
+    log_attributes = [('2017-08-29T09:37:50+1300', 45.0, 120.0, 310), ('2017-08-29T09:37:51+1300', 46.5, 120.0, 312)]
+    secondary_fields = [('Date', 'C', 10, 0), ('Time', 'C', 14, 0), ('Speed', 'N', 6, 1)]
+    secondary_records = [(172.5, -43.5), (172.6, -43.6), (172.7, -43.7)]
+    secondary_attributes = [('2014-11-30', '07:45:10.00000', 40.0), ('2014-11-30', '07:45:11.00000', 41.0), ('2014-11-30', '07:45:12.00000', 42.0)]
+
+    @staticmethod
+    def write_shapefile(shapefile, shape_type, shapes, fields, attributes, deleted=None, prj=None):
+        """
+        Writes a minimal .shp, .shx and .dbf file
+
+        Parameters
+        ----------
+        shapefile : str - location of the .shp file
+        shape_type : int - 1 Point, 3 Polyline
+        shapes : list - (x, y) for points, list of parts for polylines
+        fields : list<(name, type, length, decimal_count)>
+        attributes : list<tuple>
+        deleted : list<int> - index of dbf records to flag as deleted
+        prj : str - well known text to write to the .prj file
+        """
+        deleted = deleted or []
+        contents = []
+        for shape in shapes:
+            if shape_type == 1:
+                contents.append(struct.pack('<i2d', 1, shape[0], shape[1]))
+            else:
+                points = [p for part in shape for p in part]
+                xs = [p[0] for p in points]
+                ys = [p[1] for p in points]
+                content = struct.pack('<i4d2i', shape_type, min(xs), min(ys), max(xs), max(ys), len(shape), len(points))
+                start = 0
+                for part in shape:
+                    content += struct.pack('<i', start)
+                    start += len(part)
+                for p in points:
+                    content += struct.pack('<2d', p[0], p[1])
+                contents.append(content)
+
+        shp_length = 100 + sum([8 + len(c) for c in contents])
+        header = struct.pack('>7i', 9994, 0, 0, 0, 0, 0, shp_length // 2) + struct.pack('<2i8d', 1000, shape_type, 0, 0, 0, 0, 0, 0, 0, 0)
+        with open(shapefile, 'wb') as shp, open(shapefile[:-4] + '.shx', 'wb') as shx:
+            shp.write(header)
+            shx.write(header[:24] + struct.pack('>i', (100 + 8 * len(contents)) // 2) + header[28:])
+            offset = 100
+            for i, content in enumerate(contents):
+                shp.write(struct.pack('>2i', i + 1, len(content) // 2) + content)
+                shx.write(struct.pack('>2i', offset // 2, len(content) // 2))
+                offset += 8 + len(content)
+
+        record_length = 1 + sum([f[2] for f in fields])
+        header_length = 32 + 32 * len(fields) + 1
+        with open(shapefile[:-4] + '.dbf', 'wb') as dbf:
+            dbf.write(struct.pack('<4BIHH20x', 3, 117, 8, 29, len(attributes), header_length, record_length))
+            for name, field_type, length, decimal_count in fields:
+                dbf.write(struct.pack('<11sc4xBB14x', name.encode('ascii'), field_type.encode('ascii'), length, decimal_count))
+            dbf.write(b'\r')
+            for i, record in enumerate(attributes):
+                dbf.write(b'*' if i in deleted else b' ')
+                for (name, field_type, length, decimal_count), value in zip(fields, record):
+                    if field_type == 'N':
+                        text = '{0:>{1}.{2}f}'.format(value, length, decimal_count)
+                    else:
+                        text = '{0:<{1}}'.format(value, length)
+                    dbf.write(text.encode('ascii'))
+            dbf.write(b'\x1a')
+
+        if prj:
+            with open(shapefile[:-4] + '.prj', 'w') as prj_file:
+                prj_file.write(prj)
+
+
+class TestNormaliseFieldName(unittest.TestCase):
+
+    def test_normalise_field_name(self):
+        self.assertEqual(shapefile_reader.normalise_field_name('GPS Alt'), 'GPS_Alt')
+        self.assertEqual(shapefile_reader.normalise_field_name('Speed'), 'Speed')
+
+
+class TestShapefileReader(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_name = tempfile.mkdtemp()
+        self.log_shapefile = os.path.join(self.temp_name, 'log.shp')
+        self.secondary_shapefile = os.path.join(self.temp_name, 'secondary.shp')
+        Resources.write_shapefile(self.log_shapefile, 3, Resources.log_records, Resources.log_fields,
+                                  Resources.log_attributes, prj="GEOGCS['GCS_WGS_1984']")
+        Resources.write_shapefile(self.secondary_shapefile, 1, Resources.secondary_records, Resources.secondary_fields,
+                                  Resources.secondary_attributes, deleted=[1])
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_name, ignore_errors=True)
+
+    def test_headers(self):
+        reader = shapefile_reader.ShapefileReader(self.log_shapefile)
+
+        self.assertEqual(reader.shape_type_name, 'Polyline', msg = "Got: {0}".format(reader.shape_type_name))
+        self.assertEqual(reader.record_count, 2, msg = "Got: {0}".format(reader.record_count))
+        self.assertListEqual(reader.field_names, ['Time', 'Speed', 'Width', 'GPS_Alt'])
+        self.assertEqual(reader.spatial_reference_wkt, "GEOGCS['GCS_WGS_1984']")
+
+    def test_read_polylines(self):
+        rows = list(shapefile_reader.ShapefileReader(self.log_shapefile))
+
+        self.assertEqual(len(rows), 2, msg = "Expected 2 rows, got: {0}".format(len(rows)))
+        self.assertEqual(rows[0][0], Resources.log_records[0])
+        self.assertEqual(rows[1][0], Resources.log_records[1])
+        self.assertTupleEqual(rows[1][1:], Resources.log_attributes[1])
+        self.assertIsInstance(rows[1][4], int)
+
+    def test_read_points_skips_deleted(self):
+        reader = shapefile_reader.ShapefileReader(self.secondary_shapefile)
+        rows = list(reader)
+
+        self.assertEqual(reader.shape_type_name, 'Point')
+        self.assertIsNone(reader.spatial_reference_wkt)
+        self.assertEqual(len(rows), 2, msg = "Deleted record should be skipped, got: {0}".format(rows))
+        self.assertEqual(rows[0][0], Resources.secondary_records[0])
+        self.assertEqual(rows[1][0], Resources.secondary_records[2])
+        self.assertTupleEqual(rows[1][1:], Resources.secondary_attributes[2])
+
+    def test_invalid_shapefile(self):
+        invalid_file = os.path.join(self.temp_name, 'invalid.shp')
+        with open(invalid_file, 'wb') as f:
+            f.write(b'not a shapefile')
+
+        with self.assertRaises(ValueError):
+            shapefile_reader.ShapefileReader(invalid_file)
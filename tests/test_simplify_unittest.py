@@ -0,0 +1,62 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from flightline import simplify
+
+
+class Resources(object):
+
+    # A straight line with a little GPS noise and one real corner at (10, 0)
+    noisy_line = [(0.0, 0.0), (2.0, 0.1), (4.0, -0.1), (6.0, 0.05), (8.0, 0.0), (10.0, 0.0),
+                  (10.0, 2.0), (10.1, 4.0), (10.0, 6.0)]
+
+
+class TestDouglasPeucker(unittest.TestCase):
+
+    def test_douglas_peucker(self):
+        simplified = simplify.douglas_peucker(Resources.noisy_line, 0.5)
+
+        self.assertListEqual(simplified, [(0.0, 0.0), (10.0, 0.0), (10.0, 6.0)],
+                             msg = "Expected the noise removed and the corner kept, got: {0}".format(simplified))
+
+    def test_small_tolerance(self):
+        simplified = simplify.douglas_peucker(Resources.noisy_line, 0.01)
+
+        self.assertListEqual(simplified, Resources.noisy_line, msg = "Expected every vertex outside the tolerance to be kept")
+
+    def test_no_tolerance(self):
+        self.assertListEqual(simplify.douglas_peucker(Resources.noisy_line, None), Resources.noisy_line)
+        self.assertListEqual(simplify.douglas_peucker(Resources.noisy_line[:2], 10), Resources.noisy_line[:2])
+
+    def test_long_line(self):
+        line = [(float(i), float(i % 2)) for i in range(20000)]
+
+        self.assertEqual(len(simplify.douglas_peucker(line, 2)), 2)
+        self.assertEqual(len(simplify.douglas_peucker(line[:1200], 0.5)), 1200, msg = "Expected no recursion limit when every vertex is kept")
+
+    def test_simplify_parts(self):
+        parts = simplify.simplify_parts([Resources.noisy_line, Resources.noisy_line[:5]], 0.5)
+
+        self.assertEqual(simplify.vertex_count(parts), 5)
+
+
+class TestVertexArchive(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_name = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_name, ignore_errors=True)
+
+    def test_write_and_read(self):
+        archive_file = os.path.join(self.temp_name, 'vertex_archive', 'FlightData', 'flight_path',
+                                    simplify.archive_file_name('HBC', '0910'))
+        simplify.write_vertex_archive(archive_file, 0.5, [[1, [Resources.noisy_line]], [2, [Resources.noisy_line[:3]]]])
+        tolerance, raw_vertices = simplify.read_vertex_archive(archive_file)
+
+        self.assertEqual(tolerance, 0.5)
+        self.assertListEqual(raw_vertices[1], [Resources.noisy_line])
+        self.assertListEqual(sorted(raw_vertices), [1, 2])
+        self.assertFalse(os.path.exists(archive_file + '.tmp'))
@@ -0,0 +1,52 @@
+import unittest
+import math
+
+from flightline import spatial_index
+
+
+class Resources(object):
+
+    line_starts = [(1, 0.0, 0.0), (2, 12.0, 0.0), (3, -3.0, -4.0)]
+
+    @staticmethod
+    def grid_index(cell_size):
+        index = spatial_index.GridIndex(cell_size)
+        for point_id, x, y in Resources.line_starts:
+            index.add(point_id, x, y)
+        return index
+
+    @staticmethod
+    def brute_force_nearest(x, y, radius):
+        distances = sorted([[math.hypot(px - x, py - y), point_id] for point_id, px, py in Resources.line_starts])
+        return distances[0] if distances[0][0] <= radius else [None, None]
+
+
+class TestGridIndex(unittest.TestCase):
+
+    def test_nearest(self):
+        index = Resources.grid_index(10)
+
+        self.assertListEqual(index.nearest(4.0, 0.0, 10), [4.0, 1])
+        self.assertListEqual(index.nearest(6.0, 0.0, 10), [6.0, 1], msg = "Expected the lower id when the distances are equal")
+        self.assertListEqual(index.nearest(9.0, 0.0, 10), [3.0, 2], msg = "Expected the point in the neighbouring cell")
+        self.assertListEqual(index.nearest(-3.0, -4.0, 5), [0.0, 3])
+
+    def test_outside_radius(self):
+        index = Resources.grid_index(5)
+
+        self.assertListEqual(index.nearest(100.0, 100.0, 5), [None, None])
+        self.assertListEqual(index.nearest(6.0, 0.0, 5), [None, None], msg = "Expected no point within the radius")
+
+    def test_matches_brute_force(self):
+        for cell_size in [1, 5, 10]:
+            index = Resources.grid_index(cell_size)
+            points = [(x * 0.7, y * 0.9) for x in range(-10, 20) for y in range(-10, 10)]
+
+            for x, y in points:
+                nearest = index.nearest(x, y, 5)
+                expected = Resources.brute_force_nearest(x, y, 5)
+                msg = "Nearest to {0} with cell size {1}, expected {2}, got: {3}".format((x, y), cell_size, expected, nearest)
+                self.assertEqual(nearest[1], expected[1], msg = msg)
+
+    def test_invalid_cell_size(self):
+        self.assertRaises(ValueError, spatial_index.GridIndex, 0)
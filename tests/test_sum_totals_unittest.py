@@ -0,0 +1,69 @@
+import unittest
+
+from flightline import sum_totals
+
+
+class Resources(object):
+
+    rows = [['HBC', '0910', 'Block1', 'Broadcast', 1.5],
+            ['HBC', '0910', 'Block1', 'Broadcast', 0.5],
+            ['HBC', '0910', 'Block1', 'Narrow', 0.25],
+            ['HBC', '0910', 'Block2', 'Broadcast', 2.0],
+            ['HBC', '0910', 'Block3', 'Trickle', 0.75],
+            ['HBC', '0910', 'Block3', 'Trickle', 0.25]]
+
+
+class TestConsolidateRows(unittest.TestCase):
+
+    def test_consolidate_rows(self):
+        rows = list(sum_totals.consolidate_rows(iter(Resources.rows)))
+
+        self.assertListEqual(rows, [['HBC', '0910', 'Block1', 'Narrow', 2.25],
+                                    ['HBC', '0910', 'Block2', 'Broadcast', 2.0],
+                                    ['HBC', '0910', 'Block3', 'Trickle', 1.0]],
+                             msg = "Expected one row per block with the hectares summed, got: {0}".format(rows))
+
+    def test_rows_not_changed(self):
+        rows = [list(row) for row in Resources.rows]
+        list(sum_totals.consolidate_rows(rows))
+
+        self.assertListEqual(rows, Resources.rows)
+
+    def test_tuples(self):
+        rows = list(sum_totals.consolidate_rows([tuple(row) for row in Resources.rows[3:]]))
+
+        self.assertListEqual(rows, [['HBC', '0910', 'Block2', 'Broadcast', 2.0], ['HBC', '0910', 'Block3', 'Trickle', 1.0]])
+
+    def test_no_rows(self):
+        self.assertListEqual(list(sum_totals.consolidate_rows([])), [])
+
+
+
+class TestCsvSummaryRows(unittest.TestCase):
+
+    def test_csv_summary_rows(self):
+        rows = [('Block1', 'Broadcast', 10.0, '09:10:00', 1, 2, 3, 4, 100.0),
+                ('Block1', 'Broadcast', 15.0, '10:10:00', 1, 2, 3, 4, 100.0),
+                ('Block2', 'Narrow', 5.0, '09:30:00', 1, 2, 3, 4, 0)]
+        csv_rows = list(sum_totals.csv_summary_rows(iter(rows), {'Block1': 22.123456, 'Block2': 4.5}, 26.6))
+
+        self.assertListEqual(csv_rows[0], ['Block1', 'Broadcast', 25.0, '10:10:00', 1, 2, 3, 4, 100.0, 22.1235, 25.0],
+                             msg = "Expected the hectares sown to date of the block, got: {0}".format(csv_rows[0]))
+        self.assertListEqual(csv_rows[1][-2:], [4.5, 0], msg = "Expected no percentage without a block area")
+        self.assertListEqual(csv_rows[2], [])
+        self.assertListEqual(csv_rows[3], ['Total dissolved area', '', '', '', '', '', '', '', '', 26.6, ''])
+        self.assertEqual(len(csv_rows), 4, msg = "Expected the total dissolved area once")
+
+    def test_block_not_dissolved(self):
+        csv_rows = list(sum_totals.csv_summary_rows([['Block3', 'Trickle', 1.0, '', 0, 0, 0, 0, 10.0]], {}, 0))
+
+        self.assertEqual(csv_rows[0][9], 0)
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_benchmark(self):
+        result = sum_totals.benchmark(20, 4, 3)
+
+        self.assertEqual(result['rows'], 240)
+        self.assertEqual(result['groups'], 20, msg = "Expected a group for each block")
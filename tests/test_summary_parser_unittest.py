@@ -0,0 +1,80 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from flightline import summary_parser
+from flightline import download_index
+
+
+class Resources(object):
+
+    distance_lines = ['Distance Flown      : 152.31 km\n', 'Distance Spread    : 48.20 km\n',
+                      'Nominal Area       : 210.50 ha\n', 'Real Area          : 198.75 ha\n']
+    area_lines = ['Area Nominal    : 210.50 ha\n', 'Area Real       : 198.75 ha\n',
+                  'Distance Flown    : 152.31 km\n', 'Distance Spread   : 48.20 km\n']
+    expected_values = [210.5, 198.75, 152.31, 48.2]
+
+    @staticmethod
+    def write_summary(file_name, lines):
+        folder = os.path.dirname(file_name)
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        with open(file_name, 'w') as f:
+            f.writelines(lines)
+
+
+class TestParseSummaryLines(unittest.TestCase):
+
+    def test_distance_layout(self):
+        summary = summary_parser.parse_summary_lines(Resources.distance_lines)
+
+        self.assertListEqual(list(summary[1:]), Resources.expected_values, msg = "Got: {0}".format(summary))
+
+    def test_area_layout(self):
+        summary = summary_parser.parse_summary_lines(Resources.area_lines)
+
+        self.assertListEqual(list(summary[1:]), Resources.expected_values, msg = "Got: {0}".format(summary))
+
+    def test_unrecognised_labels(self):
+        lines = ['Area 1      : 210.50 ha\n', 'Area 2      : 198.75 ha\n', 'Distance : 152.31 km\n', 'Distance Spread : 48.20 km\n']
+        summary = summary_parser.parse_summary_lines(lines)
+
+        self.assertListEqual(list(summary[1:]), Resources.expected_values, msg = "Expected the layout order to be used for unrecognised labels")
+
+    def test_missing_values(self):
+        summary = summary_parser.parse_summary_lines(['Test Text file for copy'])
+
+        self.assertEqual(summary, summary_parser.TracmapSummary(None, None, None, None, None))
+
+
+class TestParseSummaryFile(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_name = tempfile.mkdtemp()
+        summary_parser.clear_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_name, ignore_errors=True)
+        summary_parser.clear_cache()
+
+    def test_parsed_again_when_modified(self):
+        summary_file = os.path.join(self.temp_name, 'summary.txt')
+        Resources.write_summary(summary_file, Resources.distance_lines)
+        summary = summary_parser.parse_summary_file(summary_file)
+
+        self.assertIs(summary_parser.parse_summary_file(summary_file), summary, msg = "Expected the cached summary")
+
+        Resources.write_summary(summary_file, Resources.distance_lines[:2])
+        os.utime(summary_file, ns=(0, 0))
+        self.assertIsNone(summary_parser.parse_summary_file(summary_file).nominal_area)
+
+    def test_load_download_summaries(self):
+        download_directory = os.path.join(self.temp_name, 'HBC', '0910')
+        Resources.write_summary(os.path.join(download_directory, 'Block1', 'Block1.txt'), Resources.distance_lines)
+        Resources.write_summary(os.path.join(download_directory, 'Block2', 'Block2.txt'), Resources.area_lines)
+        tracmap_download_index = download_index.DownloadIndex(download_directory)
+        summaries = summary_parser.load_download_summaries(tracmap_download_index)
+
+        self.assertEqual(len(summaries), 2)
+        self.assertEqual(summaries[tracmap_download_index.summary_file('Block2')].real_area, 198.75)
@@ -0,0 +1,214 @@
+import unittest
+import math
+import random
+
+from flightline import swath
+
+
+class Resources(object):
+
+    straight_line = [(0.0, 0.0), (10.0, 0.0)]
+    left_turn_line = [(0.0, 0.0), (10.0, 0.0), (10.0, 10.0)]
+    right_turn_line = [(0.0, 0.0), (10.0, 0.0), (10.0, -10.0)]
+    u_turn_line = [(0.0, 0.0), (100.0, 0.0), (100.0, 10.0), (0.0, 10.0)]
+    hairpin_line = [(0.0, 0.0), (100.0, 0.0), (0.0, 1.0)]
+
+    @staticmethod
+    def jittery_line():
+        """600m line with a GPS fix every 5m, each up to 1m off the line"""
+        jitter = random.Random(1)
+        return [(i * 5 + jitter.uniform(-1, 1), jitter.uniform(-1, 1)) for i in range(121)]
+
+    @staticmethod
+    def ring_area(ring):
+        """Planar area of a ring, negative if the ring is clockwise"""
+        return sum([x0 * y1 - x1 * y0 for (x0, y0), (x1, y1) in zip(ring[:-1], ring[1:])]) / 2
+
+    @staticmethod
+    def rings_area(rings):
+        return sum([Resources.ring_area(ring) for ring in rings])
+
+    @staticmethod
+    def is_simple(ring):
+        """True if no two edges of a closed ring cross, other than neighbouring edges at their shared vertex"""
+        edges = list(zip(ring[:-1], ring[1:]))
+        for i in range(len(edges)):
+            for j in range(i + 2, len(edges)):
+                if i == 0 and j == len(edges) - 1:
+                    continue
+                if swath.segment_intersection(edges[i][0], edges[i][1], edges[j][0], edges[j][1]):
+                    return False
+        return True
+
+    @staticmethod
+    def arc_area(radius, sweep):
+        """Area of the polygon swath.arc_points approximates an arc sector with"""
+        steps = int(math.ceil(abs(sweep) / (2 * math.pi) * swath.__arc_vertices_per_circle__))
+        return steps * radius * radius * math.sin(abs(sweep) / steps) / 2
+
+
+class TestBufferStyle(unittest.TestCase):
+
+    def test_buffer_style(self):
+        self.assertEqual(swath.buffer_style('Round', False), swath.ROUND)
+        self.assertEqual(swath.buffer_style('Square', False), swath.FLAT)
+        self.assertEqual(swath.buffer_style('Round', True), swath.RIGHT_FLAT)
+
+
+class TestBucketClass(unittest.TestCase):
+
+    def test_bucket_class(self):
+        self.assertListEqual(swath.bucket_class(120.0), ['Broadcast', 'Round', 60.0])
+        self.assertListEqual(swath.bucket_class(60.0), ['Narrow', 'Round', 30.0])
+        self.assertListEqual(swath.bucket_class(30.0), ['Trickle', 'Square', 15])
+        self.assertListEqual(swath.bucket_class(2.0), ['Sprayboom', 'Square', 1.0])
+
+    def test_not_sown(self):
+        self.assertIsNone(swath.bucket_class(0))
+        self.assertIsNone(swath.bucket_class(-1.0))
+        self.assertIsNone(swath.bucket_class(None))
+
+
+class TestSwathRings(unittest.TestCase):
+
+    def test_straight_line(self):
+        round_rings = swath.swath_rings([Resources.straight_line], 1, swath.ROUND)
+        flat_rings = swath.swath_rings([Resources.straight_line], 1, swath.FLAT)
+        right_rings = swath.swath_rings([Resources.straight_line], 1, swath.RIGHT_FLAT)
+
+        self.assertEqual([len(round_rings), len(flat_rings), len(right_rings)], [1, 1, 1])
+        # Outlines are traced on a micrometre grid
+        self.assertAlmostEqual(Resources.ring_area(round_rings[0]), -(20 + 2 * Resources.arc_area(1, math.pi)), places = 4)
+        self.assertAlmostEqual(Resources.ring_area(flat_rings[0]), -20, places = 4)
+        self.assertAlmostEqual(Resources.ring_area(right_rings[0]), -10, places = 4)
+
+    def test_right_side_is_sown(self):
+        ring = swath.swath_rings([Resources.straight_line], 1, swath.RIGHT_FLAT)[0]
+
+        self.assertTrue(all([y <= 0 for x, y in ring]), msg = "Expected the swath below the line, got: {0}".format(ring))
+
+    def test_turns(self):
+        corner_area = Resources.arc_area(1, math.pi / 2)
+
+        self.assertAlmostEqual(Resources.rings_area(swath.swath_rings([Resources.left_turn_line], 1, swath.FLAT)), -(40 + corner_area - 1))
+        self.assertAlmostEqual(Resources.rings_area(swath.swath_rings([Resources.right_turn_line], 1, swath.FLAT)), -(40 + corner_area - 1))
+        self.assertAlmostEqual(Resources.rings_area(swath.swath_rings([Resources.left_turn_line], 1, swath.RIGHT_FLAT)), -(20 + corner_area))
+        self.assertAlmostEqual(Resources.rings_area(swath.swath_rings([Resources.right_turn_line], 1, swath.RIGHT_FLAT)), -19)
+
+    def test_u_turn(self):
+        rings = swath.swath_rings([Resources.u_turn_line], 30, swath.FLAT)
+
+        self.assertEqual(len(rings), 1)
+        self.assertTrue(Resources.is_simple(rings[0]), msg = "Expected the outline not to cross itself")
+        self.assertAlmostEqual(swath.polygon_area(rings), 7300 + 2 * Resources.arc_area(30, math.pi / 2), places = 4)
+
+    def test_hairpin(self):
+        back_over_line = [(0.0, 0.0), (100.0, 0.0), (0.0, 0.0)]
+        rings = swath.swath_rings([back_over_line], 30, swath.FLAT)
+
+        self.assertEqual(len(rings), 1)
+        self.assertTrue(Resources.is_simple(rings[0]), msg = "Expected the outline not to cross itself")
+        self.assertAlmostEqual(swath.polygon_area(rings), 6000 + Resources.arc_area(30, math.pi), places = 4,
+                               msg = "Expected the swath flown back over to be counted once")
+
+        rings = swath.swath_rings([Resources.hairpin_line], 30, swath.FLAT)
+
+        self.assertEqual(len(rings), 1)
+        self.assertTrue(Resources.is_simple(rings[0]), msg = "Expected the outline not to cross itself")
+        self.assertLess(swath.polygon_area(rings), 1.01 * (6000 + Resources.arc_area(30, math.pi)))
+
+    def test_jittery_line(self):
+        rings = swath.swath_rings([Resources.jittery_line()], 60, swath.FLAT)
+
+        self.assertEqual(len(rings), 1)
+        self.assertTrue(Resources.is_simple(rings[0]), msg = "Expected the outline not to cross itself")
+        self.assertAlmostEqual(swath.polygon_area(rings), 600 * 120, delta = 600 * 120 * 0.02)
+
+    def test_overlapping_parts(self):
+        crossing_line = [(5.0, -5.0), (5.0, 5.0)]
+        rings = swath.swath_rings([Resources.straight_line, crossing_line], 1, swath.FLAT)
+
+        self.assertEqual(len(rings), 1, msg = "Expected the parts to be unioned")
+        self.assertAlmostEqual(swath.polygon_area(rings), 20 + 20 - 4)
+
+    def test_loop_leaves_hole(self):
+        loop_line = [(0.0, 0.0), (100.0, 0.0), (100.0, 100.0), (0.0, 100.0), (0.0, -10.0)]
+        rings = swath.swath_rings([loop_line], 10, swath.FLAT)
+        areas = sorted([Resources.ring_area(ring) for ring in rings])
+
+        self.assertEqual(len(rings), 2)
+        self.assertAlmostEqual(areas[1], 80 * 80, msg = "Expected an anticlockwise hole inside the loop")
+        self.assertAlmostEqual(swath.polygon_area(rings), 120 * 120 - 3 * 100 + 3 * Resources.arc_area(10, math.pi / 2) - 80 * 80, places = 4)
+
+    def test_no_swath(self):
+        self.assertListEqual(swath.swath_rings([Resources.straight_line], 0, swath.ROUND), [])
+        self.assertListEqual(swath.swath_rings([[(1.0, 1.0), (1.0, 1.0)]], 1, swath.FLAT), [])
+        circle = swath.swath_rings([[(1.0, 1.0), (1.0, 1.0)]], 1, swath.ROUND)
+        self.assertAlmostEqual(Resources.rings_area(circle), -Resources.arc_area(1, 2 * math.pi), places = 4)
+
+
+class TestPolygonArea(unittest.TestCase):
+
+    def test_polygon_area(self):
+        square = [(0, 0), (0, 10), (10, 10), (10, 0), (0, 0)]
+        hole = [(2, 2), (4, 2), (4, 4), (2, 4), (2, 2)]
+
+        self.assertAlmostEqual(swath.polygon_area([square]), 100)
+        self.assertAlmostEqual(swath.polygon_area([square, hole]), 96, msg = "Expected the area of the hole to be removed")
+
+    def test_swath_area(self):
+        rings = swath.swath_rings([Resources.left_turn_line], 1, swath.ROUND)
+
+        self.assertAlmostEqual(swath.polygon_area(rings), -Resources.rings_area(rings))
+
+
+class TestSwathHectares(unittest.TestCase):
+
+    def test_line_crossing_itself(self):
+        figure_eight_line = [(0.0, 0.0), (100.0, 100.0), (100.0, 0.0), (0.0, 100.0)]
+        rings = swath.swath_rings([figure_eight_line], 5, swath.FLAT)
+        leg_rings = [swath.swath_rings([figure_eight_line[i:i + 2]], 5, swath.FLAT) for i in range(3)]
+        legs_area = sum([swath.polygon_area(leg) for leg in leg_rings])
+        # The diagonals cross in a square 10m / sin(90 degrees) wide
+        crossing_area = 10 * 10
+
+        self.assertLess(swath.polygon_area(rings), legs_area - crossing_area + 2 * Resources.arc_area(5, 3 * math.pi / 4),
+                        msg = "Expected the crossing to be counted once")
+        self.assertEqual(swath.swath_hectares(rings), round(swath.polygon_area(rings) / 10000, 4))
+
+
+class TestSwathPolygons(unittest.TestCase):
+
+    def test_sorted_by_time(self):
+        rows = [[[Resources.straight_line], '2017-08-29T09:37:51+1300', 2.0],
+                [[Resources.straight_line, Resources.left_turn_line], '2017-08-29T09:37:50+1300', 1.0],
+                [[Resources.straight_line], '2017-08-29T09:37:52+1300', 0.0]]
+        swath_rows = swath.swath_polygons(rows, swath.FLAT, 1, 2)
+
+        self.assertListEqual([row[1] for row in swath_rows], ['2017-08-29T09:37:50+1300', '2017-08-29T09:37:51+1300'],
+                             msg = "Expected rows sorted by time without the zero width row")
+        self.assertEqual(len(swath_rows[0][0]), 1, msg = "Expected the overlapping parts of the line in one outline")
+        self.assertAlmostEqual(Resources.ring_area(swath_rows[1][0][0]), -40, places = 4)
+
+    def test_unknown_style(self):
+        self.assertRaises(ValueError, swath.swath_polygons, [], 'Square', 1, 2)
+
+
+class TestSwathPolygonGroups(unittest.TestCase):
+
+    def test_groups_merged_by_time(self):
+        grouped_rows = {swath.ROUND: [[[Resources.straight_line], '2017-08-29T09:37:52+1300', 60.0],
+                                      [[Resources.straight_line], '2017-08-29T09:37:50+1300', 60.0]],
+                        swath.FLAT: [[[Resources.straight_line], '2017-08-29T09:37:51+1300', 15.0]]}
+        swath_rows = swath.swath_polygon_groups(grouped_rows, 1, 2)
+
+        self.assertListEqual([row[1] for row in swath_rows], ['2017-08-29T09:37:50+1300', '2017-08-29T09:37:51+1300',
+                                                              '2017-08-29T09:37:52+1300'])
+        self.assertAlmostEqual(Resources.ring_area(swath_rows[1][0][0]), -300, msg = "Expected the flat swath of the trickle line")
+
+    def test_single_group(self):
+        grouped_rows = {swath.RIGHT_FLAT: [[[Resources.straight_line], '2017-08-29T09:37:50+1300', 1.0]]}
+        swath_rows = swath.swath_polygon_groups(grouped_rows, 1, 2)
+
+        self.assertEqual(len(swath_rows), 1)
+        self.assertAlmostEqual(Resources.ring_area(swath_rows[0][0][0]), -10)
@@ -0,0 +1,54 @@
+import unittest
+import operator
+
+from flightline import tiled_dissolve
+
+
+class Resources(object):
+
+    rows = [['Block1', 10.0, 10.0, 'a'], ['Block1', 1990.0, 10.0, 'b'], ['Block1', 2010.0, 10.0, 'c'],
+            ['Block2', 2500.0, -10.0, 'd'], [None, 15.0, 15.0, 'e']]
+
+
+class TestPartition(unittest.TestCase):
+
+    def test_partition(self):
+        tiles = tiled_dissolve.partition(Resources.rows, 2000)
+
+        self.assertDictEqual(tiles, {(0, 0): {'Block1': ['a', 'b'], None: ['e']},
+                                     (1, 0): {'Block1': ['c']},
+                                     (1, -1): {'Block2': ['d']}},
+                             msg = "Expected each polygon in the tile of its centroid, got: {0}".format(tiles))
+
+    def test_invalid_tile_size(self):
+        self.assertRaises(ValueError, tiled_dissolve.partition, Resources.rows, 0)
+
+
+class TestTileTasks(unittest.TestCase):
+
+    def test_group_by_block(self):
+        tasks = tiled_dissolve.tile_tasks(tiled_dissolve.partition(Resources.rows, 2000))
+        block_names, block_pieces = tiled_dissolve.group_by_block(tasks, [''.join(task[1]) for task in tasks])
+
+        self.assertEqual(len(tasks), 4)
+        self.assertListEqual(block_names, [None, 'Block1', 'Block2'])
+        self.assertListEqual(block_pieces, [['e'], ['ab', 'c'], ['d']],
+                             msg = "Expected the tile pieces of each block to be stitched together")
+
+
+class TestPairwiseReduce(unittest.TestCase):
+
+    def test_pairwise_reduce(self):
+        calls = []
+
+        def union(a, b):
+            calls.append((a, b))
+            return a | b
+
+        self.assertSetEqual(tiled_dissolve.pairwise_reduce([{1}, {2}, {3}, {4}, {5}], union), {1, 2, 3, 4, 5})
+        self.assertEqual(len(calls), 4)
+        self.assertTupleEqual(calls[0], ({1}, {2}), msg = "Expected neighbouring values to be reduced first")
+
+    def test_single_and_empty(self):
+        self.assertEqual(tiled_dissolve.pairwise_reduce([5], operator.add), 5)
+        self.assertIsNone(tiled_dissolve.pairwise_reduce([], operator.add))
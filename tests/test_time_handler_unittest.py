@@ -0,0 +1,65 @@
+import unittest
+import datetime
+
+from flightline import time_handler
+
+
+class Resources(object):
+
+    time_values = ['2017-08-29T09:37:50+1300', '2017-08-29T09:37:51+1300', '2017-08-30T00:00:00+1300', '2014-11-30T07:45:10+1200']
+
+
+class TestValidateUtcOffset(unittest.TestCase):
+
+    def test_validate_utc_offset(self):
+        self.assertEqual(time_handler.validate_utc_offset('+1300'), '+1300')
+        self.assertEqual(time_handler.validate_utc_offset('-0930'), '-0930')
+
+    def test_invalid_utc_offset(self):
+        for utc_offset in ['1300', '+13:00', '+13']:
+            with self.assertRaises(ValueError, msg = "{0} should not be valid".format(utc_offset)):
+                time_handler.validate_utc_offset(utc_offset)
+
+
+class TestTracmapV1Time(unittest.TestCase):
+
+    def test_tracmap_v1_time(self):
+        self.assertEqual(time_handler.tracmap_v1_time('2014-11-30', '07:45:10.0000'), '2014-11-30T07:45:10+1300')
+        self.assertEqual(time_handler.tracmap_v1_time('2014-06-30', '07:45:10.0000', '+1200'), '2014-06-30T07:45:10+1200')
+
+    def test_tracmap_v1_time_fraction_width(self):
+        for time_text in ['07:45:10', '07:45:10.00', '07:45:10.0000', '07:45:10.00000']:
+            self.assertEqual(time_handler.tracmap_v1_time('2014-11-30', time_text), '2014-11-30T07:45:10+1300',
+                             msg = "Unexpected time from {0}".format(time_text))
+
+
+class TestTimeColumnSeconds(unittest.TestCase):
+
+    def test_matches_strptime(self):
+        seconds = time_handler.time_column_seconds(Resources.time_values)
+
+        for time_value, time_seconds in zip(Resources.time_values, seconds):
+            expected = datetime.datetime.strptime(time_value[0:19], '%Y-%m-%dT%H:%M:%S')
+            self.assertEqual(time_handler.seconds_datetime(time_seconds), expected,
+                             msg = "{0} parsed as {1}".format(time_value, time_handler.seconds_datetime(time_seconds)))
+            self.assertEqual(time_handler.datetime_seconds(expected), time_seconds)
+
+    def test_time_seconds(self):
+        self.assertEqual(time_handler.time_seconds(Resources.time_values[1]) - time_handler.time_seconds(Resources.time_values[0]), 1)
+
+
+class TestLastTimeByGroup(unittest.TestCase):
+
+    def test_last_time_by_group(self):
+        rows = [['Block1', Resources.time_values[1]], ['Block1', Resources.time_values[0]],
+                ['Block2', Resources.time_values[3]], ['Block2', Resources.time_values[2]], ['Block2', None]]
+
+        self.assertDictEqual(time_handler.last_time_by_group(rows, 0, 1),
+                             {'Block1': Resources.time_values[1], 'Block2': Resources.time_values[2]},
+                             msg = "Expected the latest time of each block whatever the row order")
+
+    def test_key_list(self):
+        rows = [['HBC', '0910', 'Block1', Resources.time_values[0]], ['HBC', '1010', 'Block1', Resources.time_values[1]]]
+
+        self.assertListEqual(sorted(time_handler.last_time_by_group(rows, [0, 1, 2], 3)),
+                             [('HBC', '0910', 'Block1'), ('HBC', '1010', 'Block1')])
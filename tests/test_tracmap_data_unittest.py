@@ -0,0 +1,191 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from flightline import tracmap_data
+from flightline import process_pool
+from test_shapefile_reader_unittest import Resources as ShapefileResources
+
+
+class Resources(object):
+
+    @staticmethod
+    def create_download(temp_name):
+        """
+        Creates a download folder containing a version 2 log.shp in a block folder
+        and a version 1 secondary.shp in the root of the download
+
+        Returns
+        -------
+        [download_directory, log_shapefile, secondary_shapefile]
+        """
+        download_directory = os.path.join(temp_name, 'NSB', '1102')
+        os.makedirs(os.path.join(download_directory, 'Block1'))
+        log_shapefile = os.path.join(download_directory, 'Block1', 'log.shp')
+        secondary_shapefile = os.path.join(download_directory, 'Block2_secondary.shp')
+        ShapefileResources.write_shapefile(log_shapefile, 3, ShapefileResources.log_records, ShapefileResources.log_fields,
+                                           ShapefileResources.log_attributes)
+        ShapefileResources.write_shapefile(secondary_shapefile, 1, ShapefileResources.secondary_records,
+                                           ShapefileResources.secondary_fields, ShapefileResources.secondary_attributes)
+        return [download_directory, log_shapefile, secondary_shapefile]
+
+
+class TestTracmapBlockName(unittest.TestCase):
+
+    def test_tracmap_block_name(self):
+        download_directory = os.path.join('raw_data', 'NSB', '1102')
+
+        self.assertEqual(tracmap_data.tracmap_block_name(download_directory, os.path.join(download_directory, 'Block1', 'log.shp'), 2), 'Block1')
+        self.assertEqual(tracmap_data.tracmap_block_name(download_directory, os.path.join(download_directory, 'log.shp'), 2), '')
+        self.assertEqual(tracmap_data.tracmap_block_name(download_directory, os.path.join(download_directory, 'Block1log.shp'), 1), 'Block1')
+        self.assertEqual(tracmap_data.tracmap_block_name(download_directory, os.path.join(download_directory, 'Block1secondary.shp'), 1), 'Block1')
+
+
+class TestNormaliseTracmapRows(unittest.TestCase):
+
+    def test_version_1(self):
+        field_list = ['SHAPE@', 'Date', 'Time', 'Speed']
+        rows = [[(1.0, 2.0), '2014-11-30', '07:45:10.0000', 40.0]]
+        destination_field_list, keyed_rows = tracmap_data.normalise_tracmap_rows('1102', os.path.join('1102', 'Block1', 'log.shp'), field_list, rows)
+        keyed_rows = list(keyed_rows)
+
+        self.assertListEqual(destination_field_list, ['SHAPE@', 'Time', 'Speed', 'BlockName'])
+        self.assertEqual(keyed_rows[0][0], '2014-11-30T07:45:10+1300_40.0')
+        self.assertListEqual(keyed_rows[0][1], [(1.0, 2.0), '2014-11-30T07:45:10+1300', 40.0, 'Block1'])
+
+    def test_version_1_utc_offset(self):
+        field_list = ['SHAPE@', 'Date', 'Time', 'Speed']
+        rows = [[(1.0, 2.0), '2014-06-30', '07:45:10.0000', 40.0]]
+        destination_field_list, keyed_rows = tracmap_data.normalise_tracmap_rows('1102', os.path.join('1102', 'Block1', 'log.shp'), field_list, rows, '+1200')
+
+        self.assertEqual(list(keyed_rows)[0][1][1], '2014-06-30T07:45:10+1200')
+
+    def test_version_2(self):
+        field_list = ['SHAPE@', 'Time', 'Speed']
+        rows = [[(1.0, 2.0), '2017-08-29T09:37:50+1300', 45.0]]
+        destination_field_list, keyed_rows = tracmap_data.normalise_tracmap_rows('1102', os.path.join('1102', 'log.shp'), field_list, rows)
+
+        self.assertListEqual(destination_field_list, ['SHAPE@', 'Time', 'Speed', 'BlockName'])
+        self.assertListEqual(list(keyed_rows), [('2017-08-29T09:37:50+1300_45.0', [(1.0, 2.0), '2017-08-29T09:37:50+1300', 45.0, ''])])
+
+    def test_unknown_version(self):
+        result = tracmap_data.normalise_tracmap_rows('1102', 'log.shp', ['SHAPE@', 'Speed'], [])
+
+        self.assertListEqual(result, [None, None])
+
+
+class TestValidateTracmapShapefile(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_name = tempfile.mkdtemp()
+        self.download_directory, self.log_shapefile, self.secondary_shapefile = Resources.create_download(self.temp_name)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_name, ignore_errors=True)
+
+    def test_valid_shapefiles(self):
+        log_validation = tracmap_data.validate_tracmap_shapefile(self.log_shapefile)
+        secondary_validation = tracmap_data.validate_tracmap_shapefile(self.secondary_shapefile)
+
+        self.assertTrue(log_validation.valid, msg = log_validation.reason)
+        self.assertEqual(log_validation.record_count, 2)
+        self.assertEqual(log_validation.shape_type, 'Polyline')
+        self.assertEqual(log_validation.tracmap_version, 2)
+        self.assertListEqual(log_validation.field_list, ['SHAPE@', 'Time', 'Speed', 'Width', 'GPS_Alt'])
+        self.assertTrue(secondary_validation.valid, msg = secondary_validation.reason)
+        self.assertEqual(secondary_validation.shape_type, 'Point')
+        self.assertEqual(secondary_validation.tracmap_version, 1)
+
+    def test_empty_shapefile(self):
+        shapefile = os.path.join(self.download_directory, 'Block1', 'empty_log.shp')
+        ShapefileResources.write_shapefile(shapefile, 3, [], ShapefileResources.log_fields, [])
+        validation = tracmap_data.validate_tracmap_shapefile(shapefile)
+
+        self.assertFalse(validation.valid, msg = "Empty shapefile should not be valid")
+        self.assertEqual(validation.record_count, 0)
+
+    def test_wrong_shape_type(self):
+        shapefile = os.path.join(self.download_directory, 'Block1', 'polygon_log.shp')
+        ShapefileResources.write_shapefile(shapefile, 5, ShapefileResources.log_records, ShapefileResources.log_fields,
+                                           ShapefileResources.log_attributes)
+        validation = tracmap_data.validate_tracmap_shapefile(shapefile)
+
+        self.assertFalse(validation.valid, msg = "Polygon shapefile should not be valid")
+        self.assertEqual(validation.shape_type, 'Polygon')
+
+    def test_missing_dbf(self):
+        os.remove(os.path.join(self.download_directory, 'Block1', 'log.dbf'))
+        validation = tracmap_data.validate_tracmap_shapefile(self.log_shapefile)
+
+        self.assertFalse(validation.valid, msg = "Shapefile without a .dbf should not be valid")
+
+    def test_write_projection_file(self):
+        wkt = "GEOGCS['GCS_WGS_1984']"
+        self.assertIsNone(tracmap_data.validate_tracmap_shapefile(self.log_shapefile).spatial_reference_wkt)
+
+        tracmap_data.write_projection_file(self.log_shapefile, wkt)
+
+        self.assertEqual(tracmap_data.validate_tracmap_shapefile(self.log_shapefile).spatial_reference_wkt, wkt)
+
+
+class TestCoordinateSystemWkt(unittest.TestCase):
+
+    class SpatialReference(object):
+        def exportToString(self):
+            return "GEOGCS['GCS_WGS_1984'];-400 -400 1000000000;-100000 10000;-100000 10000;8.98315284119522E-09;0.001;0.001;IsHighPrecision"
+
+    def test_spatial_reference(self):
+        self.assertEqual(tracmap_data.coordinate_system_wkt(self.SpatialReference()), "GEOGCS['GCS_WGS_1984']")
+
+    def test_exported_string(self):
+        exported = self.SpatialReference().exportToString()
+
+        self.assertEqual(tracmap_data.coordinate_system_wkt(exported), "GEOGCS['GCS_WGS_1984']",
+                         msg = "Expected the string the watch folder daemon passes to be accepted")
+        self.assertEqual(tracmap_data.coordinate_system_wkt("GEOGCS['GCS_WGS_1984']"), "GEOGCS['GCS_WGS_1984']")
+
+class TestParseTracmapDownload(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_name = tempfile.mkdtemp()
+        self.download_directory, self.log_shapefile, self.secondary_shapefile = Resources.create_download(self.temp_name)
+        self.shapefile_lists = {'log.shp': [self.log_shapefile], 'secondary.shp': [self.secondary_shapefile]}
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_name, ignore_errors=True)
+
+    def test_parse_tracmap_download(self):
+        parsed_download = tracmap_data.parse_tracmap_download(self.download_directory, self.shapefile_lists)
+        parsed_log = parsed_download['log.shp'][0]
+        parsed_secondary = parsed_download['secondary.shp'][0]
+
+        self.assertEqual(parsed_log.shape_type, 'Polyline')
+        self.assertListEqual(parsed_log.field_list, ['SHAPE@', 'Time', 'Speed', 'Width', 'GPS_Alt', 'BlockName'])
+        self.assertEqual(len(parsed_log.rows), 2)
+        self.assertEqual(parsed_log.rows[0][1][-1], 'Block1')
+        self.assertEqual(parsed_secondary.shape_type, 'Point')
+        self.assertEqual(len(parsed_secondary.rows), 3)
+        self.assertEqual(parsed_secondary.rows[0][1][-1], 'Block2_')
+        self.assertEqual(parsed_secondary.rows[0][1][1], '2014-11-30T07:45:10+1300')
+
+    def test_unrecognised_shapefile_kept(self):
+        unknown_shapefile = os.path.join(self.download_directory, 'Block1', 'unknown_log.shp')
+        ShapefileResources.write_shapefile(unknown_shapefile, 3, ShapefileResources.log_records, [('Name', 'C', 10, 0)],
+                                           [('a',), ('b',)])
+        self.shapefile_lists['log.shp'].append(unknown_shapefile)
+
+        parsed_download = tracmap_data.parse_tracmap_download(self.download_directory, self.shapefile_lists)
+        parsed_unknown = parsed_download['log.shp'][1]
+
+        self.assertEqual(parsed_unknown.shapefile, unknown_shapefile, msg = "Unrecognised shapefile should be kept so it can be reported")
+        self.assertIsNone(parsed_unknown.field_list)
+        self.assertListEqual(parsed_unknown.rows, [])
+
+    def test_parse_in_worker_process(self):
+        expected_result = tracmap_data.parse_tracmap_download(self.download_directory, self.shapefile_lists)
+
+        with process_pool.process_pool_executor(2) as executor:
+            actual_result = list(executor.map(tracmap_data.parse_tracmap_download, [self.download_directory], [self.shapefile_lists]))[0]
+
+        self.assertEqual(expected_result, actual_result, msg = "Worker process result differs from the serial result")
@@ -0,0 +1,218 @@
+import unittest
+import os
+import shutil
+import time
+import tempfile
+import threading
+
+from flightline import watch_folder
+
+
+class Resources(object):
+
+    export_files = [os.path.join('Block1', 'log.shp'), os.path.join('Block1', 'log.shx'), os.path.join('Block1', 'log.dbf'),
+                    os.path.join('Block1', 'secondary.shp'), os.path.join('Block1', 'secondary.shx'),
+                    os.path.join('Block1', 'secondary.dbf'), os.path.join('Block1', 'Block1.txt')]
+
+    @staticmethod
+    def write_export(drop_folder, helicopter_rego, download_time, file_list=None):
+        """
+        Writes an export into the drop folder
+
+        Returns
+        -------
+        export_folder : str
+        """
+        export_folder = os.path.join(drop_folder, helicopter_rego, download_time)
+        for relative_path in Resources.export_files if file_list is None else file_list:
+            export_file = os.path.join(export_folder, relative_path)
+            if not os.path.exists(os.path.dirname(export_file)):
+                os.makedirs(os.path.dirname(export_file))
+            with open(export_file, 'w') as f:
+                f.write(relative_path)
+        return export_folder
+
+
+class FlightlineProjectResource(object):
+    """Records the downloads ingested in place of a FlightlineProject"""
+
+    def __init__(self, project_folder):
+        self.tracmap_data_folder_location = os.path.join(project_folder, 'raw_data')
+        self.copied_tracmap_datasets = []
+        self.ingested_tracmap_datasets = []
+        self.ingested = []
+        self.failures = 0
+
+    def ingest_tracmap_download(self, source_folder, helicopter_rego, download_time, coordinate_system, deflector=False, map_view=None):
+        destination_directory = os.path.join(self.tracmap_data_folder_location, helicopter_rego, download_time)
+        if destination_directory not in self.copied_tracmap_datasets:
+            self.copied_tracmap_datasets.append(destination_directory)
+        if self.failures:
+            # Fails after the copy, as a download that fails to process does
+            self.failures -= 1
+            raise RuntimeError("Failed to process {0}".format(source_folder))
+        self.ingested.append([source_folder, helicopter_rego, download_time])
+        self.ingested_tracmap_datasets.append(destination_directory)
+        return {'lines_added': 1, 'points_added': 1, 'flight_path_added': 1, 'summary': '', 'copied': True}
+
+    def dump_to_projectconfig(self):
+        pass
+
+
+class TestExportComplete(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_name = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_name, ignore_errors=True)
+
+    def test_export_complete(self):
+        export_folder = Resources.write_export(self.temp_name, 'NSB', '1102')
+
+        self.assertTrue(watch_folder.export_complete(export_folder))
+
+    def test_export_missing_files(self):
+        missing_summary = Resources.write_export(self.temp_name, 'NSB', '1102', Resources.export_files[:-1])
+        missing_dbf = Resources.write_export(self.temp_name, 'NSB', '1103', Resources.export_files[:2] + Resources.export_files[3:])
+
+        self.assertFalse(watch_folder.export_complete(missing_summary), msg = "Export without a summary .txt is not complete")
+        self.assertFalse(watch_folder.export_complete(missing_dbf), msg = "Export without log.dbf is not complete")
+
+
+class TestExportDetector(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_name = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_name, ignore_errors=True)
+
+    def test_scan(self):
+        export_folder = Resources.write_export(self.temp_name, 'NSB', '1102')
+        Resources.write_export(self.temp_name, 'NSB', '1103', Resources.export_files[:-1])
+        detector = watch_folder.ExportDetector(self.temp_name, settle_seconds=0)
+
+        ready, pending = detector.scan()
+
+        self.assertListEqual(ready, [[export_folder, 'NSB', '1102']])
+        self.assertEqual(pending, 1, msg = "Incomplete export should be pending, got: {0}".format(pending))
+        self.assertListEqual(detector.scan()[0], [], msg = "Export should only be returned once")
+
+    def test_export_settling(self):
+        Resources.write_export(self.temp_name, 'NSB', '1102')
+        detector = watch_folder.ExportDetector(self.temp_name, settle_seconds=60)
+
+        ready, pending = detector.scan()
+
+        self.assertListEqual(ready, [])
+        self.assertEqual(pending, 1)
+
+    def test_retry(self):
+        export_folder = Resources.write_export(self.temp_name, 'NSB', '1102')
+        detector = watch_folder.ExportDetector(self.temp_name, settle_seconds=0)
+        detector.scan()
+
+        detector.retry(export_folder, 60)
+        ready, pending = detector.scan()
+
+        self.assertListEqual(ready, [])
+        self.assertEqual(pending, 1, msg = "Export waiting to be retried should be pending")
+
+        detector.retry(export_folder, 0)
+
+        self.assertListEqual(detector.scan()[0], [[export_folder, 'NSB', '1102']], msg = "Export should be returned again once the retry time has passed")
+
+
+class TestInotifyWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_name = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_name, ignore_errors=True)
+
+    @unittest.skipUnless(watch_folder.InotifyWatcher.available(), "inotify is not available")
+    def test_wait(self):
+        watcher = watch_folder.InotifyWatcher(self.temp_name)
+        try:
+            self.assertFalse(watcher.wait(0), msg = "No change has been made")
+            Resources.write_export(self.temp_name, 'NSB', '1102')
+            self.assertTrue(watcher.wait(1), msg = "New export was not seen")
+            self.assertIn(os.path.join(self.temp_name, 'NSB', '1102', 'Block1'), watcher.watched)
+        finally:
+            watcher.close()
+
+    @unittest.skipUnless(watch_folder.InotifyWatcher.available(), "inotify is not available")
+    def test_wake(self):
+        watcher = watch_folder.InotifyWatcher(self.temp_name)
+        try:
+            watcher.wake()
+            start_time = time.time()
+            self.assertFalse(watcher.wait(None), msg = "Wake is not a change")
+            self.assertLess(time.time() - start_time, 1)
+        finally:
+            watcher.close()
+
+
+class TestWatchFolder(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_name = tempfile.mkdtemp()
+        self.drop_folder = os.path.join(self.temp_name, 'drop')
+        os.mkdir(self.drop_folder)
+        self.project = FlightlineProjectResource(os.path.join(self.temp_name, 'project'))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_name, ignore_errors=True)
+
+    def test_run(self):
+        export_folder = Resources.write_export(self.drop_folder, 'NSB', '1102')
+        Resources.write_export(self.drop_folder, 'NSB', '1103')
+        self.project.ingested_tracmap_datasets.append(os.path.join(self.project.tracmap_data_folder_location, 'NSB', '1103'))
+        watcher = watch_folder.WatchFolder(self.project, self.drop_folder, None, settle_seconds=0,
+                                           poll_interval=0.01, use_inotify=False)
+        watcher_thread = threading.Thread(target=watcher.run)
+        watcher_thread.start()
+        try:
+            for i in range(500):
+                if watcher.results:
+                    break
+                threading.Event().wait(0.01)
+        finally:
+            watcher.stop()
+            watcher_thread.join()
+
+        self.assertListEqual(self.project.ingested, [[export_folder, 'NSB', '1102']],
+                             msg = "Only the new export should be ingested, got: {0}".format(self.project.ingested))
+
+    def test_failed_ingest_retried(self):
+        export_folder = Resources.write_export(self.drop_folder, 'NSB', '1102')
+        self.project.failures = 1
+        watcher = watch_folder.WatchFolder(self.project, self.drop_folder, None, settle_seconds=0,
+                                           poll_interval=0.01, use_inotify=False, retry_seconds=0)
+        watcher_thread = threading.Thread(target=watcher.run)
+        watcher_thread.start()
+        try:
+            for i in range(500):
+                if watcher.results:
+                    break
+                threading.Event().wait(0.01)
+        finally:
+            watcher.stop()
+            watcher_thread.join()
+
+        self.assertListEqual(self.project.ingested, [[export_folder, 'NSB', '1102']],
+                             msg = "Copied download that failed to process should be ingested again, got: {0}".format(self.project.ingested))
+
+    @unittest.skipUnless(watch_folder.InotifyWatcher.available(), "inotify is not available")
+    def test_stop_wakes_run(self):
+        watcher = watch_folder.WatchFolder(self.project, self.drop_folder, None, settle_seconds=0)
+        watcher_thread = threading.Thread(target=watcher.run)
+        watcher_thread.start()
+        threading.Event().wait(0.1)
+
+        watcher.stop()
+        watcher_thread.join(5)
+
+        self.assertFalse(watcher_thread.is_alive(), msg = "stop should end run while it waits for a change")